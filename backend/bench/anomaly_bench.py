@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Anomaly Detector Benchmark
+Measures per-message detection cost and checks the rolling baselines
+against a full recompute over the history window, and batch results
+against the scalar path on simulated laps with position baselines on
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import os
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+
+# Add parent and simulator directories to path for imports
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+sys.path.append(os.path.join(BACKEND_DIR, "sim"))
+
+from generate_stream import F1TelemetrySimulator
+from services.anomaly_detector import AnomalyDetector, FEATURE_COLUMNS
+
+
+def make_messages(drivers: int, count: int, seed: int = 7) -> List[Dict[str, Any]]:
+    """Build a deterministic stream of telemetry messages"""
+    rng = random.Random(seed)
+    messages = []
+    for i in range(count):
+        messages.append({
+            "ts": datetime.now().isoformat(),
+            "driver_id": f"driver_{i % drivers + 1}",
+            "lap": 1,
+            "speed_kph": rng.uniform(150, 320),
+            "throttle_pct": rng.choice([0.0, rng.uniform(0.2, 1.0)]),
+            "brake_pct": rng.uniform(0, 0.7),
+            "gear": rng.randint(3, 8)
+        })
+    return messages
+
+
+def full_recompute_baseline(history: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """Reference baseline: regroup the window and run NumPy over every feature"""
+    all_features = defaultdict(list)
+    for entry in history:
+        for feature, value in entry["features"].items():
+            all_features[feature].append(value)
+    return {
+        feature: {
+            "mean": np.mean(values),
+            "std": np.std(values),
+            "min": np.min(values),
+            "max": np.max(values),
+            "count": len(values)
+        }
+        for feature, values in all_features.items()
+    }
+
+
+def window_baseline(window: np.ndarray) -> Dict[str, Dict[str, float]]:
+    """Reference baseline computed directly over a history store window"""
+    baseline = {}
+    for col, feature in enumerate(FEATURE_COLUMNS):
+        values = window[:, col]
+        values = values[~np.isnan(values)]
+        if len(values):
+            baseline[feature] = {
+                "mean": np.mean(values),
+                "std": np.std(values),
+                "min": np.min(values),
+                "max": np.max(values),
+                "count": len(values)
+            }
+    return baseline
+
+
+def deep_sizeof(obj: Any) -> int:
+    """Approximate recursive size of dicts, lists and scalars"""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k) + deep_sizeof(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, deque)):
+        size += sum(deep_sizeof(item) for item in obj)
+    return size
+
+
+async def report_history_memory(messages: List[Dict[str, Any]], history_size: int):
+    """Compare bytes per retained driver-sample: deque of dicts vs ring buffer"""
+    detector = AnomalyDetector(history_size=history_size)
+    legacy: Dict[str, deque] = defaultdict(lambda: deque(maxlen=history_size))
+    for message in messages:
+        legacy[message["driver_id"]].append({
+            "timestamp": message["ts"],
+            "features": detector._extract_features(message)
+        })
+    await detector.detect_anomalies_batch(messages)
+
+    samples = sum(len(history) for history in legacy.values())
+    legacy_bytes = sum(deep_sizeof(history) for history in legacy.values())
+    usage = detector.driver_history.memory_usage()
+    print(f"History memory (window {history_size}): deque of dicts "
+          f"{legacy_bytes / samples:6.0f} B/sample, ring buffer {usage['bytes_per_row']} B/sample "
+          f"({usage['allocated_bytes_per_sample']} B allocated)")
+
+
+async def run_detector(messages: List[Dict[str, Any]], check: bool) -> float:
+    detector = AnomalyDetector()
+    max_error = 0.0
+    start = time.perf_counter()
+    for message in messages:
+        await detector.detect_anomaly(message)
+        if check:
+            driver_id = message["driver_id"]
+            expected = window_baseline(detector.driver_history[driver_id].features())
+            actual = detector.driver_baselines.get(driver_id)
+            if actual is None:
+                continue
+            for feature, stats in expected.items():
+                for key in ("mean", "std", "min", "max", "count"):
+                    max_error = max(max_error, abs(float(stats[key]) - float(actual[feature][key])))
+    elapsed = time.perf_counter() - start
+    if check:
+        print(f"Max deviation from full recompute: {max_error:.3e}")
+    return elapsed
+
+
+async def run_full_recompute(messages: List[Dict[str, Any]]) -> float:
+    """Per-message cost of the previous deque-of-dicts full-window recompute"""
+    detector = AnomalyDetector()
+    legacy: Dict[str, deque] = defaultdict(lambda: deque(maxlen=detector.history_size))
+    start = time.perf_counter()
+    for message in messages:
+        history = legacy[message["driver_id"]]
+        history.append({"timestamp": message["ts"], "features": detector._extract_features(message)})
+        if len(history) >= detector.min_samples_for_baseline:
+            full_recompute_baseline(list(history))
+    return time.perf_counter() - start
+
+
+async def check_batch_parity(messages: List[Dict[str, Any]], batch_size: int) -> int:
+    """Compare batch results with the scalar path; returns the mismatch count"""
+    scalar = AnomalyDetector()
+    batched = AnomalyDetector()
+    expected = [await scalar.detect_anomaly(m) for m in messages]
+    actual = []
+    for i in range(0, len(messages), batch_size):
+        actual.extend(await batched.detect_anomalies_batch(messages[i:i + batch_size]))
+
+    mismatches = 0
+    for exp, act in zip(expected, actual):
+        if (exp is None) != (act is None):
+            mismatches += 1
+        elif exp is not None:
+            exp_features = [a["feature"] for a in exp["anomalies"]]
+            act_features = [a["feature"] for a in act["anomalies"]]
+            if exp_features != act_features or abs(exp["confidence"] - act["confidence"]) > 1e-6:
+                mismatches += 1
+    return mismatches
+
+
+async def time_batches(messages: List[Dict[str, Any]], batch_size: int) -> Tuple[float, float]:
+    """Time one batch of ``batch_size`` after warming every driver's window"""
+    warmup, batch = messages[:-batch_size], messages[-batch_size:]
+    scalar = AnomalyDetector()
+    batched = AnomalyDetector()
+    await batched.detect_anomalies_batch(warmup)
+    await scalar.detect_anomalies_batch(warmup)
+
+    start = time.perf_counter()
+    for message in batch:
+        await scalar.detect_anomaly(message)
+    scalar_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await batched.detect_anomalies_batch(batch)
+    batch_s = time.perf_counter() - start
+    return scalar_s, batch_s
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Anomaly detector benchmark")
+    parser.add_argument("--drivers", type=int, default=20, help="Number of drivers")
+    parser.add_argument("--messages", type=int, default=20000, help="Number of messages")
+    parser.add_argument("--history-size", type=int, default=2000, help="Window for the memory report")
+    args = parser.parse_args()
+
+    messages = make_messages(args.drivers, args.messages)
+
+    await run_detector(messages[:2000], check=True)
+    baseline_s = await run_full_recompute(messages)
+    rolling_s = await run_detector(messages, check=False)
+
+    per_msg = lambda s: s / len(messages) * 1e6
+    print(f"Full recompute baseline: {per_msg(baseline_s):8.1f} us/message")
+    print(f"Rolling detect_anomaly:  {per_msg(rolling_s):8.1f} us/message")
+
+    mismatches = await check_batch_parity(messages[:5000], batch_size=257)
+    print(f"Batch vs scalar mismatches: {mismatches}")
+    # Simulated laps carry track_x and sector, so the default position baselines take part
+    simulator = F1TelemetrySimulator(10, laps=10, seed=1)
+    laps = [record for kind, record in simulator.live_records() if kind == "telemetry"]
+    position_mismatches = await check_batch_parity(laps, batch_size=200)
+    print(f"Batch vs scalar mismatches, {len(laps)} simulated samples with position baselines: "
+          f"{position_mismatches}")
+    for batch_size in (20, 200, 2000, 10000):
+        scalar_s, batch_s = await time_batches(messages, batch_size)
+        print(f"Batch of {batch_size:5d}: scalar loop {scalar_s * 1e3:8.2f} ms, "
+              f"detect_anomalies_batch {batch_s * 1e3:8.2f} ms")
+
+    await report_history_memory(messages, args.history_size)
+    if mismatches or position_mismatches:
+        sys.exit("Batch results differ from the scalar path")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Broadcast Benchmark
+Measures ConnectionManager.broadcast latency as the client count grows,
+with a share of stalled clients that must not hold back the others
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import os
+import time
+from typing import List
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.connection_manager import ConnectionManager, ALL_DRIVERS
+from services.tick_frames import TickFrame, FrameStats
+
+
+class FakeWebSocket:
+    """Stand-in socket whose sends take ``delay`` seconds"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.received = 0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message: str):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.received += 1
+
+    async def close(self):
+        pass
+
+
+async def run(clients: int, slow: int, frames: int, policy: str) -> None:
+    manager = ConnectionManager(max_queue=64, overflow_policy=policy, send_timeout=30)
+    sockets: List[FakeWebSocket] = []
+    for i in range(clients):
+        websocket = FakeWebSocket(delay=0.5 if i < slow else 0.0)
+        sockets.append(websocket)
+        await manager.connect(websocket)
+
+    # One frame per driver per tick, like the gateway's 100 ms loop (faster here)
+    latencies = []
+    for frame in range(frames):
+        start = time.perf_counter()
+        await manager.broadcast(f'{{"type": "telemetry", "frame": {frame}}}', key=f"driver_{frame % 20}")
+        latencies.append(time.perf_counter() - start)
+        if frame % 20 == 19:
+            await asyncio.sleep(0.005)
+
+    await asyncio.sleep(0.05)
+    fast = sockets[slow:]
+    delivered = min(s.received for s in fast) if fast else 0
+    stats = manager.get_stats()
+    latencies.sort()
+    print(f"{policy:18s} clients={clients:4d} slow={slow:3d} "
+          f"broadcast p50={latencies[len(latencies) // 2] * 1e6:7.1f} us "
+          f"p99={latencies[int(len(latencies) * 0.99)] * 1e6:7.1f} us "
+          f"fast-client min delivered={delivered}/{frames} "
+          f"connected={stats['connections']} dropped={stats['dropped_frames']}")
+    await manager.close()
+
+
+async def run_routing(clients: int, drivers: int, ticks: int, panel: bool) -> None:
+    """Cost of routing 20-car ticks to full-grid vs single-driver subscribers"""
+    manager = ConnectionManager(max_queue=1_000_000, send_timeout=30)
+    for i in range(clients):
+        if panel:
+            await manager.connect(FakeWebSocket(), f"driver_{i % drivers}", ("telemetry",))
+        else:
+            await manager.connect(FakeWebSocket(), ALL_DRIVERS, ("telemetry",))
+
+    stats = FrameStats()
+    frame = TickFrame()
+    elapsed = 0.0
+    for tick in range(ticks):
+        for d in range(drivers):
+            frame.add({"type": "telemetry", "data": {"driver_id": f"driver_{d}", "tick": tick}})
+        start = time.perf_counter()
+        await frame.flush(manager, stats)
+        elapsed += time.perf_counter() - start
+        await asyncio.sleep(0)
+
+    totals = stats.to_dict()
+    view = "driver panel" if panel else "full grid"
+    print(f"{view:12s} clients={clients:4d} routing {elapsed / ticks * 1e6:8.1f} us/tick "
+          f"bytes/tick={totals['bytes_sent'] // ticks:8d} frames encoded/tick={totals['frames_encoded'] / ticks:5.1f}")
+    await manager.close()
+
+
+async def main():
+    logging.basicConfig(level=logging.ERROR)
+    parser = argparse.ArgumentParser(description="ConnectionManager broadcast benchmark")
+    parser.add_argument("--frames", type=int, default=500, help="Frames to broadcast")
+    args = parser.parse_args()
+
+    for policy in ("drop_oldest", "latest_per_driver", "disconnect"):
+        for clients in (10, 100, 500):
+            await run(clients, slow=max(1, clients // 10), frames=args.frames, policy=policy)
+
+    for clients in (100, 500):
+        for panel in (False, True):
+            await run_routing(clients, drivers=20, ticks=100, panel=panel)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
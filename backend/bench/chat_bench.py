@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Chat Benchmark
+Measures event-loop lag, latency and cache behavior of ChatService against
+the local stub model, compared with calling the model inline on the loop
+"""
+
+import argparse
+import asyncio
+import sys
+import os
+import time
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.chat_service import ChatService, ChatTimeout, StubChatModel
+from services.loop_monitor import EventLoopMonitor
+
+QUESTIONS = ["Pit window?", "pit window", "How is the fuel?", "What's our pace?",
+             "Can we overtake?", "Tyre status", "gap to car ahead"]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run_inline(model: StubChatModel, requests: int):
+    """Old behavior: the blocking model call runs on the event loop"""
+    async def one(i):
+        model.generate(QUESTIONS[i % len(QUESTIONS)])
+
+    monitor = EventLoopMonitor(interval=0.01, warn_threshold=10)
+    monitor.start()
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    await asyncio.sleep(0.02)
+    await monitor.stop()
+    return elapsed, monitor.get_stats()
+
+
+async def run_service(service: ChatService, requests: int, unique: bool):
+    latencies = []
+    timeouts = 0
+
+    async def one(i):
+        nonlocal timeouts
+        message = f"Question {i}" if unique else QUESTIONS[i % len(QUESTIONS)]
+        start = time.perf_counter()
+        try:
+            await service.reply(message)
+        except ChatTimeout:
+            timeouts += 1
+        latencies.append(time.perf_counter() - start)
+
+    monitor = EventLoopMonitor(interval=0.01, warn_threshold=10)
+    monitor.start()
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    await asyncio.sleep(0.02)
+    await monitor.stop()
+    return elapsed, latencies, timeouts, monitor.get_stats()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Chat service benchmark")
+    parser.add_argument("--requests", type=int, default=40, help="Concurrent chat requests")
+    parser.add_argument("--latency-ms", type=float, default=200, help="Stub model latency")
+    parser.add_argument("--concurrency", type=int, default=4, help="Max concurrent model calls")
+    parser.add_argument("--timeout", type=float, default=1.0, help="Per-request deadline in seconds")
+    args = parser.parse_args()
+
+    model = StubChatModel(latency=args.latency_ms / 1000)
+
+    elapsed, loop = await run_inline(model, min(args.requests, 10))
+    print(f"Inline model call ({min(args.requests, 10)} requests): {elapsed:.2f}s, "
+          f"max loop lag {loop['max_lag_ms']:.0f} ms")
+
+    for unique in (True, False):
+        service = ChatService(model=model, max_concurrency=args.concurrency,
+                              timeout=args.timeout, cache_size=256, cache_ttl=30)
+        elapsed, latencies, timeouts, loop = await run_service(service, args.requests, unique)
+        label = "unique messages" if unique else "repeated messages"
+        print(f"ChatService, {label} ({args.requests} requests): {elapsed:.2f}s, "
+              f"p50 {percentile(latencies, 50) * 1000:.1f} ms, p99 {percentile(latencies, 99) * 1000:.1f} ms, "
+              f"timeouts {timeouts}, max loop lag {loop['max_lag_ms']:.0f} ms")
+        stats = service.get_stats()
+        print(f"  model calls {stats['model_calls']}, shared in-flight {stats['shared_in_flight']}, "
+              f"cache hits {stats['cache_hits']}")
+
+        if not unique:
+            # Warm cache: every question again, served without the model
+            start = time.perf_counter()
+            for question in QUESTIONS:
+                await service.reply(question)
+            per_hit = (time.perf_counter() - start) / len(QUESTIONS)
+            print(f"  warm cache lookup: {per_hit * 1e6:.1f} us/request")
+        service.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
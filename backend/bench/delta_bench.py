@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Delta Encoding Benchmark
+Compares full telemetry events with the delta stream and checks that
+decoding the stream reproduces every message exactly
+"""
+
+import argparse
+import json
+import sys
+import os
+from typing import Dict, Any, List
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.delta_encoder import TelemetryDeltaEncoder, shift_timestamp
+from sim.generate_stream import F1TelemetrySimulator
+
+COMPACT = (",", ":")
+
+
+def simulator_stream(drivers: int, laps: int) -> List[Dict[str, Any]]:
+    """Interleaved per-driver telemetry from the simulator's point generator"""
+    simulator = F1TelemetrySimulator(drivers=drivers, laps=laps)
+    points = []
+    for lap in range(1, laps + 1):
+        for step in range(60):
+            distance = step * simulator.track_length / 60
+            sector = min(3, int(distance / simulator.sector_length) + 1)
+            for driver_id in simulator.driver_ids:
+                points.append(simulator.generate_telemetry_point(driver_id, lap, distance, sector))
+    return points
+
+
+def decode(stream: Dict[str, Dict[str, Any]], event: Dict[str, Any]) -> Dict[str, Any]:
+    """Reference client: apply a keyframe or delta and return the full message"""
+    driver_id = event["d"]
+    if event.get("k"):
+        stream[driver_id] = {"fields": event["f"], "values": list(event["v"])}
+    else:
+        values = stream[driver_id]["values"]
+        if "t" in event:
+            ts_index = stream[driver_id]["fields"].index("ts")
+            values[ts_index] = shift_timestamp(values[ts_index], event["t"])
+        for index, value in event["c"].items():
+            index = int(index)
+            if isinstance(value, list):
+                value = values[index][:value[0]] + value[1]
+            values[index] = value
+    state = stream[driver_id]
+    return {"driver_id": driver_id, **dict(zip(state["fields"], state["values"]))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Telemetry delta encoding benchmark")
+    parser.add_argument("--drivers", type=int, default=20, help="Number of drivers")
+    parser.add_argument("--laps", type=int, default=10, help="Number of laps")
+    parser.add_argument("--keyframe-interval", type=int, default=50, help="Frames between keyframes")
+    args = parser.parse_args()
+
+    points = simulator_stream(args.drivers, args.laps)
+    encoder = TelemetryDeltaEncoder(keyframe_interval=args.keyframe_interval)
+    client: Dict[str, Dict[str, Any]] = {}
+
+    full_bytes = 0
+    delta_bytes = 0
+    mismatches = 0
+    for point in points:
+        full_bytes += len(json.dumps({"type": "telemetry", "data": point, "anomaly": None}, separators=COMPACT))
+        event = encoder.encode(point)
+        encoded = json.dumps(event, separators=COMPACT)
+        delta_bytes += len(encoded)
+        if decode(client, json.loads(encoded)) != {"driver_id": point["driver_id"], **point}:
+            mismatches += 1
+
+    print(f"Messages: {len(points)}  decode mismatches: {mismatches}")
+    print(f"Full frames:  {full_bytes / len(points):6.1f} B/message")
+    print(f"Delta stream: {delta_bytes / len(points):6.1f} B/message "
+          f"({full_bytes / delta_bytes:.2f}x smaller, keyframe every {args.keyframe_interval})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Sharded Detection Benchmark
+Scores a large grid with the inline AnomalyDetector and with
+ShardedAnomalyDetector over 1..N worker processes, checks the results are
+identical, and reports throughput
+"""
+
+import argparse
+import asyncio
+import sys
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.anomaly_bench import make_messages
+from services.anomaly_detector import AnomalyDetector
+from services.detector_pool import ShardedAnomalyDetector
+
+
+def batches(messages: List[Dict[str, Any]], size: int) -> List[List[Dict[str, Any]]]:
+    return [messages[i:i + size] for i in range(0, len(messages), size)]
+
+
+async def run(detector, chunks: List[List[Dict[str, Any]]], pipeline: int) -> List[Optional[Dict[str, Any]]]:
+    """Score every chunk, keeping up to ``pipeline`` batches in flight"""
+    results: List[Optional[Dict[str, Any]]] = []
+    pending = []
+    for chunk in chunks:
+        pending.append(detector.detect_anomalies_batch(chunk))
+        if len(pending) >= pipeline:
+            results.extend(await pending.pop(0))
+    for awaitable in pending:
+        results.extend(await awaitable)
+    return results
+
+
+def mismatches(expected: List, actual: List) -> int:
+    count = 0
+    for exp, act in zip(expected, actual):
+        if (exp is None) != (act is None):
+            count += 1
+        elif exp is not None and ([a["feature"] for a in exp["anomalies"]] != [a["feature"] for a in act["anomalies"]]
+                                  or abs(exp["confidence"] - act["confidence"]) > 1e-9):
+            count += 1
+    return count + abs(len(expected) - len(actual))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Sharded anomaly detection benchmark")
+    parser.add_argument("--drivers", type=int, default=200, help="Number of drivers")
+    parser.add_argument("--messages", type=int, default=100000, help="Number of messages")
+    parser.add_argument("--batch-size", type=int, default=2000, help="Messages per polled batch")
+    parser.add_argument("--workers", type=str, default="1,2,4", help="Comma-separated worker counts")
+    parser.add_argument("--pipeline", type=int, default=2, help="Batches in flight for the sharded runs")
+    args = parser.parse_args()
+
+    messages = make_messages(args.drivers, args.messages)
+    chunks = batches(messages, args.batch_size)
+    print(f"{args.messages} messages, {args.drivers} drivers, batches of {args.batch_size}, {os.cpu_count()} CPUs")
+
+    start = time.perf_counter()
+    expected = await run(AnomalyDetector(), chunks, pipeline=1)
+    inline_s = time.perf_counter() - start
+    print(f"inline      {args.messages / inline_s:10.0f} msgs/s")
+
+    for workers in (int(x) for x in args.workers.split(",")):
+        detector = ShardedAnomalyDetector(workers=workers)
+        # Start the worker processes outside the timed run
+        await detector.detect_anomalies_batch([{"driver_id": f"warmup_{i}"} for i in range(workers * 4)])
+        start = time.perf_counter()
+        actual = await run(detector, chunks, args.pipeline)
+        elapsed = time.perf_counter() - start
+        stats = detector.get_stats()
+        print(f"{workers} worker(s) {args.messages / elapsed:10.0f} msgs/s, "
+              f"speedup {inline_s / elapsed:4.2f}x, detection CPU per worker {stats['worker_cpu_s']} s, "
+              f"mismatches vs inline {mismatches(expected, actual)}")
+        detector.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
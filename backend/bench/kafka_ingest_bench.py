@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Kafka Ingestion Benchmark
+Compares event-loop blocking of a poll() on the loop with the threaded
+ingestion in KafkaConsumer, using a stand-in consumer
+"""
+
+import argparse
+import asyncio
+import sys
+import os
+import time
+from collections import namedtuple
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.kafka_consumer import KafkaConsumer
+from services.loop_monitor import EventLoopMonitor
+
+Record = namedtuple("Record", ["value"])
+
+
+class StandInConsumer:
+    """Blocks in poll() like kafka-python, then returns a batch of records"""
+
+    def __init__(self, batch_size: int, poll_block: float):
+        self.batch_size = batch_size
+        self.poll_block = poll_block
+        self.seq = 0
+
+    def poll(self, timeout_ms: int = 100):
+        time.sleep(self.poll_block)
+        records = []
+        for _ in range(self.batch_size):
+            self.seq += 1
+            records.append(Record({"driver_id": f"driver_{self.seq % 20}", "seq": self.seq}))
+        return {("telemetry", 0): records}
+
+    def close(self):
+        pass
+
+
+async def run_blocking(duration: float, batch_size: int, poll_block: float) -> dict:
+    """Previous behaviour: poll() called directly from the coroutine"""
+    monitor = EventLoopMonitor(interval=0.01, warn_threshold=10)
+    monitor.start()
+    telemetry = StandInConsumer(batch_size, poll_block)
+    radio = StandInConsumer(0, poll_block)
+    received = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        for records in telemetry.poll(timeout_ms=100).values():
+            received += len(records)
+        radio.poll(timeout_ms=100)
+        await asyncio.sleep(0.1)
+    await monitor.stop()
+    return {"received": received, **monitor.get_stats()}
+
+
+async def run_threaded(duration: float, batch_size: int, poll_block: float) -> dict:
+    monitor = EventLoopMonitor(interval=0.01, warn_threshold=10)
+    monitor.start()
+    consumer = KafkaConsumer()
+    consumer.telemetry_consumer = StandInConsumer(batch_size, poll_block)
+    consumer.radio_consumer = StandInConsumer(0, poll_block)
+    consumer.start()
+    received = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        received += len(await consumer.consume_telemetry(timeout=0.1))
+        await consumer.consume_radio()
+    await consumer.close()
+    await monitor.stop()
+    return {"received": received, **monitor.get_stats()}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Kafka ingestion event-loop benchmark")
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds per run")
+    parser.add_argument("--batch", type=int, default=200, help="Records per poll")
+    parser.add_argument("--poll-block", type=float, default=0.1, help="Seconds poll() blocks")
+    args = parser.parse_args()
+
+    for name, runner in (("poll on loop", run_blocking), ("poll thread", run_threaded)):
+        stats = await runner(args.duration, args.batch, args.poll_block)
+        print(f"{name:13s} received={stats['received']:7d} "
+              f"loop lag avg={stats['avg_lag_ms']:6.2f} ms max={stats['max_lag_ms']:7.2f} ms "
+              f"blocked={stats['blocked_s']:5.2f} s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Gateway Load Benchmark
+Starts the gateway with a synthetic N-driver replay source, attaches M
+headless WebSocket clients and sweeps the N x M grid, reporting
+throughput, ts-to-client latency, dropped frames, CPU and RSS as JSON.
+cpu_pct is the gateway process's share of one core, so the k8s pod limit
+of 500m corresponds to 50%.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime
+
+import numpy as np
+import websockets
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.history_store import parse_timestamp
+from store_bench import session_messages
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                                       text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return "unknown"
+
+
+def process_cpu_seconds(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS  # utime + stime
+
+
+def process_rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def get_json(url: str) -> dict:
+    with urllib.request.urlopen(url, timeout=5) as response:
+        return json.loads(response.read())
+
+
+class Gateway:
+    """The FastAPI app in a uvicorn subprocess, replaying a looping synthetic session"""
+
+    def __init__(self, drivers: int, hz: int, directory: str, store: bool):
+        self.port = free_port()
+        self.base = f"http://127.0.0.1:{self.port}"
+        recording = os.path.join(directory, f"load_{drivers}.json")
+        messages, _ = session_messages(drivers, laps=1, hz=hz)
+        with open(recording, "w") as f:
+            json.dump({"telemetry": messages, "radio": []}, f)
+        env = {
+            **os.environ,
+            "REPLAY_FILE": recording,
+            "REPLAY_SPEED": "1",
+            "REPLAY_LOOP": "true",
+            "REPLAY_REBASE": "true",
+            "TELEMETRY_STORE_ENABLED": "true" if store else "false",
+            "TELEMETRY_STORE_DIR": os.path.join(directory, "store")
+        }
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+             "--port", str(self.port), "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+
+    def wait_ready(self, timeout: float = 30.0):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError("Gateway exited during startup")
+            try:
+                get_json(self.base + "/health")
+                return
+            except Exception:
+                time.sleep(0.2)
+        raise RuntimeError("Gateway did not become ready")
+
+    def stats(self) -> dict:
+        return get_json(self.base + "/api/stats")
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+class Client:
+    """One headless dashboard: counts frames and telemetry latency while ``measuring``"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.measuring = False
+        self.latencies = []
+        self.frames = 0
+        self.events = 0
+        self.bytes = 0
+
+    async def run(self, stop: asyncio.Event):
+        async with websockets.connect(self.url, max_size=None) as ws:
+            while not stop.is_set():
+                try:
+                    raw = await asyncio.wait_for(ws.recv(), 0.5)
+                except asyncio.TimeoutError:
+                    continue
+                if not self.measuring:
+                    continue
+                now = time.time()
+                message = json.loads(raw)
+                events = message["events"] if message.get("type") == "tick" else [message]
+                self.frames += 1
+                self.bytes += len(raw)
+                self.events += len(events)
+                for event in events:
+                    if event.get("type") == "telemetry":
+                        self.latencies.append(now - parse_timestamp(event["data"]["ts"]))
+
+
+async def measure(gateway: Gateway, drivers: int, clients: int, driver_share: float,
+                  warmup: float, duration: float) -> dict:
+    ws_base = gateway.base.replace("http", "ws")
+    driver_clients = int(round(clients * driver_share))
+    urls = [f"{ws_base}/ws/DRIVER_{i % drivers}" for i in range(driver_clients)]
+    urls += [f"{ws_base}/ws"] * (clients - driver_clients)
+    population = [Client(url) for url in urls]
+
+    stop = asyncio.Event()
+    tasks = [asyncio.create_task(client.run(stop)) for client in population]
+    await asyncio.sleep(warmup)
+
+    before = gateway.stats()
+    cpu_before = process_cpu_seconds(gateway.process.pid)
+    started = time.time()
+    for client in population:
+        client.measuring = True
+
+    rss_peak = 0.0
+    while time.time() - started < duration:
+        rss_peak = max(rss_peak, process_rss_mb(gateway.process.pid))
+        await asyncio.sleep(0.25)
+
+    for client in population:
+        client.measuring = False
+    elapsed = time.time() - started
+    cpu = process_cpu_seconds(gateway.process.pid) - cpu_before
+    after = gateway.stats()
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    latencies = np.array([x for client in population for x in client.latencies]) * 1000
+    frames_before, frames_after = before["frames"], after["frames"]
+    ingested = after["kafka"]["telemetry"]["messages"] - before["kafka"]["telemetry"]["messages"]
+
+    def pct(p):
+        return round(float(np.percentile(latencies, p)), 2) if len(latencies) else None
+
+    return {
+        "drivers": drivers,
+        "clients": clients,
+        "grid_clients": clients - driver_clients,
+        "driver_clients": driver_clients,
+        "duration_s": round(elapsed, 2),
+        "ingest_per_s": round(ingested / elapsed, 1),
+        "events_per_s": round((frames_after["events"] - frames_before["events"]) / elapsed, 1),
+        "frames_sent_per_s": round((frames_after["frames_sent"] - frames_before["frames_sent"]) / elapsed, 1),
+        "bytes_sent_per_s": round((frames_after["bytes_sent"] - frames_before["bytes_sent"]) / elapsed, 1),
+        "client_frames_per_s": round(sum(c.frames for c in population) / elapsed, 1),
+        "client_events_per_s": round(sum(c.events for c in population) / elapsed, 1),
+        "latency_ms": {"p50": pct(50), "p95": pct(95), "p99": pct(99),
+                       "max": round(float(latencies.max()), 2) if len(latencies) else None,
+                       "samples": int(len(latencies))},
+        "dropped_frames": after["connections"]["dropped_frames"] - before["connections"]["dropped_frames"],
+        "replay_behind_s": after["kafka"].get("replay", {}).get("behind_s"),
+        "loop_lag_max_ms": after["event_loop"].get("max_lag_ms"),
+        "cpu_pct": round(cpu / elapsed * 100, 1),
+        "rss_mb_peak": round(rss_peak, 1)
+    }
+
+
+def print_row(row: dict, previous: dict = None):
+    latency = row["latency_ms"]
+    line = (f"N={row['drivers']:>3} M={row['clients']:>4} | ingest {row['ingest_per_s']:>7.0f}/s "
+            f"events {row['client_events_per_s']:>8.0f}/s | p50 {latency['p50']} p95 {latency['p95']} "
+            f"p99 {latency['p99']} ms | dropped {row['dropped_frames']} | "
+            f"cpu {row['cpu_pct']}% rss {row['rss_mb_peak']} MB")
+    if previous:
+        line += (f" | vs baseline: p99 {latency['p99'] - previous['latency_ms']['p99']:+.2f} ms, "
+                 f"cpu {row['cpu_pct'] - previous['cpu_pct']:+.1f}%")
+    print(line, flush=True)
+
+
+def parse_grid(value: str):
+    return [int(x) for x in value.split(",") if x]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gateway load and latency benchmark")
+    parser.add_argument("--drivers", type=parse_grid, default=[2, 10, 20], help="Comma-separated N values")
+    parser.add_argument("--clients", type=parse_grid, default=[1, 10, 50], help="Comma-separated M values")
+    parser.add_argument("--driver-share", type=float, default=0.5,
+                        help="Fraction of clients on /ws/{driver_id}; the rest use /ws")
+    parser.add_argument("--hz", type=int, default=10, help="Samples per second per driver")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Seconds before measuring each cell")
+    parser.add_argument("--duration", type=float, default=5.0, help="Measured seconds per cell")
+    parser.add_argument("--store", action="store_true", help="Keep the telemetry store enabled")
+    parser.add_argument("--output", type=str, default="load_results.json", help="JSON results file")
+    parser.add_argument("--baseline", type=str, help="Previous results file to compare against")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {(r["drivers"], r["clients"]): r for r in json.load(f)["results"]}
+
+    report = {
+        "commit": git_commit(),
+        "started_at": datetime.now().isoformat(),
+        "host": {"cpus": os.cpu_count(), "python": sys.version.split()[0]},
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        "results": []
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        for drivers in args.drivers:
+            gateway = Gateway(drivers, args.hz, directory, args.store)
+            try:
+                gateway.wait_ready()
+                for clients in args.clients:
+                    row = asyncio.run(measure(gateway, drivers, clients, args.driver_share,
+                                              args.warmup, args.duration))
+                    report["results"].append(row)
+                    print_row(row, baseline.get((drivers, clients)))
+            finally:
+                gateway.stop()
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Model Detector Benchmark
+Checks CompiledForest against IsolationForest.score_samples, compares their
+per-call cost, and measures IsolationForestDetector batch latency while
+models train in the background
+"""
+
+import argparse
+import sys
+import os
+import time
+
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.anomaly_bench import make_messages
+from services.anomaly_detector import AnomalyDetector
+from services.model_detector import CompiledForest, IsolationForest, IsolationForestDetector
+
+
+def compare_scoring(estimators: int, rows: int, repeat: int = 50):
+    """Max score difference and per-call time, sklearn vs compiled"""
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(100, 6))
+    estimator = IsolationForest(n_estimators=estimators, max_samples=100, random_state=0).fit(X)
+    forest = CompiledForest(estimator)
+    Y = rng.normal(size=(rows, 6)) * 2
+    error = float(np.abs(forest.score_samples(Y) - estimator.score_samples(Y)).max())
+
+    timings = []
+    for score in (estimator.score_samples, forest.score_samples):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            score(Y)
+        timings.append((time.perf_counter() - start) / repeat)
+    return error, timings
+
+
+def time_detector(detector, messages, batch_size: int, pause: float):
+    """Batch latencies (p50, max) and anomaly count over the stream"""
+    latencies = []
+    anomalies = 0
+    for i in range(0, len(messages), batch_size):
+        start = time.perf_counter()
+        results = detector.detect_batch(messages[i:i + batch_size])
+        latencies.append(time.perf_counter() - start)
+        anomalies += sum(1 for r in results if r)
+        # Leave the training thread room, as the gateway's tick pacing does
+        time.sleep(pause)
+    return float(np.median(latencies)), max(latencies), anomalies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Model detector benchmark")
+    parser.add_argument("--drivers", type=int, default=20, help="Number of drivers")
+    parser.add_argument("--messages", type=int, default=20000, help="Number of messages")
+    parser.add_argument("--batch-size", type=int, default=200, help="Messages per batch")
+    parser.add_argument("--pause-ms", type=float, default=10, help="Pause between batches")
+    args = parser.parse_args()
+
+    for estimators in (50, 100):
+        for rows in (1, 10, 200):
+            error, (sklearn_s, compiled_s) = compare_scoring(estimators, rows)
+            print(f"{estimators:3d} trees, {rows:3d} rows: score_samples {sklearn_s * 1e3:6.3f} ms, "
+                  f"compiled {compiled_s * 1e3:6.3f} ms, max difference {error:.1e}")
+
+    messages = make_messages(args.drivers, args.messages)
+    for name, detector in (("zscore", AnomalyDetector()), ("isolation_forest", IsolationForestDetector())):
+        p50, worst, anomalies = time_detector(detector, messages, args.batch_size, args.pause_ms / 1000)
+        line = f"{name:<16} batch p50 {p50 * 1e3:6.2f} ms, max {worst * 1e3:6.2f} ms, {anomalies} anomalies"
+        if isinstance(detector, IsolationForestDetector):
+            models = detector.model_stats().values()
+            line += (f", {detector.stats['fits']} fits, mean fit "
+                     f"{np.mean([m['train_s'] for m in models]) * 1e3:.0f} ms")
+            detector.close()
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Kafka Producer Benchmark
+Drives TelemetryProducer at a target rate across linger and compression
+settings, against the in-process LocalBroker or a real cluster, and checks
+that every driver stays on one partition in send order
+"""
+
+import argparse
+import json
+import sys
+import os
+from collections import defaultdict
+
+# Add parent and simulator directories to path for imports
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+sys.path.append(os.path.join(BACKEND_DIR, "sim"))
+
+from generate_stream import F1TelemetrySimulator
+from services.kafka_producer import PROFILES, LocalBroker, TelemetryProducer
+
+
+def check_ordering(broker: LocalBroker, topic: str) -> int:
+    """Drivers seen on more than one partition or out of ts order"""
+    partitions = defaultdict(set)
+    last_ts = {}
+    problems = 0
+    for partition, key, value in broker.records[topic]:
+        ts = json.loads(value)["ts"]
+        partitions[key].add(partition)
+        if ts < last_ts.get(key, ""):
+            problems += 1
+        last_ts[key] = ts
+    return problems + sum(1 for p in partitions.values() if len(p) > 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kafka producer benchmark")
+    parser.add_argument("--drivers", type=int, default=20, help="Number of drivers")
+    parser.add_argument("--rate", type=float, default=5000, help="Target messages per second (0 = max)")
+    parser.add_argument("--profile", choices=list(PROFILES), default="constant", help="Rate profile")
+    parser.add_argument("--ramp-seconds", type=float, default=4, help="Ramp length or burst period")
+    parser.add_argument("--duration", type=float, default=4, help="Seconds per configuration")
+    parser.add_argument("--linger", type=str, default="0,5,20", help="Comma-separated linger_ms values")
+    parser.add_argument("--compression", type=str, default="none,gzip", help="Comma-separated codecs")
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="LocalBroker round trip")
+    parser.add_argument("--bootstrap", type=str, help="Produce to this Kafka cluster instead of LocalBroker")
+    args = parser.parse_args()
+
+    if args.bootstrap:
+        os.environ["KAFKA_BOOTSTRAP_SERVERS"] = args.bootstrap
+
+    for compression in args.compression.split(","):
+        for linger in (float(x) for x in args.linger.split(",")):
+            broker = None
+            if not args.bootstrap:
+                broker = LocalBroker(batch_size=65536, linger_ms=linger, latency_ms=args.latency_ms,
+                                     compression_type=None if compression == "none" else compression,
+                                     retain=int(args.rate * args.duration * 2) or 1_000_000)
+            producer = TelemetryProducer(client=broker, linger_ms=linger, compression=compression)
+            simulator = F1TelemetrySimulator(args.drivers, laps=5, seed=1)
+            report = producer.produce(simulator.live_records(loop=True), rate=args.rate, profile=args.profile,
+                                      ramp_s=args.ramp_seconds, duration=args.duration, report_interval=0)
+            line = f"{compression:<5} linger {linger:>4.0f} ms | " + producer.format_report(report)
+            if broker:
+                stats = broker.stats
+                line += (f" | {stats['records'] / max(stats['batches'], 1):.0f} msgs/batch, "
+                         f"{stats['bytes'] / max(stats['compressed_bytes'], 1):.1f}x compression, "
+                         f"ordering problems {check_ordering(broker, producer.telemetry_topic)}")
+            print(line, flush=True)
+            producer.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Session Replay Benchmark
+Measures how fast SessionReplay can feed a recording at max speed, and the
+memory its lazy reader needs compared with loading the file with json.load
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import os
+import tempfile
+import time
+import tracemalloc
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.session_files import iter_json_array
+from services.session_replay import SessionReplay
+from store_bench import session_messages
+
+
+def write_recording(path: str, drivers: int, laps: int, hz: int) -> int:
+    """Write a session in the simulator's JSON layout"""
+    messages, _ = session_messages(drivers, laps, hz)
+    with open(path, "w") as f:
+        json.dump({"telemetry": messages, "radio": [],
+                   "metadata": {"drivers": drivers, "laps": laps}}, f, indent=2)
+    return len(messages)
+
+
+def peak_memory(fn) -> float:
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1e6
+
+
+async def replay_max(path: str) -> tuple:
+    replay = SessionReplay(path, speed="max", loop=False)
+    await replay.initialize()
+    received = 0
+    start = time.perf_counter()
+    while True:
+        received += len(await replay.consume_telemetry(timeout=0.1))
+        if replay.replay_stats["finished"] and replay.telemetry_queue.empty():
+            break
+    elapsed = time.perf_counter() - start
+    await replay.close()
+    return received, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Session replay benchmark")
+    parser.add_argument("--drivers", type=int, default=20, help="Drivers in the recording")
+    parser.add_argument("--laps", type=int, default=5, help="Laps in the recording")
+    parser.add_argument("--hz", type=int, default=10, help="Samples per second per driver")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "session.json")
+        total = write_recording(path, args.drivers, args.laps, args.hz)
+        race_rate = args.drivers * args.hz
+        print(f"Recording: {total} samples, {os.path.getsize(path) / 1e6:.1f} MB "
+              f"({race_rate} samples/s at race pace)")
+
+        eager = peak_memory(lambda: json.load(open(path))["telemetry"])
+        lazy = peak_memory(lambda: sum(1 for _ in iter_json_array(path, "telemetry")))
+        print(f"peak memory: json.load {eager:.1f} MB, lazy reader {lazy:.1f} MB")
+
+        received, elapsed = asyncio.run(replay_max(path))
+        print(f"max-speed replay: {received} samples in {elapsed:.2f}s = {received / elapsed:,.0f} samples/s "
+              f"({received / elapsed / race_rate:.0f}x race pace)")
+
+
+if __name__ == "__main__":
+    main()
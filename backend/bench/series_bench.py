@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Telemetry Series Benchmark
+Records a synthetic session into TelemetryStore and measures downsampled
+series queries: latency and payload for a lap and for the whole session,
+the completed-lap cache, and how well each method keeps the speed extremes
+"""
+
+import argparse
+import json
+import sys
+import os
+import tempfile
+import time
+
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.store_bench import session_messages
+from services.telemetry_series import TelemetrySeries, METHODS
+from services.telemetry_store import TelemetryStore
+
+
+def timed(fn, repeat=10):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Telemetry series benchmark")
+    parser.add_argument("--drivers", type=int, default=5, help="Drivers in the session")
+    parser.add_argument("--laps", type=int, default=60, help="Laps per driver")
+    parser.add_argument("--hz", type=int, default=10, help="Samples per second per driver")
+    parser.add_argument("--points", type=int, default=500, help="Points per series")
+    args = parser.parse_args()
+
+    messages, _ = session_messages(args.drivers, args.laps, args.hz)
+    with tempfile.TemporaryDirectory() as directory:
+        store = TelemetryStore(directory=directory, session="bench", flush_interval=3600)
+        store.enabled = True
+        for i in range(0, len(messages), 5000):
+            store.extend(messages[i:i + 5000])
+            store.flush()
+        series = TelemetrySeries(store)
+        raw = store.query("DRIVER_0")
+        raw_json = sum(len(json.dumps(m)) + 1 for m in messages if m["driver_id"] == "DRIVER_0")
+        print(f"DRIVER_0: {len(raw['ts'])} samples over {args.laps} laps, {raw_json / 1e6:.1f} MB as NDJSON")
+
+        lap = args.laps // 2
+        for method in METHODS:
+            for label, query in ((f"lap {lap}", {"lap": lap}), ("session", {})):
+                uncached = TelemetrySeries(store)
+                elapsed, body = timed(lambda: uncached.series("DRIVER_0", points=args.points,
+                                                              method=method, **query), repeat=1)
+                data = json.loads(body)
+                speed = np.array(data["series"]["speed_kph"])
+                rows = raw["speed_kph"] if not query else raw["speed_kph"][raw["lap"] == lap]
+                print(f"{method:<6} {label:<8} {data['raw_points']:7d} -> {data['points']:4d} points, "
+                      f"{len(body) / 1024:6.1f} KiB, {elapsed * 1e3:6.2f} ms, "
+                      f"speed range kept {speed.min():.1f}-{speed.max():.1f} of {rows.min():.1f}-{rows.max():.1f}")
+
+        series.series("DRIVER_0", lap=lap, points=args.points)
+        cached_s, _ = timed(lambda: series.series("DRIVER_0", lap=lap, points=args.points), repeat=1000)
+        print(f"completed lap from cache: {cached_s * 1e6:.1f} us ({series.get_stats()})")
+
+
+if __name__ == "__main__":
+    main()
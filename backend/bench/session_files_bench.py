@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Session Files Benchmark
+Writes simulator sessions in every output format, reporting file size,
+write time and peak memory as the lap count grows, then reads each file
+back through the lazy readers
+"""
+
+import argparse
+import sys
+import os
+import tempfile
+import time
+import tracemalloc
+
+# Add parent and simulator directories to path for imports
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+sys.path.append(os.path.join(BACKEND_DIR, "sim"))
+
+from generate_stream import F1TelemetrySimulator
+from services.session_files import FORMATS, csv_paths, iter_radio, iter_telemetry, open_writer
+
+EXTENSIONS = {"json": ".json", "ndjson": ".ndjson", "csv": ".csv", "columnar": ".f1c"}
+
+
+def write_session(fmt: str, path: str, drivers: int, laps: int, seed: int):
+    simulator = F1TelemetrySimulator(drivers, laps, seed=seed)
+    with open_writer(fmt, path, {"drivers": simulator.driver_ids, "laps": laps}) as writer:
+        for columns, radio in simulator.generate_bulk():
+            writer.write_columns(columns)
+            writer.write_radio(radio)
+    return writer.telemetry_count, writer.radio_count
+
+
+def file_size(fmt: str, path: str) -> int:
+    if fmt == "csv":
+        return sum(os.path.getsize(p) for p in csv_paths(path))
+    return os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Session file writer and reader benchmark")
+    parser.add_argument("--drivers", type=int, default=20, help="Number of drivers")
+    parser.add_argument("--laps", type=str, default="5,20,80", help="Comma-separated lap counts")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    args = parser.parse_args()
+    lap_counts = [int(x) for x in args.laps.split(",") if x]
+
+    with tempfile.TemporaryDirectory() as directory:
+        for fmt in FORMATS:
+            path = os.path.join(directory, "session" + EXTENSIONS[fmt])
+            for laps in lap_counts:
+                tracemalloc.start()
+                start = time.perf_counter()
+                points, radio = write_session(fmt, path, args.drivers, laps, args.seed)
+                write_s = time.perf_counter() - start
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                size = file_size(fmt, path)
+                print(f"{fmt:<9} {laps:>3} laps: {points:>9,} points, {size / 1e6:7.1f} MB "
+                      f"({size / points:5.1f} B/point), write {points / write_s:>10,.0f} points/s, "
+                      f"peak memory {peak / 1e6:5.1f} MB")
+
+            start = time.perf_counter()
+            read = sum(1 for _ in iter_telemetry(path))
+            read_radio = sum(1 for _ in iter_radio(path))
+            read_s = time.perf_counter() - start
+            assert (read, read_radio) == (points, radio), f"{fmt}: read {read}/{read_radio} of {points}/{radio}"
+            print(f"{fmt:<9} read back {read:,} points lazily at {read / read_s:,.0f} points/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Simulator Generation Benchmark
+Compares point-by-point generation with the vectorized bulk mode of
+F1TelemetrySimulator, and checks both follow the same distributions
+"""
+
+import argparse
+import random
+import sys
+import os
+import time
+
+import numpy as np
+
+# Add the simulator directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sim"))
+
+from generate_stream import F1TelemetrySimulator
+
+FIELDS = ["speed_kph", "throttle_pct", "brake_pct", "gear", "sector"]
+
+
+def scalar_points(simulator: F1TelemetrySimulator, laps: int):
+    """The real-time path's loop without the pacing sleep"""
+    points = []
+    for lap in range(1, laps + 1):
+        for driver_id in simulator.driver_ids:
+            distance = 0
+            sector = 1
+            while distance < simulator.track_length:
+                points.append(simulator.generate_telemetry_point(driver_id, lap, distance, sector))
+                distance += random.uniform(50, 100)
+                sector = min(3, int(distance / simulator.sector_length) + 1)
+    return points
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulator generation benchmark")
+    parser.add_argument("--drivers", type=int, default=20, help="Number of drivers")
+    parser.add_argument("--laps", type=int, default=60, help="Number of laps")
+    parser.add_argument("--scale", type=int, default=20, help="Bulk run is this many times larger")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    args = parser.parse_args()
+
+    simulator = F1TelemetrySimulator(args.drivers, args.laps, seed=args.seed)
+    start = time.perf_counter()
+    scalar = scalar_points(simulator, args.laps)
+    scalar_s = time.perf_counter() - start
+    realtime_s = len(scalar) * 0.01
+    print(f"point by point: {len(scalar)} points in {scalar_s:.2f}s "
+          f"(real-time mode adds {realtime_s / 60:.0f} min of pacing sleeps)")
+
+    simulator = F1TelemetrySimulator(args.drivers, args.laps, seed=args.seed)
+    start = time.perf_counter()
+    columns = [c for c, _ in simulator.generate_bulk()]
+    bulk_s = time.perf_counter() - start
+    records = [r for c in columns for r in simulator.columns_to_records(c)]
+    records_s = time.perf_counter() - start
+    print(f"vectorized:     {len(records)} points in {bulk_s:.3f}s as columns, {records_s:.2f}s as dicts")
+
+    for field in FIELDS:
+        a = np.array([p[field] for p in scalar], dtype=float)
+        b = np.array([p[field] for p in records], dtype=float)
+        print(f"  {field:<13} mean {a.mean():8.3f} vs {b.mean():8.3f}   std {a.std():7.3f} vs {b.std():7.3f}")
+
+    big = F1TelemetrySimulator(args.drivers * args.scale, args.laps, seed=args.seed)
+    start = time.perf_counter()
+    total = sum(len(c["lap"]) for c, _ in big.generate_bulk())
+    print(f"vectorized, {args.drivers * args.scale} drivers: {total:,} points in "
+          f"{time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Telemetry Store Benchmark
+Measures hot-path append cost, writer throughput, file size and range
+query latency of TelemetryStore on synthetic session data
+"""
+
+import argparse
+import json
+import random
+import sys
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.telemetry_store import TelemetryStore, COLUMN_NAMES
+
+TRACK_LENGTH = 5000
+
+
+def session_messages(drivers: int, laps: int, hz: int, seed: int = 11):
+    """Telemetry for a whole session, ~90 s laps sampled at ``hz``"""
+    rng = random.Random(seed)
+    start = datetime(2025, 10, 18, 14, 0, 0)
+    samples_per_lap = 90 * hz
+    messages = []
+    for step in range(laps * samples_per_lap):
+        lap = step // samples_per_lap + 1
+        distance = (step % samples_per_lap) / samples_per_lap * TRACK_LENGTH
+        ts = (start + timedelta(seconds=step / hz)).isoformat()
+        for d in range(drivers):
+            messages.append({
+                "ts": ts, "driver_id": f"DRIVER_{d}", "lap": lap,
+                "distance_m": distance, "sector": int(distance // (TRACK_LENGTH / 3)) + 1,
+                "track_x": distance / TRACK_LENGTH, "speed_kph": round(rng.uniform(80, 330), 1),
+                "throttle_pct": round(rng.random(), 3), "brake_pct": round(rng.random() * 0.3, 3),
+                "gear": rng.randint(1, 8)
+            })
+    return messages, start
+
+
+def timed(fn, repeat=20):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Telemetry store benchmark")
+    parser.add_argument("--drivers", type=int, default=20, help="Drivers in the session")
+    parser.add_argument("--laps", type=int, default=10, help="Laps per driver")
+    parser.add_argument("--hz", type=int, default=10, help="Samples per second per driver")
+    parser.add_argument("--flush-rows", type=int, default=2000, help="Rows per writer flush")
+    args = parser.parse_args()
+
+    messages, start = session_messages(args.drivers, args.laps, args.hz)
+    print(f"Session: {args.drivers} drivers x {args.laps} laps at {args.hz} Hz = {len(messages)} samples")
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = TelemetryStore(directory=directory, session="bench", flush_interval=3600,
+                               flush_rows=args.flush_rows)
+        store.enabled = True
+
+        # Hot path: what the broadcast loop pays per sample
+        t0 = time.perf_counter()
+        for message in messages:
+            store.append(message)
+        append_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        store.flush()
+        flush_s = time.perf_counter() - t0
+        print(f"append: {append_s / len(messages) * 1e6:.2f} us/sample on the hot path")
+        print(f"writer: {len(messages) / flush_s:,.0f} samples/s")
+
+        size = sum(os.path.getsize(os.path.join(store.session_dir, f)) for f in os.listdir(store.session_dir))
+        json_size = sum(len(json.dumps(m)) + 1 for m in messages)
+        print(f"on disk: {size / len(messages):.1f} B/sample (NDJSON would be {json_size / len(messages):.1f} B/sample)")
+
+        # Rebuild in blocks like the writer thread would: one block per flush
+        store = TelemetryStore(directory=directory, session="blocks", flush_interval=3600,
+                               flush_rows=args.flush_rows)
+        store.enabled = True
+        for i in range(0, len(messages), args.flush_rows):
+            store.extend(messages[i:i + args.flush_rows])
+            store.flush()
+        segment = store._segment("blocks", "DRIVER_0")
+        print(f"blocks per driver: {len(segment.index)}")
+
+        lap = args.laps // 2
+        window_start = (start + timedelta(seconds=(lap - 1) * 90 + 30)).timestamp()
+        window_end = window_start + 10
+
+        full_s, full = timed(lambda: store.query("DRIVER_0"))
+        lap_s, lap_rows = timed(lambda: store.query("DRIVER_0", lap=lap))
+        window_s, window_rows = timed(lambda: store.query("DRIVER_0", start=window_start, end=window_end))
+
+        # Reference: filter the whole driver file in memory
+        scan_s, _ = timed(lambda: {k: v[full["lap"] == lap] for k, v in store.query("DRIVER_0").items()})
+        assert np.array_equal(lap_rows["ts"], full["ts"][full["lap"] == lap])
+        in_window = (full["ts"] >= window_start) & (full["ts"] <= window_end)
+        assert all(np.array_equal(window_rows[c], full[c][in_window]) for c in COLUMN_NAMES)
+
+        print(f"query full driver ({len(full['ts'])} rows): {full_s * 1000:.2f} ms")
+        print(f"query lap {lap} ({len(lap_rows['ts'])} rows): {lap_s * 1000:.2f} ms "
+              f"(full read + filter: {scan_s * 1000:.2f} ms)")
+        print(f"query 10 s window ({len(window_rows['ts'])} rows): {window_s * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
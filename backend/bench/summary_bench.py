@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Driver Summary Benchmark
+Compares one summary call per radio message with the coalescing
+per-driver scheduler in DriverSummarizer, using a slow stand-in model
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import os
+import time
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.driver_summarizer import DriverSummarizer
+
+
+class StandInSummarizer(DriverSummarizer):
+    """Simulated summaries that take ``latency`` seconds, like an LLM call"""
+
+    def __init__(self, latency: float, **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency
+        self.model_calls = 0
+
+    async def generate_summary(self, driver_id, context=None):
+        self.model_calls += 1
+        await asyncio.sleep(self.latency)
+        return await self._simulate_summary(driver_id, context)
+
+
+def radio_burst(drivers: int, messages: int, seed: int = 7):
+    rng = random.Random(seed)
+    return [(f"driver_{rng.randint(1, drivers)}", f"Radio line {i}") for i in range(messages)]
+
+
+async def run_naive(summarizer: StandInSummarizer, burst, spacing: float):
+    """Old behavior: await a summary for every radio line"""
+    start = time.perf_counter()
+    for driver_id, text in burst:
+        await summarizer.generate_summary(driver_id, text)
+        await asyncio.sleep(spacing)
+    return time.perf_counter() - start
+
+
+async def run_scheduled(summarizer: StandInSummarizer, burst, spacing: float):
+    start = time.perf_counter()
+    futures = []
+    for driver_id, text in burst:
+        futures.append(summarizer.request_summary(driver_id, text))
+        await asyncio.sleep(spacing)
+    feed_time = time.perf_counter() - start
+    results = await asyncio.gather(*futures)
+    return feed_time, time.perf_counter() - start, results
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Driver summary scheduling benchmark")
+    parser.add_argument("--drivers", type=int, default=20, help="Drivers on the radio")
+    parser.add_argument("--messages", type=int, default=100, help="Radio messages in the burst")
+    parser.add_argument("--rate", type=float, default=50, help="Radio messages per second")
+    parser.add_argument("--latency-ms", type=float, default=250, help="Stand-in model latency")
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between calls per driver")
+    args = parser.parse_args()
+
+    burst = radio_burst(args.drivers, args.messages)
+    spacing = 1.0 / args.rate
+    latency = args.latency_ms / 1000
+
+    naive = StandInSummarizer(latency)
+    elapsed = await run_naive(naive, burst, spacing)
+    print(f"Per-message summaries: {naive.model_calls} model calls, "
+          f"processing loop stalled for {elapsed:.1f}s to consume a {args.messages / args.rate:.1f}s burst")
+
+    scheduled = StandInSummarizer(latency, interval=args.interval, debounce=0.25)
+    feed_time, elapsed, results = await run_scheduled(scheduled, burst, spacing)
+    stats = await scheduled.get_summarization_stats()
+    summaries = [summary for summary in results if summary]
+    print(f"Coalesced summaries: {scheduled.model_calls} model calls "
+          f"({stats['joined']} requests joined, {stats['rejected']} rejected), "
+          f"burst consumed in {feed_time:.1f}s, all summaries done after {elapsed:.1f}s")
+    if summaries:
+        print(f"  up to {max(s['radio_messages'] for s in summaries)} radio messages per call")
+    await scheduled.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -7,31 +7,37 @@ import asyncio
 import json
 import logging
 import os
+import time
 from datetime import datetime
 from typing import Dict, List, Optional
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response
 from pydantic import BaseModel
 import uvicorn
 
 from services.kafka_consumer import KafkaConsumer
-from services.anomaly_detector import AnomalyDetector
+from services.detector_pool import create_anomaly_detector
 from services.radio_transcriber import RadioTranscriber
 from services.driver_summarizer import DriverSummarizer
+from services.connection_manager import ConnectionManager, CHANNELS, VALID_CHANNELS, ALL_DRIVERS
+from services.tick_frames import TickFrame, FrameStats
+from services.loop_monitor import EventLoopMonitor
+from services.delta_encoder import TelemetryDeltaEncoder
+from services.chat_service import ChatService, ChatTimeout
+from services.telemetry_store import TelemetryStore
+from services.telemetry_series import TelemetrySeries
+from services.session_replay import SessionReplay
+from services.lap_segmenter import LapSegmenter
+from services.fanout import FanoutBus
+from services.state_snapshot import StateSnapshotter
+from services.state_cache import LatestStateCache
+from services.metrics import REGISTRY, CONTENT_TYPE, Counter, Gauge, Histogram
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Try to import google.generativeai for Gemini
-try:
-    import google.generativeai as genai
-    GEMINI_AVAILABLE = True
-except ImportError:
-    GEMINI_AVAILABLE = False
-    logger.warning("google.generativeai not installed. AI chat will use fallback responses.")
-
 app = FastAPI(
     title="F1 Race Engineer AI",
     description="Real-time F1 telemetry and radio analysis",
@@ -48,67 +54,57 @@ app.add_middleware(
 )
 
 # WebSocket connection manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-        self.driver_connections: Dict[str, List[WebSocket]] = {}
-
-    async def connect(self, websocket: WebSocket, driver_id: Optional[str] = None):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-        if driver_id:
-            if driver_id not in self.driver_connections:
-                self.driver_connections[driver_id] = []
-            self.driver_connections[driver_id].append(websocket)
-        logger.info(f"WebSocket connected. Total connections: {len(self.active_connections)}")
-
-    def disconnect(self, websocket: WebSocket, driver_id: Optional[str] = None):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-        if driver_id and driver_id in self.driver_connections:
-            if websocket in self.driver_connections[driver_id]:
-                self.driver_connections[driver_id].remove(websocket)
-        logger.info(f"WebSocket disconnected. Total connections: {len(self.active_connections)}")
-
-    async def send_personal_message(self, message: str, websocket: WebSocket):
-        try:
-            await websocket.send_text(message)
-        except Exception as e:
-            logger.error(f"Error sending message: {e}")
-
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except Exception as e:
-                logger.error(f"Error broadcasting message: {e}")
-
-    async def broadcast_to_driver(self, message: str, driver_id: str):
-        if driver_id in self.driver_connections:
-            for connection in self.driver_connections[driver_id]:
-                try:
-                    await connection.send_text(message)
-                except Exception as e:
-                    logger.error(f"Error sending to driver {driver_id}: {e}")
-
 manager = ConnectionManager()
+GRID_CHANNELS = ("telemetry", "radio")
+DRIVER_CHANNELS = ("anomaly", "summary", "lap")
+frame_stats = FrameStats()
+loop_monitor = EventLoopMonitor()
+delta_encoder = TelemetryDeltaEncoder()
+# Latest state per driver and recent radio, sent to clients as they join
+state_cache = LatestStateCache()
 
 # Initialize services
-kafka_consumer = KafkaConsumer()
-anomaly_detector = AnomalyDetector()
+# REPLAY_FILE replays a recorded session through the Kafka ingestion path
+kafka_consumer = SessionReplay() if os.getenv("REPLAY_FILE") else KafkaConsumer()
+# Inline, or sharded over worker processes when ANOMALY_WORKERS > 0
+anomaly_detector = create_anomaly_detector()
 radio_transcriber = RadioTranscriber()
 driver_summarizer = DriverSummarizer()
-
-# Initialize Gemini if available
-if GEMINI_AVAILABLE:
-    gemini_api_key = os.getenv('GEMINI_API_KEY')
-    if gemini_api_key:
-        genai.configure(api_key=gemini_api_key)
-        gemini_model = genai.GenerativeModel('gemini-pro')
-        logger.info("Gemini AI initialized successfully")
-    else:
-        GEMINI_AVAILABLE = False
-        logger.warning("GEMINI_API_KEY not found in environment")
+telemetry_store = TelemetryStore()
+# Downsampled chart series over the store, cached for completed laps
+telemetry_series = TelemetrySeries(telemetry_store)
+lap_segmenter = LapSegmenter()
+# Shares this replica's events with the others when FANOUT_ENABLED
+fanout = FanoutBus()
+# Detector and driver state on disk, for warm restarts
+snapshotter = StateSnapshotter()
+
+# Chat runs on its own bounded worker pool (Gemini, or the local stub model)
+chat_service = ChatService()
+
+# Metrics: stage timings are observed inline, everything else is read from
+# the services' own counters when /metrics is scraped
+DETECTION_SECONDS = Histogram("f1_anomaly_detection_seconds", "Time a tick waits for anomaly detection of its batch")
+ANOMALIES = Counter("f1_anomalies_total", "Anomalies detected", ["driver_id"])
+Counter("f1_messages_in_total", "Messages ingested from Kafka or replay", ["stream"],
+        fn=lambda: {name: stats["messages"] for name, stats in kafka_consumer.stats.items()})
+Counter("f1_events_out_total", "Events published to tick frames", fn=lambda: frame_stats.events)
+Gauge("f1_ws_connections", "Connected WebSocket clients", fn=lambda: len(manager.active_connections))
+Gauge("f1_ws_queued_frames", "Frames waiting in client send queues",
+      fn=lambda: sum(len(c.queue) for c in list(manager.active_connections.values())))
+Gauge("f1_kafka_queued_batches", "Polled batches waiting for the event loop", ["stream"],
+      fn=lambda: {name: stats["queued_batches"] for name, stats in kafka_consumer.get_stats().items()
+                  if isinstance(stats, dict) and "queued_batches" in stats})
+Gauge("f1_kafka_consumer_lag", "Messages behind the high watermark", ["stream"],
+      fn=lambda: dict(getattr(kafka_consumer, "lag", {})))
+Gauge("f1_model_age_seconds", "Age of each driver's anomaly model", ["driver_id"],
+      fn=lambda: {d: s["age_s"] for d, s in anomaly_detector.model_stats().items()})
+Gauge("f1_model_inference_seconds_per_message", "Mean model scoring time per message", ["driver_id"],
+      fn=lambda: {d: s["inference_us_per_message"] / 1e6 for d, s in anomaly_detector.model_stats().items()
+                  if s["inference_us_per_message"] is not None})
+Gauge("f1_event_loop_lag_max_seconds", "Largest event loop lag seen", fn=lambda: loop_monitor.max_lag)
+Gauge("f1_telemetry_store_pending_rows", "Rows waiting for the store's writer thread",
+      fn=lambda: telemetry_store.pending_rows)
 
 # Pydantic models
 class TelemetryData(BaseModel):
@@ -142,6 +138,7 @@ class ChatRequest(BaseModel):
 
 class ChatResponse(BaseModel):
     response: str
+    cached: bool = False
 
 @app.get("/")
 async def root():
@@ -151,79 +148,154 @@ async def root():
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
+@app.get("/api/stats")
+async def gateway_stats():
+    """Gateway counters: connections, tick frames, ingestion, loop lag, chat and summaries"""
+    return {
+        "connections": manager.get_stats(),
+        "frames": frame_stats.to_dict(),
+        "kafka": kafka_consumer.get_stats(),
+        "event_loop": loop_monitor.get_stats(),
+        "chat": chat_service.get_stats(),
+        "summaries": await driver_summarizer.get_summarization_stats(),
+        "store": telemetry_store.get_stats(),
+        "series": telemetry_series.get_stats(),
+        "laps": lap_segmenter.get_stats(),
+        "detection": anomaly_detector.get_stats(),
+        "models": anomaly_detector.model_stats(),
+        "fanout": fanout.get_stats(),
+        "snapshots": snapshotter.get_stats(),
+        "state_cache": state_cache.get_stats()
+    }
+
+@app.get("/api/drivers/{driver_id}/laps")
+async def driver_laps(driver_id: str):
+    """A driver's recent completed laps and the lap in progress"""
+    return {
+        "driver_id": driver_id,
+        "laps": lap_segmenter.recent_laps(driver_id),
+        "current": lap_segmenter.in_progress(driver_id)
+    }
+
+@app.get("/api/drivers/{driver_id}/telemetry")
+async def driver_telemetry(driver_id: str, start: Optional[str] = Query(None, alias="from"),
+                           end: Optional[str] = Query(None, alias="to"), lap: Optional[int] = None,
+                           points: Optional[int] = None, fields: Optional[str] = None,
+                           method: str = "lttb", shape: str = "speed_kph", session: Optional[str] = None):
+    """Recorded telemetry downsampled to at most ``points`` samples, as columnar JSON"""
+    try:
+        body = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: telemetry_series.series(
+                driver_id, start=start, end=end, lap=lap, points=points,
+                fields=fields.split(",") if fields else None, method=method, shape_field=shape, session=session
+            )
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(body, media_type="application/json")
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition"""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
 @app.post("/api/chat", response_model=ChatResponse)
 async def chat_with_ai(request: ChatRequest):
     """
     Chat endpoint for voice assistant using Gemini AI
     """
     try:
-        if GEMINI_AVAILABLE:
-            # Use Gemini to generate response
-            prompt = f"""You are an F1 race engineer AI assistant. You help with race strategy,
-            telemetry analysis, and provide tactical advice. Be concise and professional.
-
-            User message: {request.message}
-
-            Provide a helpful and concise response (max 2-3 sentences):"""
-
-            response = gemini_model.generate_content(prompt)
-            return ChatResponse(response=response.text)
-        else:
-            # Fallback responses when Gemini is not available
-            message_lower = request.message.lower()
-
-            if any(word in message_lower for word in ['fuel', 'refuel', 'gas']):
-                return ChatResponse(
-                    response="Current fuel levels are being monitored. Consider a pit stop if fuel drops below 15%."
-                )
-            elif any(word in message_lower for word in ['tire', 'tyre', 'pit']):
-                return ChatResponse(
-                    response="Tire degradation is within normal parameters. Recommended pit window is laps 18-22."
-                )
-            elif any(word in message_lower for word in ['speed', 'fast', 'pace']):
-                return ChatResponse(
-                    response="Current pace is competitive. Focus on maintaining consistent lap times and managing tire wear."
-                )
-            elif any(word in message_lower for word in ['position', 'overtake', 'pass']):
-                return ChatResponse(
-                    response="Monitor gap to car ahead. DRS available on main straight. Consider strategic positioning."
-                )
-            else:
-                return ChatResponse(
-                    response="I'm here to help with race strategy and analysis. What aspect would you like to discuss?"
-                )
+        text, cached = await chat_service.reply(request.message)
+        return ChatResponse(response=text, cached=cached)
+    except ChatTimeout as e:
+        logger.warning(f"Chat request timed out: {e}")
+        raise HTTPException(status_code=504, detail="Chat model timed out")
     except Exception as e:
         logger.error(f"Error in chat endpoint: {e}")
         raise HTTPException(status_code=500, detail="Error processing chat request")
 
+async def handle_client_message(websocket: WebSocket, message: Dict):
+    """Apply a subscription control message from a WebSocket client"""
+    message_type = message.get("type")
+
+    if message_type == "subscribe_driver":
+        # Legacy: add a driver's anomaly, summary and lap events to the feed
+        driver_id = message.get("driver_id")
+        if driver_id:
+            manager.subscribe(websocket, driver_id, DRIVER_CHANNELS)
+            await manager.send_personal_message(json.dumps({
+                "type": "subscribed",
+                "driver_id": driver_id
+            }), websocket)
+            await send_snapshot(websocket, [(channel, driver_id) for channel in DRIVER_CHANNELS])
+
+    elif message_type in ("subscribe", "unsubscribe"):
+        driver_id = message.get("driver_id") or ALL_DRIVERS
+        # A bare subscribe takes the default channels; a bare unsubscribe drops every channel
+        channels = list(message.get("channels") or (CHANNELS if message_type == "subscribe" else VALID_CHANNELS))
+        delta = message.get("encoding") == "delta"
+        if delta:
+            # Opt in to the delta-encoded telemetry stream instead of full frames
+            channels = ["telemetry_delta" if c == "telemetry" else c for c in channels]
+        if message_type == "subscribe":
+            channels = manager.subscribe(websocket, driver_id, channels)
+        else:
+            manager.unsubscribe(websocket, driver_id, channels)
+        await manager.send_personal_message(json.dumps({
+            "type": f"{message_type}d",
+            "driver_id": driver_id,
+            "channels": list(channels)
+        }), websocket)
+        if message_type == "subscribe":
+            await send_snapshot(websocket, [(channel, driver_id) for channel in channels])
+            if "telemetry_delta" in channels:
+                await send_keyframes(websocket, driver_id)
+
+    elif message_type == "keyframe":
+        # Client lost its place in the delta stream
+        await send_keyframes(websocket, message.get("driver_id"))
+
+async def send_snapshot(websocket: WebSocket, subscriptions: Optional[List] = None):
+    """Send a joining client the latest state its subscriptions (default: all of them) select"""
+    client = manager.active_connections.get(websocket)
+    if client is None:
+        return
+    snapshot = state_cache.snapshot(client.subscriptions if subscriptions is None else subscriptions)
+    if snapshot:
+        await manager.send_personal_message(snapshot, websocket)
+
+async def send_keyframes(websocket: WebSocket, driver_id: Optional[str]):
+    """Resynchronize one client's delta stream"""
+    for keyframe in delta_encoder.keyframes(driver_id):
+        await manager.send_personal_message(json.dumps(keyframe, separators=(",", ":")), websocket)
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+    # Full-grid feed: every driver's telemetry and the radio channel
+    await manager.connect(websocket, ALL_DRIVERS, GRID_CHANNELS)
+    await send_snapshot(websocket)
     try:
         while True:
             # Keep connection alive and handle incoming messages
             data = await websocket.receive_text()
-            message = json.loads(data)
-            
-            if message.get("type") == "subscribe_driver":
-                driver_id = message.get("driver_id")
-                if driver_id:
-                    await manager.connect(websocket, driver_id)
-                    await websocket.send_text(json.dumps({
-                        "type": "subscribed",
-                        "driver_id": driver_id
-                    }))
+            await handle_client_message(websocket, json.loads(data))
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket)
 
 @app.websocket("/ws/{driver_id}")
 async def websocket_driver_endpoint(websocket: WebSocket, driver_id: str):
-    await manager.connect(websocket, driver_id)
+    # Driver panel: every channel, but only for this driver
+    await manager.connect(websocket, driver_id, CHANNELS)
+    await send_snapshot(websocket)
     try:
         while True:
             data = await websocket.receive_text()
-            # Handle driver-specific messages
+            await handle_client_message(websocket, json.loads(data))
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket, driver_id)
 
 # Driver state tracking for consistent lap progression
@@ -295,6 +367,16 @@ def update_driver_position(driver_id, delta_time):
     state["last_update"] = datetime.now()
     return state
 
+def add_delta_event(frame: TickFrame, telemetry: Dict, anomaly_result: Optional[Dict]):
+    """Advance the delta stream and publish it if anyone is subscribed"""
+    event = delta_encoder.encode(telemetry, anomaly_result)
+    if event and manager.has_subscribers("telemetry_delta"):
+        frame.add(event, telemetry.get("driver_id"), channel="telemetry_delta")
+
+def add_remote_delta_event(frame: TickFrame, event: Dict):
+    """Delta-encode telemetry another replica ingested, for this replica's delta clients"""
+    add_delta_event(frame, event.get("data") or {}, event.get("anomaly"))
+
 # Background task to process Kafka messages
 async def process_kafka_messages():
     """Background task to consume Kafka messages and broadcast to WebSocket clients"""
@@ -307,12 +389,16 @@ async def process_kafka_messages():
     last_update_time = time.time()
 
     # Clear any old driver states that are not in allowed list
-    driver_states.clear()
+    for driver_id in [d for d in driver_states if d not in allowed_drivers]:
+        del driver_states[driver_id]
+
+    # Everything produced in one tick goes out as one frame per audience
+    frame = TickFrame()
 
     while True:
         try:
             # Check if Kafka consumer is available
-            if not kafka_consumer.telemetry_consumer:
+            if not kafka_consumer.connected:
                 current_time = time.time()
                 delta_time = current_time - last_update_time
                 last_update_time = current_time
@@ -340,21 +426,28 @@ async def process_kafka_messages():
                     # Detect anomalies (5% chance)
                     anomaly_result = None
                     if random.random() < 0.05:
+                        started = time.perf_counter()
                         anomaly_result = await anomaly_detector.detect_anomaly(mock_telemetry)
+                        DETECTION_SECONDS.observe(time.perf_counter() - started)
 
                     # Broadcast to all connections
-                    await manager.broadcast(json.dumps({
+                    frame.add({
                         "type": "telemetry",
                         "data": mock_telemetry,
                         "anomaly": anomaly_result
-                    }))
+                    }, driver_id)
+                    add_delta_event(frame, mock_telemetry, anomaly_result)
+                    telemetry_store.append(mock_telemetry)
+                    for lap in lap_segmenter.update(mock_telemetry):
+                        frame.add({"type": "lap", "data": lap}, driver_id)
 
                     # Broadcast to specific driver connections
                     if anomaly_result and anomaly_result.get("is_anomaly"):
-                        await manager.broadcast_to_driver(json.dumps({
+                        ANOMALIES.inc(labels=(driver_id,))
+                        frame.add_for_driver(driver_id, {
                             "type": "anomaly",
                             "data": anomaly_result
-                        }), driver_id)
+                        })
 
                 # Generate mock radio data at reduced frequency
                 if random.random() < 0.03:  # 3% chance per update cycle (slower updates)
@@ -384,56 +477,77 @@ async def process_kafka_messages():
                         "text": random.choice(radio_messages)
                     }
 
-                    await manager.broadcast(json.dumps({
+                    frame.add({
                         "type": "radio",
                         "data": mock_radio
-                    }))
+                    })
 
+                state_cache.record(frame)
+                await frame.flush(manager, frame_stats)
                 await asyncio.sleep(0.1)  # Update 10 times per second for smooth movement
                 continue
                 
-            # Get telemetry data from Kafka
-            telemetry_messages = await kafka_consumer.consume_telemetry()
-            for message in telemetry_messages:
-                # Detect anomalies
-                anomaly_result = await anomaly_detector.detect_anomaly(message)
+            # Get telemetry data from Kafka (polled on a background thread)
+            telemetry_messages = await kafka_consumer.consume_telemetry(timeout=0.1)
+            # Drop samples redelivered after a partition moved between replicas
+            telemetry_messages = fanout.fresh(telemetry_messages)
+            # Detect anomalies for the whole poll at once; worker processes
+            # start on it now and run alongside the store and lap work below
+            detection = anomaly_detector.detect_anomalies_batch(telemetry_messages)
+            # Recorded by the store's writer thread, not here
+            telemetry_store.extend(telemetry_messages)
+            # Completed laps, from running per-driver aggregates
+            for lap in lap_segmenter.update_batch(telemetry_messages):
+                frame.add({"type": "lap", "data": lap}, lap["driver_id"])
+            started = time.perf_counter()
+            anomaly_results = await detection
+            if telemetry_messages:
+                DETECTION_SECONDS.observe(time.perf_counter() - started)
+            for message, anomaly_result in zip(telemetry_messages, anomaly_results):
                 
                 # Broadcast to all connections
-                await manager.broadcast(json.dumps({
+                frame.add({
                     "type": "telemetry",
                     "data": message,
                     "anomaly": anomaly_result
-                }))
+                }, message.get("driver_id"))
+                add_delta_event(frame, message, anomaly_result)
                 
                 # Broadcast to specific driver connections
                 if anomaly_result and anomaly_result.get("is_anomaly"):
-                    await manager.broadcast_to_driver(json.dumps({
+                    ANOMALIES.inc(labels=(message["driver_id"],))
+                    frame.add_for_driver(message["driver_id"], {
                         "type": "anomaly",
                         "data": anomaly_result
-                    }), message["driver_id"])
+                    })
             
             # Get radio transcripts from Kafka
             radio_messages = await kafka_consumer.consume_radio()
             for message in radio_messages:
                 # Broadcast radio transcripts
-                await manager.broadcast(json.dumps({
+                frame.add({
                     "type": "radio",
                     "data": message
-                }))
+                })
                 
-                # Generate driver summary if significant
+                # Queue radio context for the driver's next coalesced summary
                 if message.get("text"):
-                    summary = await driver_summarizer.generate_summary(
-                        message["driver_id"], 
-                        message["text"]
-                    )
-                    if summary:
-                        await manager.broadcast_to_driver(json.dumps({
-                            "type": "summary",
-                            "data": summary
-                        }), message["driver_id"])
+                    driver_summarizer.request_summary(message["driver_id"], message["text"])
             
-            await asyncio.sleep(0.1)  # Small delay to prevent overwhelming
+            # Summaries finished since the last tick
+            for summary in driver_summarizer.pop_ready():
+                frame.add_for_driver(summary["driver_id"], {
+                    "type": "summary",
+                    "data": summary
+                })
+            
+            # Other replicas' drivers; only this replica's own events are published
+            fanout.publish(frame)
+            delta_clients = manager.has_subscribers("telemetry_delta")
+            fanout.drain_into(frame, (lambda event: add_remote_delta_event(frame, event))
+                              if delta_clients else None)
+            state_cache.record(frame)
+            await frame.flush(manager, frame_stats)
             
         except Exception as e:
             logger.error(f"Error processing Kafka messages: {e}")
@@ -443,14 +557,22 @@ async def process_kafka_messages():
 async def startup_event():
     """Initialize services and start background tasks"""
     logger.info("Starting F1 Race Engineer AI Gateway...")
+    loop_monitor.start()
+    telemetry_store.start()
     
-    # Initialize Kafka consumer (temporarily disabled for debugging)
+    # Initialize Kafka consumer (or the session replay standing in for it)
     try:
         await kafka_consumer.initialize()
         logger.info("Kafka consumer initialized successfully")
     except Exception as e:
         logger.warning(f"Kafka consumer initialization failed: {e}")
         logger.warning("Continuing without Kafka consumer...")
+
+    await fanout.start()
+
+    # Warm-start baselines from the last snapshot before any message is scored
+    await snapshotter.restore(anomaly_detector, driver_states)
+    snapshotter.start()
     
     # Start background task for processing messages
     asyncio.create_task(process_kafka_messages())
@@ -461,7 +583,17 @@ async def startup_event():
 async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("Shutting down F1 Race Engineer AI Gateway...")
+    await manager.close()
     await kafka_consumer.close()
+    await fanout.close()
+    # Final snapshot, while the detector's workers are still up
+    await snapshotter.close()
+    anomaly_detector.close()
+    await loop_monitor.stop()
+    chat_service.close()
+    await driver_summarizer.close()
+    # Joins the writer thread and writes the last block
+    await asyncio.get_running_loop().run_in_executor(None, telemetry_store.close)
 
 if __name__ == "__main__":
     uvicorn.run(
@@ -3,23 +3,41 @@ Anomaly Detection Service for F1 Race Engineer AI
 Detects driving anomalies using statistical methods and machine learning
 """
 
-import asyncio
 import logging
+import os
 import numpy as np
 from typing import Dict, Any, Optional, List
-from collections import defaultdict, deque
-from datetime import datetime, timedelta
-import json
+from collections import defaultdict
+
+from services.history_store import HistoryStore, parse_timestamp
+from services.position_baselines import PositionBaselines
+from services.rolling_stats import RollingWindowStats
 
 logger = logging.getLogger(__name__)
 
+# Feature columns of the history store and batch path, in extraction order
+FEATURE_COLUMNS = ["speed_kph", "throttle_pct", "brake_pct", "gear", "aggression", "efficiency"]
+RAW_FEATURES = ["speed_kph", "throttle_pct", "brake_pct", "gear"]
+
 class AnomalyDetector:
-    def __init__(self):
+    def __init__(self, history_size: Optional[int] = None):
         # Driver-specific baselines and history
         self.driver_baselines: Dict[str, Dict[str, Dict[str, float]]] = {}
-        self.driver_history: Dict[str, deque] = defaultdict(lambda: deque(maxlen=100))
+        self.history_size = history_size or int(os.getenv("ANOMALY_HISTORY_SIZE", "100"))
+        self.driver_history = HistoryStore(FEATURE_COLUMNS, window_size=self.history_size)
+        # Incremental window statistics, updated in O(1) per sample
+        self.driver_stats: Dict[str, RollingWindowStats] = defaultdict(
+            lambda: RollingWindowStats(self.history_size, FEATURE_COLUMNS)
+        )
+        # Baselines per sector and track-position bin, so corners are not
+        # judged against straights; the pooled window covers cells still filling
+        self.position_baselines = PositionBaselines(FEATURE_COLUMNS)
         self.anomaly_threshold = 2.5  # Z-score threshold
         self.min_samples_for_baseline = 10
+        # Drivers whose state changed since the last snapshot
+        self.dirty: set = set()
+        # Drivers whose rolling stats lag their window (advanced by the batch path)
+        self.stale_stats: set = set()
         
     async def detect_anomaly(self, telemetry_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Detect anomalies in telemetry data"""
@@ -34,13 +52,16 @@ class AnomalyDetector:
                 return None
                 
             # Add to driver history
-            self.driver_history[driver_id].append({
-                "timestamp": telemetry_data.get("ts"),
-                "features": features
-            })
+            self._sync_stats(driver_id)
+            row = [features.get(feature, np.nan) for feature in FEATURE_COLUMNS]
+            evicted = self.driver_history[driver_id].append(parse_timestamp(telemetry_data.get("ts")), row)
+            self.driver_stats[driver_id].push(row, evicted)
+            self.dirty.add(driver_id)
+            flat = self._position_cell(driver_id, telemetry_data)
             
             # Check if we have enough data for baseline
             if len(self.driver_history[driver_id]) < self.min_samples_for_baseline:
+                self._update_position(flat, row)
                 return None
                 
             # Update baseline if needed
@@ -49,6 +70,9 @@ class AnomalyDetector:
             # Detect anomalies
             anomalies = []
             baseline = self.driver_baselines.get(driver_id, {})
+            if flat is not None:
+                baseline = self._position_baseline(flat, baseline)
+            self._update_position(flat, row)
             
             for feature, value in features.items():
                 if feature in baseline:
@@ -83,6 +107,226 @@ class AnomalyDetector:
             logger.error(f"Error detecting anomaly: {e}")
             return None
     
+    def _position_cell(self, driver_id: str, telemetry_data: Dict[str, Any]) -> Optional[int]:
+        """Row of the sample's cell in the flattened position tables, None if unknown"""
+        if not self.position_baselines.enabled:
+            return None
+        cell = self.position_baselines.cell(telemetry_data)
+        if cell < 0:
+            return None
+        return self.position_baselines.slot(driver_id) * self.position_baselines.rows + cell
+
+    def _position_baseline(self, flat: int, baseline: Dict[str, Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+        """The pooled baseline with the position cell's mean and std swapped in where the cell is ready"""
+        pooled_mean = np.array([baseline[f]["mean"] if f in baseline else 0.0 for f in FEATURE_COLUMNS])
+        pooled_std = np.array([baseline[f]["std"] if f in baseline else 0.0 for f in FEATURE_COLUMNS])
+        mean, std = self.position_baselines.baseline(np.array([flat]), pooled_mean[None], pooled_std[None])
+        return {
+            feature: dict(baseline[feature], mean=float(mean[0, col]), std=float(std[0, col]))
+            for col, feature in enumerate(FEATURE_COLUMNS) if feature in baseline
+        }
+
+    def _update_position(self, flat: Optional[int], row: List[float]):
+        if flat is not None:
+            self.position_baselines.update(np.array([flat]), np.array([row], dtype=np.float64))
+
+    async def detect_anomalies_batch(self, messages: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """Detect anomalies for a whole batch of telemetry messages.
+
+        Messages are grouped by driver and scored with NumPy against the
+        rolling window as it stood when each message arrived, so results match
+        calling ``detect_anomaly`` on every message in order.
+        """
+        return self.detect_batch(messages)
+
+    def detect_batch(self, messages: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """Synchronous ``detect_anomalies_batch``, for callers without an event loop"""
+        results: List[Optional[Dict[str, Any]]] = [None] * len(messages)
+        try:
+            if not messages:
+                return results
+
+            matrix = self._extract_feature_matrix(messages)
+            has_features = ~np.isnan(matrix).all(axis=1)
+
+            by_driver: Dict[str, List[int]] = defaultdict(list)
+            for i, message in enumerate(messages):
+                driver_id = message.get("driver_id")
+                if driver_id and has_features[i]:
+                    by_driver[driver_id].append(i)
+
+            if by_driver:
+                self._detect_drivers(list(by_driver), list(by_driver.values()), messages, matrix, results)
+
+        except Exception as e:
+            logger.error(f"Error detecting anomalies in batch: {e}")
+
+        return results
+
+    def _extract_feature_matrix(self, messages: List[Dict[str, Any]]) -> np.ndarray:
+        """Pack raw features into an (n, len(FEATURE_COLUMNS)) array, NaN where missing"""
+        nan = float("nan")
+        raw = np.array(
+            [[float(m[k]) if k in m else nan for k in RAW_FEATURES] for m in messages],
+            dtype=np.float64
+        ).reshape(len(messages), len(RAW_FEATURES))
+
+        speed, throttle, brake = raw[:, 0], raw[:, 1], raw[:, 2]
+        aggression = throttle + brake
+        efficiency = np.full(len(messages), np.nan)
+        has_both = ~np.isnan(speed) & ~np.isnan(throttle)
+        positive = has_both & (throttle > 0)
+        efficiency[has_both] = 0.0
+        efficiency[positive] = speed[positive] / throttle[positive]
+
+        return np.column_stack([raw, aggression, efficiency])
+
+    def _detect_drivers(self, driver_ids: List[str], groups: List[List[int]], messages: List[Dict[str, Any]],
+                        matrix: np.ndarray, results: List[Optional[Dict[str, Any]]]):
+        """Score every driver's slice of a batch in one pass and advance their windows.
+
+        Each driver's prior window and new rows form one segment of a single
+        stacked array. Only the rows that enter or leave a window during the
+        batch go through a cumulative sum; the prior rows every window of the
+        batch covers are added as one per-segment total, so the cost follows
+        the batch size rather than ``drivers * history_size``.
+        """
+        window = self.history_size
+        priors = [self.driver_history[driver_id].features() for driver_id in driver_ids]
+        prior_len = np.array([len(prior) for prior in priors])
+        counts = np.array([len(group) for group in groups])
+        rows = np.concatenate(groups)
+        block = matrix[rows]
+        features = block.shape[1]
+
+        # Segment layout: [prior_0, block_0, prior_1, block_1, ...]
+        seg_len = prior_len + counts
+        seg_start = np.cumsum(seg_len) - seg_len
+        block_start = np.cumsum(counts) - counts
+        row_driver = np.repeat(np.arange(len(driver_ids)), counts)
+        row_offset = np.arange(len(rows)) - block_start[row_driver]
+        pieces = []
+        for prior, first, count in zip(priors, block_start, counts):
+            pieces.append(prior)
+            pieces.append(block[first:first + count])
+        # Copies the prior windows before the ring buffers are written below
+        combined = np.concatenate(pieces)
+
+        # Per row: centered values, their squares and valid flags, zero where NaN
+        valid = ~np.isnan(combined)
+        stacked = np.zeros((len(combined), 3 * features))
+        centered, squared = stacked[:, :features], stacked[:, features:2 * features]
+        stacked[:, 2 * features:] = valid
+        np.copyto(centered, combined, where=valid)
+        # Shift each segment by its mean to keep the sum-of-squares numerically stable
+        seg_sums = np.add.reduceat(stacked, seg_start, axis=0)
+        shift = seg_sums[:, :features] / np.maximum(seg_sums[:, 2 * features:], 1)
+        np.subtract(combined, np.repeat(shift, seg_len, axis=0), out=centered, where=valid)
+        np.multiply(centered, centered, out=squared)
+
+        # Rows [0, head) of a segment leave some window of the batch; prior
+        # rows [head, prior_len) sit inside all of them
+        head = np.minimum(np.maximum(prior_len + counts - window, 0), prior_len)
+        inner_start, inner_end = seg_start + head, seg_start + prior_len
+        inner = np.add.reduceat(stacked, np.column_stack([inner_start, inner_end]).ravel(), axis=0)[::2]
+        inner[inner_start == inner_end] = 0.0
+        marks = np.zeros(len(combined) + 1, dtype=np.intp)
+        np.add.at(marks, inner_start, 1)
+        np.add.at(marks, inner_end, -1)
+        kept = np.cumsum(marks[:-1]) == 0
+        prefix = np.zeros((int(kept.sum()) + 1, stacked.shape[1]))
+        np.cumsum(stacked[kept], axis=0, out=prefix[1:])
+
+        # Window of block row k: segment rows [max(prior_len + k + 1 - window, 0), prior_len + k + 1)
+        kept_len = head + counts
+        kept_start = (np.cumsum(kept_len) - kept_len)[row_driver]
+        end = kept_start + head[row_driver] + row_offset + 1
+        start = kept_start + np.maximum(prior_len[row_driver] + row_offset + 1 - window, 0)
+        sums = prefix[end] - prefix[start] + inner[row_driver]
+        csum, csq, count = sums[:, :features], sums[:, features:2 * features], sums[:, 2 * features:]
+        safe_count = np.maximum(count, 1)
+        mean_c = csum / safe_count
+        var = np.maximum(csq / safe_count - mean_c * mean_c, 0.0)
+        std = np.where(count >= 2, np.sqrt(var), 0.0)
+        mean = mean_c + shift[row_driver]
+
+        if self.position_baselines.enabled:
+            # Each row sees its cell with the batch's earlier rows already merged, as the scalar path does
+            slots = np.array([self.position_baselines.slot(driver_id) for driver_id in driver_ids])
+            flat = self.position_baselines.flat_cells(slots[row_driver], self.position_baselines.cells(messages, rows))
+            mean, std = self.position_baselines.score_update(flat, block, mean, std)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z = np.where(std > 0, (block - mean) / std, 0.0)
+
+        history_len = np.minimum(prior_len[row_driver] + row_offset + 1, window)
+        ready = history_len >= self.min_samples_for_baseline
+        flagged = ready[:, None] & ~np.isnan(block) & (np.abs(z) > self.anomaly_threshold)
+
+        for row in np.flatnonzero(flagged.any(axis=1)):
+            message = messages[rows[row]]
+            anomalies = []
+            for col in np.flatnonzero(flagged[row]):
+                z_score = float(z[row, col])
+                anomalies.append({
+                    "feature": FEATURE_COLUMNS[col],
+                    "value": float(block[row, col]),
+                    "baseline": float(mean[row, col]),
+                    "z_score": z_score,
+                    "score": abs(z_score)
+                })
+            top_anomaly = max(anomalies, key=lambda x: x["score"])
+            results[rows[row]] = {
+                "is_anomaly": True,
+                "driver_id": driver_ids[row_driver[row]],
+                "timestamp": message.get("ts"),
+                "anomalies": anomalies,
+                "top_anomaly": top_anomaly,
+                "confidence": min(top_anomaly["score"] / 5.0, 1.0)
+            }
+
+        self._advance_windows(driver_ids, groups, messages, rows, block, positions=False)
+
+    def _advance_windows(self, driver_ids: List[str], groups: List[List[int]], messages: List[Dict[str, Any]],
+                         rows: np.ndarray, block: np.ndarray, positions: bool = True):
+        """Append each driver's batch rows (``block``, in ``groups`` order) to its window and position table.
+
+        ``positions=False`` skips the position table, for callers that
+        merged the rows while scoring them. Rolling stats and
+        ``driver_baselines`` are left stale and rebuilt
+        from the window when the scalar path or ``get_driver_stats`` next
+        needs them.
+        """
+        if positions and self.position_baselines.enabled:
+            slots = np.repeat([self.position_baselines.slot(d) for d in driver_ids], [len(g) for g in groups])
+            self.position_baselines.update(
+                self.position_baselines.flat_cells(slots, self.position_baselines.cells(messages, rows)), block)
+
+        timestamps = np.array([parse_timestamp(messages[i].get("ts")) for i in rows])
+        first = 0
+        for driver_id, group in zip(driver_ids, groups):
+            last = first + len(group)
+            self.driver_history[driver_id].extend(timestamps[first:last], block[first:last])
+            first = last
+        self.stale_stats.update(driver_ids)
+        self.dirty.update(driver_ids)
+
+    def _sync_stats(self, driver_id: str):
+        """Rebuild a driver's rolling stats and baseline from its window after batch updates"""
+        if driver_id not in self.stale_stats:
+            return
+        self.stale_stats.discard(driver_id)
+        stats = self.driver_stats[driver_id]
+        stats.clear()
+        history = self.driver_history.get(driver_id)
+        if history is not None:
+            for row in history.features():
+                stats.push(row)
+        if len(stats) >= self.min_samples_for_baseline:
+            self.driver_baselines[driver_id] = stats.snapshot()
+        else:
+            self.driver_baselines.pop(driver_id, None)
+
     def _extract_features(self, telemetry_data: Dict[str, Any]) -> Dict[str, float]:
         """Extract relevant features for anomaly detection"""
         features = {}
@@ -117,40 +361,14 @@ class AnomalyDetector:
         return features
     
     async def _update_baseline(self, driver_id: str):
-        """Update baseline statistics for a driver"""
+        """Update baseline statistics for a driver from the rolling window"""
         try:
-            history = list(self.driver_history[driver_id])
-            if len(history) < self.min_samples_for_baseline:
+            window = self.driver_stats.get(driver_id)
+            if window is None or len(window) < self.min_samples_for_baseline:
                 return
-                
-            # Extract all features from history
-            all_features = defaultdict(list)
-            for entry in history:
-                for feature, value in entry["features"].items():
-                    all_features[feature].append(value)
-            
-            # Calculate baseline statistics
-            baseline = {}
-            for feature, values in all_features.items():
-                if len(values) > 1:  # Need at least 2 values for std
-                    baseline[feature] = {
-                        "mean": np.mean(values),
-                        "std": np.std(values),
-                        "min": np.min(values),
-                        "max": np.max(values),
-                        "count": len(values)
-                    }
-                else:
-                    baseline[feature] = {
-                        "mean": values[0] if values else 0,
-                        "std": 0,
-                        "min": values[0] if values else 0,
-                        "max": values[0] if values else 0,
-                        "count": len(values)
-                    }
-            
-            self.driver_baselines[driver_id] = baseline
-            
+
+            self.driver_baselines[driver_id] = window.snapshot()
+
         except Exception as e:
             logger.error(f"Error updating baseline for driver {driver_id}: {e}")
     
@@ -172,8 +390,10 @@ class AnomalyDetector:
     async def get_driver_stats(self, driver_id: str) -> Dict[str, Any]:
         """Get current statistics for a driver"""
         try:
+            self._sync_stats(driver_id)
             baseline = self.driver_baselines.get(driver_id, {})
-            history_count = len(self.driver_history[driver_id])
+            history = self.driver_history.get(driver_id)
+            history_count = len(history) if history is not None else 0
             
             return {
                 "driver_id": driver_id,
@@ -193,6 +413,66 @@ class AnomalyDetector:
                 del self.driver_baselines[driver_id]
             if driver_id in self.driver_history:
                 self.driver_history[driver_id].clear()
+            if driver_id in self.driver_stats:
+                self.driver_stats[driver_id].clear()
+            self.position_baselines.clear(driver_id)
+            self.stale_stats.discard(driver_id)
+            self.dirty.add(driver_id)
             logger.info(f"Reset baseline for driver {driver_id}")
         except Exception as e:
             logger.error(f"Error resetting baseline for driver {driver_id}: {e}")
+
+    def snapshot_state(self, dirty_only: bool = True) -> Dict[str, Dict[str, np.ndarray]]:
+        """Copies of each driver's window and position table, for snapshots.
+
+        Everything else (rolling stats, baselines) is rebuilt from these.
+        """
+        drivers = list(self.dirty) if dirty_only else list(self.driver_history)
+        self.dirty.clear()
+        states = {}
+        for driver_id in drivers:
+            history = self.driver_history.get(driver_id)
+            state = {
+                "timestamps": history.timestamps().copy() if history is not None else np.empty(0),
+                "features": history.features().copy() if history is not None
+                else np.empty((0, len(FEATURE_COLUMNS)))
+            }
+            table = self.position_baselines.table(driver_id)
+            if table is not None:
+                state["position_count"], state["position_mean"], state["position_m2"] = table
+            states[driver_id] = state
+        return states
+
+    def restore_state(self, states: Dict[str, Dict[str, np.ndarray]]):
+        """Load ``snapshot_state`` output and rebuild stats and baselines from it"""
+        for driver_id, state in states.items():
+            features = state["features"]
+            if features.ndim != 2 or features.shape[1] != len(FEATURE_COLUMNS) or not len(features):
+                continue
+            history = self.driver_history[driver_id]
+            history.clear()
+            history.extend(state["timestamps"][-self.history_size:], features[-self.history_size:])
+            self.stale_stats.add(driver_id)
+            self._sync_stats(driver_id)
+
+            table = tuple(state.get(key) for key in ("position_count", "position_mean", "position_m2"))
+            expected = (self.position_baselines.rows, len(FEATURE_COLUMNS))
+            if all(a is not None and a.shape == expected for a in table):
+                self.position_baselines.set_table(driver_id, table)
+
+    async def export_state(self, dirty_only: bool = True) -> Dict[str, Dict[str, np.ndarray]]:
+        return self.snapshot_state(dirty_only)
+
+    async def import_state(self, states: Dict[str, Dict[str, np.ndarray]]):
+        self.restore_state(states)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"mode": "inline", "drivers": len(self.driver_history),
+                "position_baselines": self.position_baselines.get_stats()}
+
+    def model_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-driver model statistics; the z-score detector has no models"""
+        return {}
+
+    def close(self):
+        pass
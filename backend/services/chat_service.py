@@ -0,0 +1,230 @@
+"""
+Chat Service for F1 Race Engineer AI
+Off-loop, cached and concurrency-bounded replies for the voice assistant
+"""
+
+import asyncio
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Tuple
+
+# Gemini API integration
+try:
+    import google.generativeai as genai
+    GEMINI_AVAILABLE = True
+except ImportError:
+    GEMINI_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+CHAT_PROMPT = """You are an F1 race engineer AI assistant. You help with race strategy,
+            telemetry analysis, and provide tactical advice. Be concise and professional.
+
+            User message: {message}
+
+            Provide a helpful and concise response (max 2-3 sentences):"""
+
+
+class ChatTimeout(Exception):
+    """The model did not answer before the request deadline"""
+
+
+def normalize_message(message: str) -> str:
+    """Cache key for a chat message: lower case, punctuation stripped, single spaces"""
+    return " ".join(re.sub(r"[^\w\s]", " ", message.lower()).split())
+
+
+class ResponseCache:
+    """LRU cache whose entries also expire ``ttl`` seconds after insertion"""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: str):
+        if self.max_entries <= 0:
+            return
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class StubChatModel:
+    """Local keyword-matching model; ``latency`` seconds simulates an LLM round trip"""
+
+    name = "stub"
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+
+    def generate(self, message: str) -> str:
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+        message_lower = message.lower()
+        if any(word in message_lower for word in ['fuel', 'refuel', 'gas']):
+            return "Current fuel levels are being monitored. Consider a pit stop if fuel drops below 15%."
+        elif any(word in message_lower for word in ['tire', 'tyre', 'pit']):
+            return "Tire degradation is within normal parameters. Recommended pit window is laps 18-22."
+        elif any(word in message_lower for word in ['speed', 'fast', 'pace']):
+            return "Current pace is competitive. Focus on maintaining consistent lap times and managing tire wear."
+        elif any(word in message_lower for word in ['position', 'overtake', 'pass']):
+            return "Monitor gap to car ahead. DRS available on main straight. Consider strategic positioning."
+        return "I'm here to help with race strategy and analysis. What aspect would you like to discuss?"
+
+
+class GeminiChatModel:
+    """Blocking Gemini client; always called from the chat worker threads"""
+
+    name = "gemini"
+
+    def __init__(self, api_key: str):
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel('gemini-pro')
+
+    def generate(self, message: str) -> str:
+        response = self.model.generate_content(CHAT_PROMPT.format(message=message))
+        return response.text
+
+
+def create_chat_model():
+    """Pick the chat backend from CHAT_MODEL (gemini | stub), defaulting to Gemini when configured"""
+    choice = os.getenv("CHAT_MODEL", "").lower()
+    api_key = os.getenv("GEMINI_API_KEY")
+    if choice != "stub" and GEMINI_AVAILABLE and api_key:
+        try:
+            model = GeminiChatModel(api_key)
+            logger.info("Gemini chat model initialized successfully")
+            return model
+        except Exception as e:
+            logger.error(f"Failed to initialize Gemini chat model: {e}")
+    elif choice == "gemini":
+        logger.warning("CHAT_MODEL=gemini but Gemini is not available, using stub model")
+    return StubChatModel(latency=float(os.getenv("CHAT_STUB_LATENCY_MS", "0")) / 1000)
+
+
+class ChatService:
+    """Answers chat messages without ever blocking the event loop.
+
+    The model runs on a dedicated thread pool of ``max_concurrency`` workers,
+    guarded by a semaphore so excess requests wait instead of piling up
+    threads. Each request has a deadline covering both the wait and the
+    model call; a call whose every caller has given up is cancelled if it
+    has not reached the model yet. Identical (normalized) messages share one
+    in-flight call, and answers are kept in an LRU+TTL cache.
+    """
+
+    def __init__(self, model=None, max_concurrency: Optional[int] = None, timeout: Optional[float] = None,
+                 cache_size: Optional[int] = None, cache_ttl: Optional[float] = None):
+        self.model = model or create_chat_model()
+        self.max_concurrency = max_concurrency or int(os.getenv("CHAT_MAX_CONCURRENCY", "4"))
+        self.timeout = timeout or float(os.getenv("CHAT_TIMEOUT", "10"))
+        self.cache = ResponseCache(
+            cache_size if cache_size is not None else int(os.getenv("CHAT_CACHE_SIZE", "256")),
+            cache_ttl if cache_ttl is not None else float(os.getenv("CHAT_CACHE_TTL", "30"))
+        )
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="chat")
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.in_flight: Dict[str, asyncio.Future] = {}
+        self.waiters: Dict[str, int] = {}
+
+        self.requests = 0
+        self.cache_hits = 0
+        self.shared = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.model_calls = 0
+        self.model_time = 0.0
+
+    async def reply(self, message: str) -> Tuple[str, bool]:
+        """Answer ``message``; returns (text, served_from_cache)"""
+        self.requests += 1
+        key = normalize_message(message)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.cache_hits += 1
+            return cached, True
+
+        pending = self.in_flight.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._generate(key, message))
+            self.in_flight[key] = pending
+            self.waiters[key] = 0
+            pending.add_done_callback(lambda future: self._finished(key, future))
+        else:
+            self.shared += 1
+
+        self.waiters[key] += 1
+        try:
+            async with asyncio.timeout(self.timeout):
+                return await asyncio.shield(pending), False
+        except TimeoutError:
+            self.timeouts += 1
+            raise ChatTimeout(f"No chat response within {self.timeout}s")
+        finally:
+            if key in self.waiters:
+                self.waiters[key] -= 1
+                if self.waiters[key] == 0 and not pending.done():
+                    # Nobody is waiting any more: shed the call if it is still queued
+                    pending.cancel()
+
+    def _finished(self, key: str, future: asyncio.Future):
+        self.in_flight.pop(key, None)
+        self.waiters.pop(key, None)
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"Chat model error: {future.exception()}")
+
+    async def _generate(self, key: str, message: str) -> str:
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self.semaphore:
+            start = time.perf_counter()
+            try:
+                text = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, self.model.generate, message
+                )
+            except Exception:
+                self.errors += 1
+                raise
+            finally:
+                self.model_calls += 1
+                self.model_time += time.perf_counter() - start
+        self.cache.put(key, text)
+        return text
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.model.name,
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "shared_in_flight": self.shared,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "model_calls": self.model_calls,
+            "avg_model_ms": round(self.model_time / self.model_calls * 1000, 2) if self.model_calls else 0.0,
+            "in_flight": len(self.in_flight),
+            "cached_entries": len(self.cache)
+        }
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,270 @@
+"""
+WebSocket Connection Manager for F1 Race Engineer AI
+Per-client bounded send queues with slow-consumer isolation
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict, defaultdict
+from itertools import count
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from fastapi import WebSocket
+
+from services.metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+FRAMES_SENT = Counter("f1_ws_frames_sent_total", "Frames written to WebSocket clients")
+FRAMES_DROPPED = Counter("f1_ws_frames_dropped_total", "Frames dropped before sending", ["reason"])
+SEND_ERRORS = Counter("f1_ws_send_errors_total", "WebSocket sends that failed or timed out")
+EVENT_TO_SEND_SECONDS = Histogram("f1_event_to_send_seconds",
+                                  "Oldest event-time ts in a frame to the frame being written to a client")
+
+# Overflow policies for a client whose queue is full
+DROP_OLDEST = "drop_oldest"
+LATEST_PER_DRIVER = "latest_per_driver"
+DISCONNECT = "disconnect"
+OVERFLOW_POLICIES = (DROP_OLDEST, LATEST_PER_DRIVER, DISCONNECT)
+
+# Subscription channels; ALL_DRIVERS subscribes a channel for every driver.
+# CHANNELS is the default set. "telemetry_delta", the delta-encoded form of
+# "telemetry", is only subscribed when a client asks for it.
+CHANNELS = ("telemetry", "anomaly", "radio", "summary", "lap")
+OPT_IN_CHANNELS = ("telemetry_delta",)
+VALID_CHANNELS = CHANNELS + OPT_IN_CHANNELS
+ALL_DRIVERS = "*"
+
+
+class ClientConnection:
+    """One WebSocket with its own outbound queue and writer task.
+
+    Frames are held in insertion order. Keyed frames (e.g. telemetry keyed
+    by driver) can be replaced in place under the ``latest_per_driver``
+    policy so a slow client only ever has the newest frame per driver
+    pending.
+    """
+
+    def __init__(self, websocket: WebSocket, manager: "ConnectionManager",
+                 max_queue: int, overflow_policy: str, send_timeout: float):
+        self.websocket = websocket
+        self.manager = manager
+        self.max_queue = max_queue
+        self.overflow_policy = overflow_policy
+        self.send_timeout = send_timeout
+        # (frame, event time of its oldest event or None) in send order
+        self.queue: "OrderedDict[object, Tuple[str, Optional[float]]]" = OrderedDict()
+        self.ready = asyncio.Event()
+        self.closed = False
+        self.sent = 0
+        self.dropped = 0
+        self._seq = count()
+        self.writer_task: Optional[asyncio.Task] = None
+        self.subscriptions: Set[Tuple[str, str]] = set()
+
+    def start(self):
+        self.writer_task = asyncio.create_task(self._writer())
+
+    def enqueue(self, message: str, key: Optional[str] = None, event_time: Optional[float] = None) -> bool:
+        """Queue a frame without waiting; returns False if the client is gone"""
+        if self.closed:
+            return False
+
+        if key is not None and self.overflow_policy == LATEST_PER_DRIVER:
+            queue_key = ("latest", key)
+            if queue_key in self.queue:
+                self.queue[queue_key] = (message, event_time)
+                self.dropped += 1
+                FRAMES_DROPPED.inc(labels=("superseded",))
+                return True
+        else:
+            queue_key = next(self._seq)
+
+        if len(self.queue) >= self.max_queue:
+            if self.overflow_policy == DISCONNECT:
+                logger.warning("WebSocket client too slow, disconnecting")
+                FRAMES_DROPPED.inc(len(self.queue) + 1, labels=("disconnect",))
+                self.manager.disconnect(self.websocket)
+                return False
+            self.queue.popitem(last=False)
+            self.dropped += 1
+            FRAMES_DROPPED.inc(labels=("overflow",))
+
+        self.queue[queue_key] = (message, event_time)
+        self.ready.set()
+        return True
+
+    async def _writer(self):
+        try:
+            while not self.closed:
+                await self.ready.wait()
+                while self.queue and not self.closed:
+                    _, (message, event_time) = self.queue.popitem(last=False)
+                    async with asyncio.timeout(self.send_timeout):
+                        await self.websocket.send_text(message)
+                    self.sent += 1
+                    FRAMES_SENT.inc()
+                    if event_time is not None:
+                        EVENT_TO_SEND_SECONDS.observe(time.time() - event_time)
+                self.ready.clear()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            SEND_ERRORS.inc()
+            logger.error(f"Error sending to WebSocket client, evicting: {e}")
+            self.manager.disconnect(self.websocket)
+            try:
+                await self.websocket.close()
+            except Exception:
+                pass
+
+    def close(self):
+        self.closed = True
+        self.queue.clear()
+        if self.writer_task and self.writer_task is not asyncio.current_task():
+            self.writer_task.cancel()
+
+
+class ConnectionManager:
+    """Tracks WebSocket clients and routes frames by (channel, driver) subscription.
+
+    ``subscriptions`` maps ``(channel, driver_id)`` to the set of clients that
+    asked for it, with ``ALL_DRIVERS`` as a wildcard driver. Clients with the
+    same subscription set are also kept together in ``signature_groups`` so a
+    tick is routed once per distinct subscription set rather than once per
+    client, and only the matching groups' sockets are touched.
+    """
+
+    def __init__(self, max_queue: Optional[int] = None, overflow_policy: Optional[str] = None,
+                 send_timeout: Optional[float] = None):
+        self.max_queue = max_queue or int(os.getenv("WS_SEND_QUEUE_SIZE", "256"))
+        self.overflow_policy = overflow_policy or os.getenv("WS_OVERFLOW_POLICY", DROP_OLDEST)
+        if self.overflow_policy not in OVERFLOW_POLICIES:
+            logger.warning(f"Unknown WS_OVERFLOW_POLICY {self.overflow_policy!r}, using {DROP_OLDEST}")
+            self.overflow_policy = DROP_OLDEST
+        self.send_timeout = send_timeout or float(os.getenv("WS_SEND_TIMEOUT", "5"))
+        self.active_connections: Dict[WebSocket, ClientConnection] = {}
+        self.subscriptions: Dict[Tuple[str, str], Set[ClientConnection]] = defaultdict(set)
+        self.signature_groups: Dict[FrozenSet[Tuple[str, str]], Set[ClientConnection]] = {}
+
+    async def connect(self, websocket: WebSocket, driver_id: Optional[str] = None,
+                      channels: Iterable[str] = ()):
+        """Accept a socket and subscribe it to ``channels`` for ``driver_id``"""
+        if websocket not in self.active_connections:
+            await websocket.accept()
+            client = ClientConnection(websocket, self, self.max_queue,
+                                      self.overflow_policy, self.send_timeout)
+            self.active_connections[websocket] = client
+            client.start()
+            logger.info(f"WebSocket connected. Total connections: {len(self.active_connections)}")
+        if channels:
+            self.subscribe(websocket, driver_id or ALL_DRIVERS, channels)
+
+    def subscribe(self, websocket: WebSocket, driver_id: str, channels: Iterable[str] = CHANNELS) -> List[str]:
+        """Add subscriptions; returns the channels that were valid"""
+        client = self.active_connections.get(websocket)
+        if client is None:
+            return []
+        accepted = [channel for channel in channels if channel in VALID_CHANNELS]
+        self._leave_group(client)
+        for channel in accepted:
+            self.subscriptions[(channel, driver_id)].add(client)
+            client.subscriptions.add((channel, driver_id))
+        self._join_group(client)
+        return accepted
+
+    def unsubscribe(self, websocket: WebSocket, driver_id: str, channels: Iterable[str] = VALID_CHANNELS):
+        client = self.active_connections.get(websocket)
+        if client is None:
+            return
+        self._leave_group(client)
+        for channel in channels:
+            self._remove_subscription(client, (channel, driver_id))
+        self._join_group(client)
+
+    def _remove_subscription(self, client: ClientConnection, entry: Tuple[str, str]):
+        members = self.subscriptions.get(entry)
+        if members is not None:
+            members.discard(client)
+            if not members:
+                del self.subscriptions[entry]
+        client.subscriptions.discard(entry)
+
+    def _leave_group(self, client: ClientConnection):
+        signature = frozenset(client.subscriptions)
+        group = self.signature_groups.get(signature)
+        if group is not None:
+            group.discard(client)
+            if not group:
+                del self.signature_groups[signature]
+
+    def _join_group(self, client: ClientConnection):
+        if client.subscriptions:
+            self.signature_groups.setdefault(frozenset(client.subscriptions), set()).add(client)
+
+    def disconnect(self, websocket: WebSocket, driver_id: Optional[str] = None):
+        """Forget a socket and all of its subscriptions; safe to call more than once"""
+        client = self.active_connections.pop(websocket, None)
+        if client is None:
+            return
+        client.close()
+        self._leave_group(client)
+        for entry in list(client.subscriptions):
+            self._remove_subscription(client, entry)
+        logger.info(f"WebSocket disconnected. Total connections: {len(self.active_connections)}")
+
+    def has_subscribers(self, channel: str) -> bool:
+        return any(entry[0] == channel for entry in self.subscriptions)
+
+    def route(self, events: List[Tuple[str, str]]) -> Dict[Tuple[int, ...], List[ClientConnection]]:
+        """Group clients by the subset of ``(channel, driver_id)`` events they receive.
+
+        Returns a mapping from event indices to the clients that want exactly
+        those events, so each distinct frame is only encoded once.
+        """
+        groups: Dict[Tuple[int, ...], List[ClientConnection]] = {}
+        for signature, clients in self.signature_groups.items():
+            indices = tuple(
+                index for index, (channel, driver_id) in enumerate(events)
+                if (channel, driver_id) in signature or (channel, ALL_DRIVERS) in signature
+            )
+            if indices:
+                groups.setdefault(indices, []).extend(clients)
+        return groups
+
+    def send_frame(self, clients: Iterable[ClientConnection], message: str, key: Optional[str] = None,
+                   event_time: Optional[float] = None):
+        """Queue one pre-encoded frame for each client"""
+        for client in clients:
+            client.enqueue(message, key, event_time)
+
+    async def send_personal_message(self, message: str, websocket: WebSocket):
+        client = self.active_connections.get(websocket)
+        if client:
+            client.enqueue(message)
+
+    async def broadcast(self, message: str, key: Optional[str] = None):
+        """Queue a frame for every client; never waits on a socket"""
+        self.send_frame(list(self.active_connections.values()), message, key)
+
+    async def broadcast_to_driver(self, message: str, driver_id: str, channel: str = "anomaly"):
+        """Queue a frame for the clients subscribed to ``channel`` for ``driver_id``"""
+        clients = self.subscriptions.get((channel, driver_id), set()) | \
+            self.subscriptions.get((channel, ALL_DRIVERS), set())
+        self.send_frame(clients, message)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Connection and queue counters for health reporting"""
+        clients = list(self.active_connections.values())
+        return {
+            "connections": len(clients),
+            "subscriptions": sum(len(members) for members in self.subscriptions.values()),
+            "queued_frames": sum(len(c.queue) for c in clients),
+            "dropped_frames": sum(c.dropped for c in clients)
+        }
+
+    async def close(self):
+        for websocket in list(self.active_connections):
+            self.disconnect(websocket)
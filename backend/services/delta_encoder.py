@@ -0,0 +1,139 @@
+"""
+Telemetry Delta Encoder for F1 Race Engineer AI
+Sends only the fields that changed since the previous frame, with keyframes
+"""
+
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def shift_timestamp(value: str, milliseconds: float) -> str:
+    """An ISO timestamp moved by ``milliseconds``, formatted the way ``isoformat`` does"""
+    return (datetime.fromisoformat(value) + timedelta(microseconds=round(milliseconds * 1000))).isoformat()
+
+
+def _ts_shift(value: Any, old: Any) -> Optional[float]:
+    """Milliseconds from ``old`` to ``value`` if shifting ``old`` by them gives back ``value``, else None"""
+    if not isinstance(value, str) or not isinstance(old, str):
+        return None
+    try:
+        new_time, old_time = datetime.fromisoformat(value), datetime.fromisoformat(old)
+        if new_time.utcoffset() != old_time.utcoffset():
+            return None
+        shift = (new_time - old_time) / timedelta(microseconds=1) / 1000
+        # Clients rebuild the string from the old one, so it has to round-trip exactly
+        if shift_timestamp(old, shift) != value:
+            return None
+    except (TypeError, ValueError):
+        return None
+    return shift
+
+
+class TelemetryDeltaEncoder:
+    """Per-driver delta stream shared by every delta-mode subscriber.
+
+    A keyframe (``k``) carries the field schema (``f``) and every value
+    (``v``); a delta carries only ``{field_index: value}`` (``c``) for fields
+    whose value changed. A changed ``ts`` is sent as the milliseconds since
+    the previous frame's (``t``), as long as formatting the shifted time
+    reproduces the new string exactly; any other changed string that shares
+    a long prefix with its previous value is sent as ``[prefix_length,
+    suffix]``. Each frame has a per-driver
+    sequence number (``s``) so a client that sees a gap (for example after
+    its send queue dropped frames) asks for a keyframe and resynchronizes.
+    Numbers are passed through untouched, so decoding is lossless.
+
+    Keyframe::
+
+        {"type": "td", "d": "driver_1", "s": 40, "k": 1,
+         "f": ["ts", "lap", ...], "v": ["2025-10-18T14:03:11.250000", 3, ...]}
+
+    Delta::
+
+        {"type": "td", "d": "driver_1", "s": 41, "t": 100.0,
+         "c": {"5": 251.3}}
+    """
+
+    def __init__(self, keyframe_interval: Optional[int] = None):
+        self.keyframe_interval = keyframe_interval or int(os.getenv("WS_DELTA_KEYFRAME_INTERVAL", "50"))
+        self.fields: Dict[str, List[str]] = {}
+        self.values: Dict[str, List[Any]] = {}
+        self.seq: Dict[str, int] = {}
+        self.since_keyframe: Dict[str, int] = {}
+
+    def encode(self, data: Dict[str, Any], anomaly: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Advance the driver's stream with ``data``; returns the event to publish"""
+        driver_id = data.get("driver_id")
+        if not driver_id:
+            return None
+
+        fields = [field for field in data if field != "driver_id"]
+        values = [data[field] for field in fields]
+        seq = self.seq.get(driver_id, 0) + 1
+        self.seq[driver_id] = seq
+
+        previous = self.values.get(driver_id)
+        if (previous is None or fields != self.fields[driver_id]
+                or self.since_keyframe.get(driver_id, 0) + 1 >= self.keyframe_interval):
+            self.fields[driver_id] = fields
+            self.values[driver_id] = values
+            self.since_keyframe[driver_id] = 0
+            event = self._keyframe(driver_id)
+        else:
+            event = {"type": "td", "d": driver_id, "s": seq}
+            changes = {}
+            for i, (field, value, old) in enumerate(zip(fields, values, previous)):
+                if value == old and type(value) is type(old):
+                    continue
+                shift = _ts_shift(value, old) if field == "ts" else None
+                if shift is not None:
+                    event["t"] = shift
+                else:
+                    changes[str(i)] = self._diff(value, old)
+            event["c"] = changes
+            self.values[driver_id] = values
+            self.since_keyframe[driver_id] += 1
+
+        if anomaly is not None:
+            event["anomaly"] = anomaly
+        return event
+
+    @staticmethod
+    def _diff(value: Any, old: Any) -> Any:
+        """Encode a changed value; long shared string prefixes become [length, suffix]"""
+        if isinstance(value, str) and isinstance(old, str):
+            prefix = 0
+            for a, b in zip(value, old):
+                if a != b:
+                    break
+                prefix += 1
+            if prefix > 8:
+                return [prefix, value[prefix:]]
+        return value
+
+    def _keyframe(self, driver_id: str) -> Dict[str, Any]:
+        return {
+            "type": "td",
+            "d": driver_id,
+            "s": self.seq[driver_id],
+            "k": 1,
+            "f": self.fields[driver_id],
+            "v": self.values[driver_id]
+        }
+
+    def keyframe(self, driver_id: str) -> Optional[Dict[str, Any]]:
+        """Current full state of a driver's stream, for a client resync"""
+        if driver_id not in self.values:
+            return None
+        return self._keyframe(driver_id)
+
+    def keyframes(self, driver_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Keyframes for one driver, or every driver when ``driver_id`` is None or "*" """
+        if driver_id and driver_id != "*":
+            frame = self.keyframe(driver_id)
+            return [frame] if frame else []
+        return [self._keyframe(d) for d in self.values]
@@ -0,0 +1,261 @@
+"""
+Sharded Detection Service for F1 Race Engineer AI
+Runs anomaly detection on a pool of worker processes, one shard of drivers each
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+import zlib
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Awaitable, Dict, List, Optional, Tuple
+
+from services.anomaly_detector import AnomalyDetector, RAW_FEATURES
+from services.model_detector import IsolationForestDetector, SKLEARN_AVAILABLE
+
+logger = logging.getLogger(__name__)
+
+DETECTORS = ("zscore", "isolation_forest")
+
+# Only these fields cross the process boundary
+SHIPPED_FIELDS = ("driver_id", "ts", "sector", "track_x", "distance_m", *RAW_FEATURES)
+
+# How often a worker sends its model statistics back with a result
+MODEL_STATS_INTERVAL_S = 1.0
+
+# The detector owned by a worker process
+_detector: Optional[AnomalyDetector] = None
+_stats_sent_at = 0.0
+
+
+def build_detector(history_size: Optional[int] = None) -> AnomalyDetector:
+    """The detector chosen by ANOMALY_MODEL: z-score baselines or IsolationForest"""
+    model = os.getenv("ANOMALY_MODEL", "zscore").lower()
+    if model == "isolation_forest":
+        if SKLEARN_AVAILABLE:
+            return IsolationForestDetector(history_size=history_size)
+        logger.warning("ANOMALY_MODEL=isolation_forest but scikit-learn is not available, using z-scores")
+    elif model not in DETECTORS:
+        logger.warning(f"Unknown ANOMALY_MODEL {model!r}, using z-scores")
+    return AnomalyDetector(history_size=history_size)
+
+
+def _init_worker(history_size: int):
+    global _detector
+    _detector = build_detector(history_size)
+
+
+def _detect(messages: List[Dict[str, Any]]) -> Tuple[List[Optional[Dict[str, Any]]], float, Optional[Dict]]:
+    global _stats_sent_at
+    started = time.process_time()
+    results = _detector.detect_batch(messages)
+    cpu_s = time.process_time() - started
+    model_stats = None
+    now = time.monotonic()
+    if now - _stats_sent_at >= MODEL_STATS_INTERVAL_S:
+        _stats_sent_at = now
+        model_stats = _detector.model_stats()
+    return results, cpu_s, model_stats
+
+
+def _driver_stats(driver_id: str) -> Dict[str, Any]:
+    return asyncio.run(_detector.get_driver_stats(driver_id))
+
+
+def _reset_driver(driver_id: str):
+    asyncio.run(_detector.reset_driver_baseline(driver_id))
+
+
+def _export_state(dirty_only: bool) -> Dict[str, Dict[str, Any]]:
+    return _detector.snapshot_state(dirty_only)
+
+
+def _import_state(states: Dict[str, Dict[str, Any]]):
+    _detector.restore_state(states)
+
+
+def shard_for(driver_id: str, shards: int) -> int:
+    """Stable shard of a driver (``hash`` of a str differs between processes)"""
+    return zlib.crc32(driver_id.encode("utf-8")) % shards
+
+
+class ShardedAnomalyDetector:
+    """AnomalyDetector spread over worker processes by ``driver_id``.
+
+    Each shard is a single-process executor whose AnomalyDetector owns the
+    history and baselines of the drivers hashed to it. A batch is split by
+    shard, the slices are scored in parallel, and results are put back in
+    message order. A shard runs its submissions one at a time in submission
+    order, so every driver's samples are scored in the order they arrived,
+    exactly as the inline detector would score them.
+
+    While the workers run, the event loop is free, so the caller can start
+    a batch, do other work and await the results later.
+    """
+
+    def __init__(self, workers: Optional[int] = None, history_size: Optional[int] = None):
+        self.workers = workers or int(os.getenv("ANOMALY_WORKERS", "2"))
+        self.history_size = history_size or int(os.getenv("ANOMALY_HISTORY_SIZE", "100"))
+        # Spawned, not forked: the gateway already runs Kafka and store threads
+        self.context = multiprocessing.get_context(os.getenv("ANOMALY_WORKER_START", "spawn"))
+        self.shards = [self._new_shard() for _ in range(self.workers)]
+        self.in_flight = 0
+        self.stats = {"batches": 0, "messages": 0, "restarts": 0, "errors": 0}
+        self.cpu_s = [0.0] * self.workers
+        # Latest model statistics reported by each worker
+        self.shard_models: List[Dict[str, Dict[str, Any]]] = [{} for _ in range(self.workers)]
+
+    def _new_shard(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=1, mp_context=self.context,
+                                   initializer=_init_worker, initargs=(self.history_size,))
+
+    def shard_for(self, driver_id: str) -> int:
+        return shard_for(driver_id, self.workers)
+
+    async def detect_anomaly(self, telemetry_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Detect anomalies in one telemetry sample"""
+        return (await self.detect_anomalies_batch([telemetry_data]))[0]
+
+    def detect_anomalies_batch(self, messages: List[Dict[str, Any]]) -> Awaitable[List[Optional[Dict[str, Any]]]]:
+        """Score a batch across the shards; await for results in message order.
+
+        The slices are submitted before this returns, so the workers are
+        already busy while the caller does other work before awaiting.
+        """
+        if not messages:
+            return self._collect(0, [])
+
+        by_shard: Dict[int, List[int]] = defaultdict(list)
+        for i, message in enumerate(messages):
+            driver_id = message.get("driver_id")
+            if driver_id:
+                by_shard[self.shard_for(driver_id)].append(i)
+
+        loop = asyncio.get_running_loop()
+        # Submitted synchronously, so shards see batches in call order
+        pending = []
+        for shard, indices in by_shard.items():
+            slim = [{k: messages[i][k] for k in SHIPPED_FIELDS if k in messages[i]} for i in indices]
+            executor = self.shards[shard]
+            pending.append((shard, executor, indices, loop.run_in_executor(executor, _detect, slim)))
+
+        self.stats["batches"] += 1
+        self.stats["messages"] += len(messages)
+        if pending:
+            self.in_flight += 1
+        return self._collect(len(messages), pending)
+
+    async def _collect(self, count: int, pending: List) -> List[Optional[Dict[str, Any]]]:
+        results: List[Optional[Dict[str, Any]]] = [None] * count
+        if not pending:
+            return results
+        try:
+            for shard, executor, indices, future in pending:
+                try:
+                    shard_results, cpu_s, model_stats = await future
+                except BrokenProcessPool:
+                    self._restart(shard, executor)
+                    continue
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    logger.error(f"Error detecting anomalies on shard {shard}: {e}")
+                    continue
+                self.cpu_s[shard] += cpu_s
+                if model_stats is not None:
+                    self.shard_models[shard] = model_stats
+                for i, result in zip(indices, shard_results):
+                    results[i] = result
+        finally:
+            self.in_flight -= 1
+        return results
+
+    def _restart(self, shard: int, executor: ProcessPoolExecutor):
+        """Replace a dead worker; its drivers' baselines are rebuilt from new samples"""
+        if self.shards[shard] is not executor:
+            # Another batch on the same dead pool already replaced it
+            return
+        self.stats["restarts"] += 1
+        logger.error(f"Anomaly worker for shard {shard} died, restarting it")
+        self.shards[shard].shutdown(wait=False, cancel_futures=True)
+        self.shards[shard] = self._new_shard()
+        self.shard_models[shard] = {}
+
+    async def get_driver_stats(self, driver_id: str) -> Dict[str, Any]:
+        """Get current statistics for a driver from its shard"""
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.shards[self.shard_for(driver_id)], _driver_stats, driver_id)
+        except Exception as e:
+            logger.error(f"Error getting driver stats: {e}")
+            return {}
+
+    async def reset_driver_baseline(self, driver_id: str):
+        """Reset baseline for a specific driver on its shard"""
+        try:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self.shards[self.shard_for(driver_id)], _reset_driver, driver_id)
+        except Exception as e:
+            logger.error(f"Error resetting baseline for driver {driver_id}: {e}")
+
+    async def export_state(self, dirty_only: bool = True) -> Dict[str, Dict[str, Any]]:
+        """Driver state changed since the last export, gathered from every shard.
+
+        Queued behind the shards' pending batches, so it reflects them.
+        """
+        loop = asyncio.get_running_loop()
+        futures = [loop.run_in_executor(shard, _export_state, dirty_only) for shard in self.shards]
+        states = {}
+        for shard, result in enumerate(await asyncio.gather(*futures, return_exceptions=True)):
+            if isinstance(result, BaseException):
+                logger.error(f"Error exporting detector state from shard {shard}: {result}")
+                continue
+            states.update(result)
+        return states
+
+    async def import_state(self, states: Dict[str, Dict[str, Any]]):
+        """Send each restored driver's state to the shard that owns it"""
+        by_shard: Dict[int, Dict[str, Dict[str, Any]]] = defaultdict(dict)
+        for driver_id, state in states.items():
+            by_shard[self.shard_for(driver_id)][driver_id] = state
+        loop = asyncio.get_running_loop()
+        futures = [loop.run_in_executor(self.shards[shard], _import_state, shard_states)
+                   for shard, shard_states in by_shard.items()]
+        for result in await asyncio.gather(*futures, return_exceptions=True):
+            if isinstance(result, BaseException):
+                logger.error(f"Error importing detector state: {result}")
+
+    def model_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-driver model statistics as last reported by the workers"""
+        now = time.time()
+        stats = {}
+        for shard_stats in self.shard_models:
+            for driver_id, model in shard_stats.items():
+                stats[driver_id] = {**model, "age_s": round(now - model["trained_at"], 3)}
+        return stats
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "mode": "sharded",
+            "model": os.getenv("ANOMALY_MODEL", "zscore").lower(),
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "worker_cpu_s": [round(s, 3) for s in self.cpu_s],
+            **self.stats
+        }
+
+    def close(self):
+        for shard in self.shards:
+            shard.shutdown(wait=False, cancel_futures=True)
+
+
+def create_anomaly_detector():
+    """Inline detector, or the sharded pool when ANOMALY_WORKERS > 0"""
+    workers = int(os.getenv("ANOMALY_WORKERS", "0"))
+    if workers > 0:
+        logger.info(f"Anomaly detection sharded over {workers} worker processes")
+        return ShardedAnomalyDetector(workers=workers)
+    return build_detector()
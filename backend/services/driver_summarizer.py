@@ -6,6 +6,8 @@ Generates AI-powered driver summaries using Gemini API
 import asyncio
 import logging
 import os
+import time
+from collections import deque
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
 import json
@@ -20,12 +22,37 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+class PendingSummary:
+    """Radio context waiting for a driver's next summary, plus whoever waits on it"""
+
+    def __init__(self, max_context: int):
+        self.contexts: deque = deque(maxlen=max_context)
+        self.waiters: List[asyncio.Future] = []
+        self.in_flight_waiters: Optional[List[asyncio.Future]] = None
+        self.task: Optional[asyncio.Task] = None
+
 class DriverSummarizer:
-    def __init__(self):
+    def __init__(self, interval: Optional[float] = None, debounce: Optional[float] = None,
+                 max_pending: Optional[int] = None, max_context: Optional[int] = None):
         self.gemini_api_key = os.getenv("GEMINI_API_KEY")
         self.gemini_model = None
         self.simulation_mode = not GEMINI_AVAILABLE or not self.gemini_api_key
         
+        # Per-driver summary scheduling: at most one call per driver per interval
+        self.interval = interval if interval is not None else float(os.getenv("SUMMARY_INTERVAL", "5"))
+        self.debounce = debounce if debounce is not None else float(os.getenv("SUMMARY_DEBOUNCE", "0.5"))
+        self.max_pending = max_pending or int(os.getenv("SUMMARY_MAX_PENDING", "32"))
+        self.max_context = max_context or int(os.getenv("SUMMARY_MAX_CONTEXT", "10"))
+        self.pending: Dict[str, PendingSummary] = {}
+        # When each driver's last call started; outlives its PendingSummary
+        # so the interval holds across idle gaps
+        self.last_started: Dict[str, float] = {}
+        self.ready: deque = deque(maxlen=self.max_pending)
+        self.requests = 0
+        self.joined = 0
+        self.rejected = 0
+        self.calls = 0
+        
         # Driver performance templates for simulation
         self.summary_templates = {
             "aggressive": "Driver showing aggressive driving patterns with high throttle usage and late braking.",
@@ -81,6 +108,94 @@ class DriverSummarizer:
             logger.error(f"Error generating summary: {e}")
             return None
     
+    def request_summary(self, driver_id: str, context: str) -> asyncio.Future:
+        """Schedule a coalesced summary for ``driver_id``; resolves to the summary or None.
+
+        Context lines are batched per driver: the first request waits
+        ``debounce`` seconds, calls are at least ``interval`` seconds apart,
+        and everything that arrives in between goes into one call. A request
+        that arrives while a call is in flight joins that call's result; its
+        context is carried into the next call. At most ``max_pending`` drivers
+        can have a summary pending at once; requests beyond that resolve to
+        None straight away.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.requests += 1
+
+        state = self.pending.get(driver_id)
+        if state is None:
+            if len(self.pending) >= self.max_pending:
+                self.rejected += 1
+                future.set_result(None)
+                return future
+            state = PendingSummary(self.max_context)
+            self.pending[driver_id] = state
+
+        state.contexts.append(context)
+        if state.in_flight_waiters is not None:
+            state.in_flight_waiters.append(future)
+            self.joined += 1
+        else:
+            if state.task is not None:
+                self.joined += 1
+            state.waiters.append(future)
+
+        if state.task is None:
+            state.task = asyncio.create_task(self._run_pending(driver_id, state))
+        return future
+    
+    async def _run_pending(self, driver_id: str, state: PendingSummary):
+        """Issue one summary call per interval while a driver has new context"""
+        try:
+            while state.contexts:
+                delay = max(self.debounce, self.last_started.get(driver_id, 0.0) + self.interval - time.monotonic())
+                await asyncio.sleep(delay)
+                
+                context = " | ".join(state.contexts)
+                count = len(state.contexts)
+                state.contexts.clear()
+                state.in_flight_waiters, state.waiters = state.waiters, []
+                self.last_started[driver_id] = time.monotonic()
+                
+                self.calls += 1
+                summary = await self.generate_summary(driver_id, context)
+                if summary:
+                    summary["radio_messages"] = count
+                    self.ready.append(summary)
+                
+                # Requests that joined mid-call get this result; their
+                # context (still in state.contexts) feeds the next call
+                for waiter in state.in_flight_waiters:
+                    if not waiter.done():
+                        waiter.set_result(summary)
+                state.in_flight_waiters = None
+        except asyncio.CancelledError:
+            pass
+        finally:
+            for waiter in state.waiters + (state.in_flight_waiters or []):
+                if not waiter.done():
+                    waiter.set_result(None)
+            if self.pending.get(driver_id) is state:
+                del self.pending[driver_id]
+            # Calls older than the interval no longer delay anything
+            now = time.monotonic()
+            for stale in [d for d, started in self.last_started.items() if now - started >= self.interval]:
+                del self.last_started[stale]
+    
+    def pop_ready(self) -> List[Dict[str, Any]]:
+        """Summaries completed since the last call, oldest first"""
+        summaries = list(self.ready)
+        self.ready.clear()
+        return summaries
+    
+    async def close(self):
+        """Cancel scheduled summary calls"""
+        tasks = [state.task for state in self.pending.values() if state.task]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
     async def _generate_with_gemini(self, driver_id: str, context: str = None) -> Optional[str]:
         """Generate summary using Gemini API"""
         try:
@@ -151,9 +266,15 @@ class DriverSummarizer:
             if not lap_data:
                 return None
             
-            # Analyze lap data
-            lap_analysis = self._analyze_lap_data(lap_data)
+            return await self.summarize_lap(driver_id, self._analyze_lap_data(lap_data))
             
+        except Exception as e:
+            logger.error(f"Error generating lap summary: {e}")
+            return None
+    
+    async def summarize_lap(self, driver_id: str, lap_analysis: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Generate summary from lap statistics, e.g. a LapSegmenter lap event"""
+        try:
             if self.simulation_mode:
                 summary = await self._simulate_lap_summary(driver_id, lap_analysis)
             else:
@@ -263,5 +384,10 @@ class DriverSummarizer:
             "simulation_mode": self.simulation_mode,
             "gemini_available": GEMINI_AVAILABLE,
             "api_key_configured": bool(self.gemini_api_key),
-            "available_templates": len(self.summary_templates)
+            "available_templates": len(self.summary_templates),
+            "requests": self.requests,
+            "joined": self.joined,
+            "rejected": self.rejected,
+            "calls": self.calls,
+            "pending_drivers": len(self.pending)
         }
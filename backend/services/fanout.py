@@ -0,0 +1,220 @@
+"""
+Fan-out Service for F1 Race Engineer AI
+Shares each replica's tick events with the other gateway replicas over Redis pub/sub
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+from services.history_store import parse_timestamp
+from services.metrics import Histogram
+from services.tick_frames import TickFrame
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+FANOUT_DELAY_SECONDS = Histogram("f1_fanout_delay_seconds", "Publish on one replica to receipt on another")
+
+# Channels that are re-derived locally instead of forwarded: delta frames
+# depend on the receiving replica's own encoder state
+LOCAL_ONLY_CHANNELS = {"telemetry_delta"}
+
+
+class FanoutBus:
+    """Cross-replica event fan-out so every replica serves the full field.
+
+    Replicas share a Kafka group, so each ingests and runs detection for
+    only its own partitions. At the end of a tick the events it produced
+    (already serialized) are published as one Redis message; every other
+    replica adds them to its own tick frame, so its clients see all
+    drivers. Publishing goes through a bounded outbox drained by a
+    background task, so a slow Redis never stalls the tick.
+
+    The wire format is a JSON header line followed by one event per line
+    (``json.dumps`` never emits raw newlines), so events are not re-encoded.
+
+    ``fresh`` guards against the duplicates a partition rebalance causes:
+    telemetry whose ``ts`` is not newer than the last one seen for that
+    driver, locally or from another replica, is dropped before detection.
+    """
+
+    def __init__(self, url: Optional[str] = None, channel: Optional[str] = None,
+                 replica_id: Optional[str] = None, enabled: Optional[bool] = None):
+        self.enabled = enabled if enabled is not None else os.getenv("FANOUT_ENABLED", "false").lower() == "true"
+        self.url = url or os.getenv("REDIS_URL", "redis://localhost:6379")
+        if "://" not in self.url:
+            self.url = "redis://" + self.url
+        self.channel = channel or os.getenv("FANOUT_CHANNEL", "f1:events")
+        self.replica_id = replica_id or os.getenv("HOSTNAME") or socket.gethostname()
+        self.max_pending = int(os.getenv("FANOUT_MAX_PENDING", "256"))
+        self.reset_after = float(os.getenv("FANOUT_DEDUP_RESET_S", "30"))
+        self.client = None
+        self.pubsub = None
+        self.outbox: Optional[asyncio.Queue] = None
+        self.inbox: deque = deque(maxlen=self.max_pending)
+        self.last_ts: Dict[str, str] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._seq = 0
+        self.stats = {"published": 0, "published_events": 0, "received": 0, "received_events": 0,
+                      "dropped_outbox": 0, "duplicates": 0, "errors": 0}
+
+    @property
+    def active(self) -> bool:
+        return self.client is not None
+
+    async def start(self):
+        """Connect and subscribe; on failure the replica keeps serving its own share"""
+        if not self.enabled:
+            return
+        if not REDIS_AVAILABLE:
+            logger.warning("FANOUT_ENABLED but the redis package is not installed")
+            return
+        try:
+            self.client = aioredis.from_url(self.url)
+            self.pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            await self.pubsub.subscribe(self.channel)
+        except Exception as e:
+            logger.error(f"Failed to connect fan-out bus to {self.url}: {e}")
+            self.client = None
+            return
+        self.outbox = asyncio.Queue(maxsize=self.max_pending)
+        self._tasks = [asyncio.create_task(self._publisher()), asyncio.create_task(self._receiver())]
+        logger.info(f"Fan-out bus on {self.url} channel {self.channel} as replica {self.replica_id}")
+
+    def fresh(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Drop telemetry already seen for its driver; records the newest ts per driver"""
+        if not self.active:
+            return messages
+        kept = []
+        for message in messages:
+            if self._is_new(message.get("driver_id"), message.get("ts")):
+                kept.append(message)
+        return kept
+
+    def _is_new(self, driver_id: Optional[str], ts: Optional[str]) -> bool:
+        if not driver_id or not ts:
+            return True
+        last = self.last_ts.get(driver_id)
+        if last is not None and ts <= last:
+            # A ts far in the past is a new session, not a redelivery
+            if parse_timestamp(last) - parse_timestamp(ts) < self.reset_after:
+                self.stats["duplicates"] += 1
+                return False
+        self.last_ts[driver_id] = ts
+        return True
+
+    def publish(self, frame: TickFrame):
+        """Queue this tick's local events for the other replicas"""
+        if not self.active or not frame.events:
+            return
+        routes, timestamps, events = [], [], []
+        for event, route, ts in zip(frame.events, frame.routes, frame.timestamps):
+            if route[0] in LOCAL_ONLY_CHANNELS:
+                continue
+            routes.append(route)
+            timestamps.append(ts)
+            events.append(event)
+        if not events:
+            return
+        self._seq += 1
+        header = json.dumps({"o": self.replica_id, "s": self._seq, "at": time.time(),
+                             "r": routes, "t": timestamps}, separators=(",", ":"))
+        try:
+            self.outbox.put_nowait(header + "\n" + "\n".join(events))
+        except asyncio.QueueFull:
+            self.stats["dropped_outbox"] += 1
+            return
+        self.stats["published_events"] += len(events)
+
+    async def _publisher(self):
+        while True:
+            payload = await self.outbox.get()
+            try:
+                await self.client.publish(self.channel, payload)
+                self.stats["published"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Error publishing to fan-out bus: {e}")
+                await asyncio.sleep(1)
+
+    async def _receiver(self):
+        while True:
+            try:
+                async for message in self.pubsub.listen():
+                    self._receive(message.get("data"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Error reading fan-out bus: {e}")
+                await asyncio.sleep(1)
+
+    def _receive(self, data: Any):
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        if not isinstance(data, str):
+            return
+        header_text, _, body = data.partition("\n")
+        header = json.loads(header_text)
+        if header.get("o") == self.replica_id:
+            return
+        FANOUT_DELAY_SECONDS.observe(max(0.0, time.time() - header.get("at", time.time())))
+        self.inbox.append((header, body.split("\n")))
+        self.stats["received"] += 1
+
+    def drain_into(self, frame: TickFrame, on_telemetry: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """Add other replicas' events to this tick's frame.
+
+        ``on_telemetry`` is called with each decoded remote telemetry event,
+        for consumers that need the data rather than the encoded event
+        (e.g. the local delta encoder).
+        """
+        while self.inbox:
+            header, events = self.inbox.popleft()
+            for event, (channel, driver_id), ts in zip(events, header["r"], header["t"]):
+                if channel == "telemetry" and not self._is_new(driver_id, ts):
+                    continue
+                frame.add_encoded(event, driver_id, channel, ts)
+                self.stats["received_events"] += 1
+                if on_telemetry is not None and channel == "telemetry":
+                    try:
+                        on_telemetry(json.loads(event))
+                    except Exception as e:
+                        logger.error(f"Error handling remote telemetry: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "active": self.active,
+            "replica_id": self.replica_id,
+            "outbox": self.outbox.qsize() if self.outbox is not None else 0,
+            "inbox": len(self.inbox),
+            **self.stats
+        }
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        try:
+            if self.pubsub is not None:
+                await self.pubsub.unsubscribe(self.channel)
+                await self.pubsub.close()
+            if self.client is not None:
+                await self.client.close()
+        except Exception as e:
+            logger.error(f"Error closing fan-out bus: {e}")
+        self.client = None
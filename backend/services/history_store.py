@@ -0,0 +1,165 @@
+"""
+Telemetry History Store for F1 Race Engineer AI
+Preallocated per-driver NumPy ring buffers with zero-copy window views
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def parse_timestamp(ts: Any) -> float:
+    """Convert an ISO-8601 ``ts`` string to epoch seconds, NaN if unparseable"""
+    if ts is None:
+        return float("nan")
+    if isinstance(ts, (int, float)):
+        return float(ts)
+    try:
+        return datetime.fromisoformat(str(ts)).timestamp()
+    except ValueError:
+        return float("nan")
+
+
+class TelemetryRingBuffer:
+    """Fixed-capacity history of one driver's samples.
+
+    Rows live in a structured array with a ``timestamp`` column (epoch
+    seconds) followed by one float64 column per feature, NaN where a sample
+    did not carry the feature. The backing array is twice the capacity and is
+    compacted once every ``capacity`` appends, so the live window is always a
+    single contiguous slice and ``window``/``features``/``timestamps`` can
+    return views instead of copies. Views are only valid until the next write.
+    """
+
+    def __init__(self, capacity: int, fields: Sequence[str]):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.fields: List[str] = list(fields)
+        self.dtype = np.dtype([("timestamp", "f8")] + [(field, "f8") for field in self.fields])
+        self._buffer = np.empty(2 * capacity, dtype=self.dtype)
+        # Plain 2D float64 view over the same memory: column 0 is the timestamp
+        self._matrix = self._buffer.view(np.float64).reshape(len(self._buffer), len(self.fields) + 1)
+        self._matrix.fill(np.nan)
+        self._start = 0
+        self._end = 0
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    @property
+    def nbytes(self) -> int:
+        return self._buffer.nbytes
+
+    def append(self, timestamp: float, values: Sequence[float]) -> Optional[np.ndarray]:
+        """Append one row; returns the feature row that left the window, if any"""
+        evicted = None
+        if self._end - self._start == self.capacity:
+            evicted = self._matrix[self._start, 1:].copy()
+            self._start += 1
+        if self._end == len(self._buffer):
+            self._compact()
+
+        row = self._matrix[self._end]
+        row[0] = timestamp
+        row[1:] = values
+        self._end += 1
+        return evicted
+
+    def extend(self, timestamps: np.ndarray, values: np.ndarray):
+        """Append a block of rows, keeping only the newest ``capacity`` of them"""
+        n = len(values)
+        if n == 0:
+            return
+        if n >= self.capacity:
+            self._matrix[:self.capacity, 0] = timestamps[-self.capacity:]
+            self._matrix[:self.capacity, 1:] = values[-self.capacity:]
+            self._start, self._end = 0, self.capacity
+            return
+
+        overflow = len(self) + n - self.capacity
+        if overflow > 0:
+            self._start += overflow
+        if self._end + n > len(self._buffer):
+            self._compact()
+
+        self._matrix[self._end:self._end + n, 0] = timestamps
+        self._matrix[self._end:self._end + n, 1:] = values
+        self._end += n
+
+    def _compact(self):
+        """Move the live window to the front of the backing array"""
+        live = self._end - self._start
+        self._matrix[:live] = self._matrix[self._start:self._end]
+        self._start, self._end = 0, live
+
+    def _bounds(self, n: Optional[int]) -> slice:
+        length = len(self)
+        n = length if n is None else max(0, min(n, length))
+        return slice(self._end - n, self._end)
+
+    def window(self, n: Optional[int] = None) -> np.ndarray:
+        """Structured view of the newest ``n`` rows (all rows by default)"""
+        return self._buffer[self._bounds(n)]
+
+    def features(self, n: Optional[int] = None) -> np.ndarray:
+        """(rows, features) float64 view of the newest ``n`` rows"""
+        return self._matrix[self._bounds(n), 1:]
+
+    def timestamps(self, n: Optional[int] = None) -> np.ndarray:
+        """Epoch-second view of the newest ``n`` timestamps"""
+        return self._matrix[self._bounds(n), 0]
+
+    def column(self, field: str, n: Optional[int] = None) -> np.ndarray:
+        """View of a single feature column"""
+        return self._matrix[self._bounds(n), 1 + self.fields.index(field)]
+
+    def clear(self):
+        self._start = 0
+        self._end = 0
+
+
+class HistoryStore:
+    """Per-driver ring buffers sharing one schema and window length"""
+
+    def __init__(self, fields: Sequence[str], window_size: int = 100):
+        self.fields: List[str] = list(fields)
+        self.window_size = window_size
+        self._drivers: Dict[str, TelemetryRingBuffer] = {}
+
+    def __getitem__(self, driver_id: str) -> TelemetryRingBuffer:
+        history = self._drivers.get(driver_id)
+        if history is None:
+            history = self._drivers[driver_id] = TelemetryRingBuffer(self.window_size, self.fields)
+        return history
+
+    def __contains__(self, driver_id: str) -> bool:
+        return driver_id in self._drivers
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._drivers)
+
+    def __len__(self) -> int:
+        return len(self._drivers)
+
+    def get(self, driver_id: str) -> Optional[TelemetryRingBuffer]:
+        return self._drivers.get(driver_id)
+
+    def items(self):
+        return self._drivers.items()
+
+    def memory_usage(self) -> Dict[str, Any]:
+        """Allocated bytes in total and per retained driver-sample"""
+        allocated = sum(history.nbytes for history in self._drivers.values())
+        row_bytes = (len(self.fields) + 1) * 8
+        return {
+            "drivers": len(self._drivers),
+            "window_size": self.window_size,
+            "allocated_bytes": allocated,
+            "bytes_per_row": row_bytes,
+            "allocated_bytes_per_sample": 2 * row_bytes
+        }
@@ -4,113 +4,247 @@ Handles telemetry and radio data consumption from Kafka topics
 """
 
 import asyncio
+import concurrent.futures
 import json
 import logging
-from typing import List, Dict, Any, Optional
-from kafka import KafkaConsumer
+import threading
+import time
+from typing import AsyncIterator, List, Dict, Any, Optional
+# Aliased: the service class below reuses the KafkaConsumer name
+from kafka import KafkaConsumer as KafkaClientConsumer
 from kafka.errors import KafkaError
 import os
 
+from services.metrics import Histogram
+
 logger = logging.getLogger(__name__)
 
+POLL_SECONDS = Histogram("f1_kafka_poll_seconds", "consumer.poll() time for polls that returned records",
+                         ["stream"])
+DECODE_SECONDS = Histogram("f1_kafka_decode_seconds", "JSON decoding time per polled batch", ["stream"])
+
+# Seconds between consumer lag readings on the poll threads
+LAG_INTERVAL = 5.0
+
 class KafkaConsumer:
+    """Kafka ingestion that never blocks the event loop.
+
+    Each topic gets a dedicated thread that owns its kafka-python consumer,
+    polls continuously and hands decoded batches to the event loop through a
+    bounded ``asyncio.Queue``. When the queue is full the poll thread waits,
+    so a slow gateway applies backpressure to Kafka instead of buffering
+    without limit.
+    """
+
     def __init__(self):
-        self.telemetry_consumer: Optional[KafkaConsumer] = None
-        self.radio_consumer: Optional[KafkaConsumer] = None
+        self.telemetry_consumer: Optional[KafkaClientConsumer] = None
+        self.radio_consumer: Optional[KafkaClientConsumer] = None
         self.kafka_bootstrap_servers = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "localhost:9092")
         self.telemetry_topic = os.getenv("TELEMETRY_TOPIC", "telemetry")
         self.radio_topic = os.getenv("RADIO_TOPIC", "radio")
+        self.queue_size = int(os.getenv("KAFKA_QUEUE_BATCHES", "64"))
+        self.max_poll_records = int(os.getenv("KAFKA_MAX_POLL_RECORDS", "500"))
+        self.telemetry_queue: Optional[asyncio.Queue] = None
+        self.radio_queue: Optional[asyncio.Queue] = None
+        self._threads: List[threading.Thread] = []
+        self._running = threading.Event()
+        self.stats = {
+            "telemetry": {"batches": 0, "messages": 0, "backpressure_s": 0.0},
+            "radio": {"batches": 0, "messages": 0, "backpressure_s": 0.0}
+        }
+        # Messages behind the partitions' high watermarks, per stream
+        self.lag: Dict[str, int] = {"telemetry": 0, "radio": 0}
         
     async def initialize(self):
-        """Initialize Kafka consumers"""
+        """Initialize Kafka consumers and start the poll threads"""
         try:
-            # Initialize telemetry consumer
-            self.telemetry_consumer = KafkaConsumer(
-                self.telemetry_topic,
-                bootstrap_servers=self.kafka_bootstrap_servers,
-                value_deserializer=lambda m: json.loads(m.decode('utf-8')),
-                auto_offset_reset='latest',
-                enable_auto_commit=True,
-                group_id='f1_race_engineer_telemetry'
-            )
-            
-            # Initialize radio consumer
-            self.radio_consumer = KafkaConsumer(
-                self.radio_topic,
-                bootstrap_servers=self.kafka_bootstrap_servers,
-                value_deserializer=lambda m: json.loads(m.decode('utf-8')),
-                auto_offset_reset='latest',
-                enable_auto_commit=True,
-                group_id='f1_race_engineer_radio'
-            )
-            
+            # Creating a consumer does blocking broker I/O, keep it off the loop
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._create_consumers)
             logger.info("Kafka consumers initialized successfully")
             
         except Exception as e:
             logger.error(f"Failed to initialize Kafka consumers: {e}")
+            self.telemetry_consumer = None
+            self.radio_consumer = None
             raise
-    
-    async def consume_telemetry(self) -> List[Dict[str, Any]]:
-        """Consume telemetry messages from Kafka"""
-        messages = []
+
+        self.start()
+
+    @property
+    def connected(self) -> bool:
+        """True once there is a live source to consume from"""
+        return self.telemetry_consumer is not None
+
+    def start(self):
+        """Start one poll thread per consumer; must run inside the event loop"""
+        loop = asyncio.get_running_loop()
+        self.telemetry_queue = asyncio.Queue(maxsize=self.queue_size)
+        self.radio_queue = asyncio.Queue(maxsize=self.queue_size)
+        self._running.set()
+        for name, consumer, queue in (
+            ("telemetry", self.telemetry_consumer, self.telemetry_queue),
+            ("radio", self.radio_consumer, self.radio_queue)
+        ):
+            thread = threading.Thread(
+                target=self._poll_loop, args=(name, consumer, queue, loop),
+                name=f"kafka-{name}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def _create_consumers(self):
+        # Initialize telemetry consumer
+        self.telemetry_consumer = KafkaClientConsumer(
+            self.telemetry_topic,
+            bootstrap_servers=self.kafka_bootstrap_servers,
+            auto_offset_reset='latest',
+            enable_auto_commit=True,
+            group_id='f1_race_engineer_telemetry',
+            max_poll_records=self.max_poll_records
+        )
         
-        if not self.telemetry_consumer:
-            return messages
-            
-        try:
-            # Poll for messages with timeout
-            message_batch = self.telemetry_consumer.poll(timeout_ms=100)
-            
+        # Initialize radio consumer
+        self.radio_consumer = KafkaClientConsumer(
+            self.radio_topic,
+            bootstrap_servers=self.kafka_bootstrap_servers,
+            auto_offset_reset='latest',
+            enable_auto_commit=True,
+            group_id='f1_race_engineer_radio',
+            max_poll_records=self.max_poll_records
+        )
+
+    def _poll_loop(self, name: str, consumer, queue: asyncio.Queue,
+                   loop: asyncio.AbstractEventLoop):
+        """Poll thread body: poll, decode, then block until the loop has room"""
+        labels = (name,)
+        next_lag = 0.0
+        while self._running.is_set():
+            try:
+                started = time.perf_counter()
+                message_batch = consumer.poll(timeout_ms=100)
+                polled = time.perf_counter()
+            except KafkaError as e:
+                logger.error(f"Kafka error consuming {name}: {e}")
+                time.sleep(1)
+                continue
+            except Exception as e:
+                logger.error(f"Error consuming {name}: {e}")
+                time.sleep(1)
+                continue
+
+            if polled >= next_lag:
+                self._update_lag(name, consumer)
+                next_lag = polled + LAG_INTERVAL
+            if not message_batch:
+                continue
+            POLL_SECONDS.observe(polled - started, labels)
+
+            # Decoded here rather than by a value_deserializer so it can be timed
+            messages = []
             for topic_partition, records in message_batch.items():
                 for record in records:
                     try:
-                        message = record.value
+                        message = json.loads(record.value)
                         if message:
                             messages.append(message)
                     except Exception as e:
-                        logger.error(f"Error processing telemetry message: {e}")
-                        
-        except KafkaError as e:
-            logger.error(f"Kafka error consuming telemetry: {e}")
+                        logger.error(f"Error processing {name} message: {e}")
+            DECODE_SECONDS.observe(time.perf_counter() - polled, labels)
+            if not messages:
+                continue
+
+            self._hand_off(name, queue, messages, loop)
+
+        try:
+            consumer.close()
         except Exception as e:
-            logger.error(f"Error consuming telemetry: {e}")
-            
-        return messages
-    
-    async def consume_radio(self) -> List[Dict[str, Any]]:
-        """Consume radio messages from Kafka"""
-        messages = []
-        
-        if not self.radio_consumer:
-            return messages
-            
+            logger.error(f"Error closing {name} consumer: {e}")
+
+    def _update_lag(self, name: str, consumer):
+        """Sum of high watermark minus position over the assigned partitions"""
         try:
-            # Poll for messages with timeout
-            message_batch = self.radio_consumer.poll(timeout_ms=100)
-            
-            for topic_partition, records in message_batch.items():
-                for record in records:
-                    try:
-                        message = record.value
-                        if message:
-                            messages.append(message)
-                    except Exception as e:
-                        logger.error(f"Error processing radio message: {e}")
-                        
-        except KafkaError as e:
-            logger.error(f"Kafka error consuming radio: {e}")
+            lag = 0
+            for partition in consumer.assignment():
+                highwater = consumer.highwater(partition)
+                if highwater is not None:
+                    lag += max(0, highwater - consumer.position(partition))
+            self.lag[name] = lag
         except Exception as e:
-            logger.error(f"Error consuming radio: {e}")
-            
+            logger.error(f"Error reading {name} consumer lag: {e}")
+
+    def _hand_off(self, name: str, queue: asyncio.Queue, messages: List[Dict[str, Any]],
+                  loop: asyncio.AbstractEventLoop):
+        """Put a batch on the loop's queue from a worker thread, waiting while it is full"""
+        stats = self.stats[name]
+        started = time.perf_counter()
+        future = asyncio.run_coroutine_threadsafe(queue.put(messages), loop)
+        while self._running.is_set():
+            try:
+                future.result(timeout=0.5)
+                break
+            except concurrent.futures.TimeoutError:
+                continue
+            except Exception as e:
+                logger.error(f"Error handing {name} batch to event loop: {e}")
+                break
+        else:
+            future.cancel()
+        stats["backpressure_s"] += time.perf_counter() - started
+        stats["batches"] += 1
+        stats["messages"] += len(messages)
+
+    @staticmethod
+    async def _drain(queue: Optional[asyncio.Queue], timeout: float) -> List[Dict[str, Any]]:
+        """Wait up to ``timeout`` for a batch, then take everything already queued"""
+        messages: List[Dict[str, Any]] = []
+        if queue is None:
+            return messages
+        if queue.empty() and timeout > 0:
+            try:
+                messages.extend(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                return messages
+        while not queue.empty():
+            messages.extend(queue.get_nowait())
         return messages
+
+    async def consume_telemetry(self, timeout: float = 0.0) -> List[Dict[str, Any]]:
+        """Return the telemetry polled so far, waiting up to ``timeout`` seconds for some"""
+        return await self._drain(self.telemetry_queue, timeout)
+    
+    async def consume_radio(self, timeout: float = 0.0) -> List[Dict[str, Any]]:
+        """Return the radio messages polled so far, waiting up to ``timeout`` seconds for some"""
+        return await self._drain(self.radio_queue, timeout)
+
+    async def telemetry_batches(self) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Iterate telemetry batches as the poll thread delivers them"""
+        while self.telemetry_queue is not None:
+            yield await self.telemetry_queue.get()
+
+    async def radio_batches(self) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Iterate radio batches as the poll thread delivers them"""
+        while self.radio_queue is not None:
+            yield await self.radio_queue.get()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-topic counters and current queue depth"""
+        return {
+            name: {
+                **stats,
+                "queued_batches": queue.qsize() if queue is not None else 0
+            }
+            for (name, stats), queue in zip(self.stats.items(), (self.telemetry_queue, self.radio_queue))
+        }
     
     async def close(self):
-        """Close Kafka consumers"""
+        """Stop the poll threads; each closes its own consumer on the way out"""
         try:
-            if self.telemetry_consumer:
-                self.telemetry_consumer.close()
-            if self.radio_consumer:
-                self.radio_consumer.close()
+            self._running.clear()
+            loop = asyncio.get_running_loop()
+            for thread in self._threads:
+                await loop.run_in_executor(None, thread.join, 5)
+            self._threads = []
             logger.info("Kafka consumers closed successfully")
         except Exception as e:
             logger.error(f"Error closing Kafka consumers: {e}")
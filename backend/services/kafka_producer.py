@@ -0,0 +1,372 @@
+"""
+Kafka Producer Service for F1 Race Engineer AI
+Publishes telemetry and radio to Kafka at a controlled rate
+"""
+
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque, namedtuple
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from kafka import KafkaProducer as KafkaClientProducer
+from kafka.partitioner.default import murmur2
+
+logger = logging.getLogger(__name__)
+
+PROFILES = ("constant", "linear", "step", "burst")
+RAMP_STEPS = 4
+BURST_FACTOR = 5.0
+BURST_S = 1.0
+
+RecordMetadata = namedtuple("RecordMetadata", ["topic", "partition", "offset"])
+
+
+def target_rate(profile: str, rate: float, elapsed: float, ramp_s: float) -> float:
+    """Messages per second wanted ``elapsed`` seconds into a run.
+
+    constant: ``rate`` throughout. linear: 0 up to ``rate`` over ``ramp_s``.
+    step: ``rate`` in RAMP_STEPS equal steps over ``ramp_s``. burst:
+    ``rate`` with BURST_FACTOR x spikes lasting BURST_S every ``ramp_s``.
+    """
+    if ramp_s <= 0 or profile == "constant":
+        return rate
+    if profile == "linear":
+        return rate * min(1.0, elapsed / ramp_s)
+    if profile == "step":
+        return rate * min(RAMP_STEPS, int(elapsed / ramp_s * RAMP_STEPS) + 1) / RAMP_STEPS
+    if profile == "burst":
+        return rate * BURST_FACTOR if elapsed % ramp_s < BURST_S else rate
+    raise ValueError(f"Unknown rate profile {profile!r}. Use one of {', '.join(PROFILES)}")
+
+
+class LocalFuture:
+    """The part of kafka-python's FutureRecordMetadata the producer uses"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._callbacks: List[Tuple[Callable, tuple]] = []
+        self._errbacks: List[Tuple[Callable, tuple]] = []
+        self.value = None
+        self.exception = None
+        self.is_done = False
+
+    def add_callback(self, fn: Callable, *args):
+        with self._lock:
+            if not self.is_done:
+                self._callbacks.append((fn, args))
+                return self
+        if self.exception is None:
+            fn(*args, self.value)
+        return self
+
+    def add_errback(self, fn: Callable, *args):
+        with self._lock:
+            if not self.is_done:
+                self._errbacks.append((fn, args))
+                return self
+        if self.exception is not None:
+            fn(*args, self.exception)
+        return self
+
+    def _complete(self, value=None, exception=None):
+        with self._lock:
+            self.value, self.exception, self.is_done = value, exception, True
+            callbacks = self._errbacks if exception is not None else self._callbacks
+        for fn, args in callbacks:
+            try:
+                fn(*args, exception if exception is not None else value)
+            except Exception as e:
+                logger.error(f"Error in send callback: {e}")
+
+
+class LocalBroker:
+    """In-process stand-in for a Kafka cluster behind kafka-python's producer API.
+
+    Records are keyed to partitions with Kafka's murmur2 partitioner and
+    accumulated per partition. A sender thread ships a partition's batch
+    when it reaches ``batch_size`` bytes or has waited ``linger_ms``, then
+    pays one simulated broker round trip of ``latency_ms`` before the
+    callbacks fire. Batches are gzip-compressed when asked, so compression
+    cost and ratio are real. The last ``retain`` records of each topic are
+    kept for inspection.
+    """
+
+    def __init__(self, partitions: int = 6, batch_size: int = 16384, linger_ms: float = 0,
+                 compression_type: Optional[str] = None, latency_ms: float = 1.0, retain: int = 0):
+        if compression_type not in (None, "gzip"):
+            raise ValueError(f"LocalBroker only supports gzip compression, not {compression_type!r}")
+        self.partitions = partitions
+        self.batch_size = batch_size
+        self.linger_s = linger_ms / 1000
+        self.compression_type = compression_type
+        self.latency_s = latency_ms / 1000
+        self._pending: Dict[Tuple[str, int], List] = {}
+        self._opened: Dict[Tuple[str, int], float] = {}
+        self._sizes: Dict[Tuple[str, int], int] = defaultdict(int)
+        self._offsets: Dict[Tuple[str, int], int] = defaultdict(int)
+        self._condition = threading.Condition()
+        self._running = True
+        self._in_flight = 0
+        self.records: Dict[str, deque] = defaultdict(lambda: deque(maxlen=retain))
+        self.stats = {"records": 0, "batches": 0, "requests": 0, "bytes": 0, "compressed_bytes": 0}
+        self._sender = threading.Thread(target=self._send_loop, name="local-broker", daemon=True)
+        self._sender.start()
+
+    def partition_for(self, key: Optional[bytes]) -> int:
+        if key is None:
+            return self.stats["records"] % self.partitions
+        return (murmur2(key) & 0x7fffffff) % self.partitions
+
+    def send(self, topic: str, value: bytes = None, key: bytes = None) -> LocalFuture:
+        future = LocalFuture()
+        partition = self.partition_for(key)
+        with self._condition:
+            slot = (topic, partition)
+            opened = slot not in self._pending
+            if opened:
+                self._pending[slot] = []
+                self._opened[slot] = time.perf_counter()
+            self._pending[slot].append((key, value, future))
+            self._sizes[slot] += len(value) + len(key or b"")
+            self.stats["records"] += 1
+            # A new batch starts a linger timer the sender may not be waiting on yet
+            if opened or self._sizes[slot] >= self.batch_size:
+                self._condition.notify_all()
+        return future
+
+    def _ready(self, now: float, force: bool) -> List[Tuple[Tuple[str, int], List]]:
+        slots = [slot for slot in self._pending
+                 if force or self._sizes[slot] >= self.batch_size or now - self._opened[slot] >= self.linger_s]
+        batches = []
+        for slot in slots:
+            batches.append((slot, self._pending.pop(slot)))
+            del self._opened[slot]
+            self._sizes.pop(slot)
+        return batches
+
+    def _send_loop(self):
+        while True:
+            with self._condition:
+                while True:
+                    now = time.perf_counter()
+                    batches = self._ready(now, force=not self._running)
+                    if batches or not self._running:
+                        break
+                    oldest = min(self._opened.values(), default=None)
+                    self._condition.wait(None if oldest is None else max(0.0, oldest + self.linger_s - now))
+                self._in_flight += len(batches)
+            if not batches and not self._running:
+                return
+            self._ship(batches)
+
+    def _ship(self, batches: List[Tuple[Tuple[str, int], List]]):
+        """One produce request carrying every ready batch"""
+        results = []
+        for (topic, partition), records in batches:
+            payload = b"".join(value for _, value, _ in records)
+            self.stats["bytes"] += len(payload)
+            if self.compression_type == "gzip":
+                payload = gzip.compress(payload, compresslevel=1)
+            self.stats["compressed_bytes"] += len(payload)
+            base = self._offsets[(topic, partition)]
+            self._offsets[(topic, partition)] += len(records)
+            for i, (key, value, future) in enumerate(records):
+                self.records[topic].append((partition, key, value))
+                results.append((future, RecordMetadata(topic, partition, base + i)))
+        time.sleep(self.latency_s)
+        self.stats["batches"] += len(batches)
+        self.stats["requests"] += 1
+        for future, metadata in results:
+            future._complete(metadata)
+        with self._condition:
+            self._in_flight -= len(batches)
+            self._condition.notify_all()
+
+    def flush(self, timeout: Optional[float] = None):
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        with self._condition:
+            for slot in self._opened:
+                self._opened[slot] = float("-inf")
+            self._condition.notify_all()
+            while self._pending or self._in_flight:
+                remaining = None if deadline is None else deadline - time.perf_counter()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._condition.wait(remaining if remaining is not None else 0.1)
+
+    def close(self, timeout: Optional[float] = None):
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        self._sender.join(timeout)
+
+
+class TelemetryProducer:
+    """Publishes simulator output to the topics KafkaConsumer reads.
+
+    Messages are keyed by ``driver_id`` so each driver stays on one
+    partition and in order. Batching, linger and compression come from
+    PRODUCER_* variables; ``produce`` paces a record stream to a target rate
+    following one of PROFILES and reports the achieved rate and the send
+    latency (``send()`` to broker acknowledgement).
+    """
+
+    def __init__(self, client=None, batch_size: Optional[int] = None, linger_ms: Optional[float] = None,
+                 compression: Optional[str] = None, acks: Optional[str] = None):
+        self.kafka_bootstrap_servers = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "localhost:9092")
+        self.telemetry_topic = os.getenv("TELEMETRY_TOPIC", "telemetry")
+        self.radio_topic = os.getenv("RADIO_TOPIC", "radio")
+        self.batch_size = batch_size or int(os.getenv("PRODUCER_BATCH_BYTES", "65536"))
+        self.linger_ms = linger_ms if linger_ms is not None else float(os.getenv("PRODUCER_LINGER_MS", "10"))
+        compression = compression or os.getenv("PRODUCER_COMPRESSION", "gzip")
+        self.compression = None if compression.lower() == "none" else compression.lower()
+        self.acks = acks or os.getenv("PRODUCER_ACKS", "1")
+        self.client = client or self._create_client()
+        self.latencies: deque = deque(maxlen=20000)
+        self._window: List[float] = []
+        self.stats = {"sent": 0, "acked": 0, "errors": 0, "telemetry": 0, "radio": 0}
+        self.report_history: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def _create_client(self):
+        if os.getenv("KAFKA_PRODUCER", "kafka").lower() == "local":
+            logger.info("Producing to the in-process LocalBroker")
+            return LocalBroker(batch_size=self.batch_size, linger_ms=self.linger_ms,
+                               compression_type=self.compression)
+        acks = "all" if self.acks == "all" else int(self.acks)
+        client = KafkaClientProducer(
+            bootstrap_servers=self.kafka_bootstrap_servers,
+            batch_size=self.batch_size,
+            linger_ms=int(self.linger_ms),
+            compression_type=self.compression,
+            acks=acks,
+            buffer_memory=64 * 1024 * 1024
+        )
+        logger.info(f"Kafka producer connected to {self.kafka_bootstrap_servers}")
+        return client
+
+    def send(self, kind: str, message: Dict[str, Any]):
+        """Queue one message on its topic, keyed by driver_id"""
+        topic = self.telemetry_topic if kind == "telemetry" else self.radio_topic
+        key = message.get("driver_id")
+        value = json.dumps(message, separators=(",", ":")).encode("utf-8")
+        future = self.client.send(topic, value=value, key=key.encode("utf-8") if key else None)
+        future.add_callback(self._acked, time.perf_counter())
+        future.add_errback(self._failed)
+        self.stats["sent"] += 1
+        self.stats[kind] += 1
+
+    def _acked(self, sent_at: float, metadata):
+        latency = (time.perf_counter() - sent_at) * 1000
+        with self._lock:
+            self.stats["acked"] += 1
+            self.latencies.append(latency)
+            self._window.append(latency)
+
+    def _failed(self, error: Exception):
+        with self._lock:
+            self.stats["errors"] += 1
+        if self.stats["errors"] <= 10:
+            logger.error(f"Error producing message: {error}")
+
+    def produce(self, records: Iterable[Tuple[str, Dict[str, Any]]], rate: float = 0,
+                profile: str = "constant", ramp_s: float = 30.0, duration: Optional[float] = None,
+                report_interval: float = 5.0) -> Dict[str, Any]:
+        """Send (kind, message) records at ``rate`` messages/s (0 = as fast as possible).
+
+        Each message's ``ts`` is stamped at send time, as a live feed would.
+        Stops when ``records`` runs out or after ``duration`` seconds and
+        returns the final report.
+        """
+        target_rate(profile, rate, 0.0, ramp_s)  # validate the profile up front
+        start = last = last_report = time.perf_counter()
+        allowance = 0.0
+        expected = reported_expected = 0.0
+        reported_sent = 0
+
+        for kind, message in records:
+            now = time.perf_counter()
+            if rate > 0:
+                while True:
+                    current = target_rate(profile, rate, now - start, ramp_s)
+                    # At most 50 ms of credit, so a stall is not followed by a burst
+                    allowance = min(allowance + current * (now - last), max(1.0, current * 0.05))
+                    expected += current * (now - last)
+                    last = now
+                    if allowance >= 1 or (duration and now - start >= duration):
+                        break
+                    time.sleep(min(0.005, (1 - allowance) / current) if current > 0 else 0.005)
+                    now = time.perf_counter()
+                allowance -= 1
+            if duration and now - start >= duration:
+                break
+
+            self.send(kind, {**message, "ts": datetime.now().isoformat()})
+
+            if report_interval and now - last_report >= report_interval:
+                interval = now - last_report
+                target = (expected - reported_expected) / interval if rate > 0 else 0.0
+                report = self.report(interval, self.stats["sent"] - reported_sent, target, window=True)
+                self.report_history.append(report)
+                logger.info(self.format_report(report))
+                last_report, reported_sent, reported_expected = now, self.stats["sent"], expected
+
+        self.flush()
+        elapsed = time.perf_counter() - start
+        return self.report(elapsed, self.stats["sent"], expected / elapsed if rate > 0 else 0.0)
+
+    def report(self, elapsed: float, sent: int, target: float, window: bool = False) -> Dict[str, Any]:
+        """Achieved and target rate over ``elapsed`` seconds with send latency percentiles.
+
+        Latency covers acknowledgements since the previous windowed report
+        with ``window``, otherwise the most recent 20000.
+        """
+        with self._lock:
+            samples = self._window if window else self.latencies
+            latencies = np.array(samples) if samples else None
+            if window:
+                self._window = []
+
+        def pct(p):
+            return round(float(np.percentile(latencies, p)), 2) if latencies is not None else None
+
+        return {
+            "target_per_s": round(target, 1),
+            "achieved_per_s": round(sent / elapsed, 1) if elapsed > 0 else 0.0,
+            "latency_ms": {"p50": pct(50), "p95": pct(95), "p99": pct(99)},
+            **self.stats
+        }
+
+    @staticmethod
+    def format_report(report: Dict[str, Any]) -> str:
+        latency = report["latency_ms"]
+        return (f"target {report['target_per_s']:.0f}/s achieved {report['achieved_per_s']:.0f}/s | "
+                f"send latency p50 {latency['p50']} p95 {latency['p95']} p99 {latency['p99']} ms | "
+                f"sent {report['sent']} acked {report['acked']} errors {report['errors']}")
+
+    def flush(self, timeout: float = 30.0):
+        try:
+            self.client.flush(timeout=timeout)
+        except Exception as e:
+            logger.error(f"Error flushing Kafka producer: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        if isinstance(self.client, LocalBroker):
+            stats["broker"] = dict(self.client.stats)
+        return stats
+
+    def close(self):
+        """Flush outstanding messages and close the client"""
+        try:
+            self.flush()
+            self.client.close(timeout=10)
+            logger.info("Kafka producer closed successfully")
+        except Exception as e:
+            logger.error(f"Error closing Kafka producer: {e}")
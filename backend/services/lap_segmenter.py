@@ -0,0 +1,196 @@
+"""
+Lap Segmentation Service for F1 Race Engineer AI
+Detects lap and sector boundaries in the live stream and keeps per-lap statistics
+"""
+
+import logging
+import os
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional
+
+from services.history_store import parse_timestamp
+
+logger = logging.getLogger(__name__)
+
+SECTORS = 3
+# A driver first seen this close to the line is taken to have started the lap there
+START_TOLERANCE_M = 100.0
+
+
+class LapAccumulator:
+    """Running aggregates for the lap a driver is on; O(1) memory and update.
+
+    ``started_at`` is only set when the lap began at an observed boundary:
+    the previous sample was on the lap before, or the driver's first sample
+    was at the line. Laps joined midway still get speed and pedal statistics
+    but no lap time.
+    """
+
+    __slots__ = ("lap", "started_at", "start_ts", "end_ts", "count",
+                 "speed_sum", "speed_min", "speed_max", "throttle_sum", "brake_sum", "brake_max",
+                 "distance_start", "distance_end", "sector", "sector_started_at", "sector_times")
+
+    def __init__(self, lap: int, ts: float, ts_text: Optional[str], boundary: bool):
+        self.lap = lap
+        self.started_at = ts if boundary else None
+        self.start_ts = ts_text
+        self.end_ts = ts_text
+        self.count = 0
+        self.speed_sum = 0.0
+        self.speed_min = float("inf")
+        self.speed_max = float("-inf")
+        self.throttle_sum = 0.0
+        self.brake_sum = 0.0
+        self.brake_max = 0.0
+        self.distance_start: Optional[float] = None
+        self.distance_end: Optional[float] = None
+        self.sector: Optional[int] = None
+        self.sector_started_at: Optional[float] = None
+        self.sector_times: List[Optional[float]] = [None] * SECTORS
+
+    def add(self, message: Dict[str, Any], ts: float):
+        """Fold one sample into the lap"""
+        sector = message.get("sector")
+        if sector is not None and sector != self.sector:
+            self._enter_sector(sector, ts)
+
+        speed = message.get("speed_kph") or 0.0
+        brake = message.get("brake_pct") or 0.0
+        self.count += 1
+        self.speed_sum += speed
+        if speed < self.speed_min:
+            self.speed_min = speed
+        if speed > self.speed_max:
+            self.speed_max = speed
+        self.throttle_sum += message.get("throttle_pct") or 0.0
+        self.brake_sum += brake
+        if brake > self.brake_max:
+            self.brake_max = brake
+        distance = message.get("distance_m")
+        if distance is not None:
+            if self.distance_start is None:
+                self.distance_start = distance
+            self.distance_end = distance
+        self.end_ts = message.get("ts")
+
+    def _enter_sector(self, sector: int, ts: float):
+        """Close the current sector at the first sample of the next one"""
+        previous = self.sector
+        if previous is None:
+            # First sample of the lap: sector 1 starts with the lap itself
+            self.sector_started_at = self.started_at if sector == 1 else None
+        elif sector > previous:
+            if sector == previous + 1 and self.sector_started_at is not None:
+                self.sector_times[previous - 1] = round(ts - self.sector_started_at, 3)
+            self.sector_started_at = ts
+        else:
+            # Sector went backwards within a lap; stop timing until the next boundary
+            self.sector_started_at = None
+        self.sector = sector
+
+    def summary(self, driver_id: str, ended_at: Optional[float], complete: bool) -> Dict[str, Any]:
+        """Completed-lap statistics; keys are a superset of DriverSummarizer's lap analysis"""
+        if complete and ended_at is not None and self.sector_started_at is not None and self.sector == SECTORS:
+            self.sector_times[SECTORS - 1] = round(ended_at - self.sector_started_at, 3)
+        lap_time = None
+        if complete and self.started_at is not None and ended_at is not None:
+            lap_time = round(ended_at - self.started_at, 3)
+        count = self.count or 1
+        return {
+            "driver_id": driver_id,
+            "lap_number": self.lap,
+            "complete": lap_time is not None,
+            "lap_time_s": lap_time,
+            "sector_times_s": list(self.sector_times),
+            "data_points": self.count,
+            "avg_speed": round(self.speed_sum / count, 2),
+            "max_speed": round(self.speed_max, 2) if self.count else 0,
+            "min_speed": round(self.speed_min, 2) if self.count else 0,
+            "avg_throttle": round(self.throttle_sum / count, 4),
+            "avg_brake": round(self.brake_sum / count, 4),
+            "max_brake": round(self.brake_max, 4),
+            "distance_m": round(self.distance_end - self.distance_start, 1)
+            if self.distance_start is not None else None,
+            "time_range": {"start": self.start_ts, "end": self.end_ts}
+        }
+
+
+class LapSegmenter:
+    """Streaming lap and sector segmentation per driver.
+
+    ``update`` folds each telemetry sample into the driver's current
+    LapAccumulator and returns the summaries of any laps it completed. A
+    lap ends when ``lap`` advances; a lap counter that goes backwards (a
+    new session, or a looping replay) starts the driver over without
+    emitting anything. Only the last ``history`` summaries per driver are
+    kept, so memory does not depend on session length.
+    """
+
+    def __init__(self, history: Optional[int] = None):
+        self.history = history or int(os.getenv("LAP_HISTORY", "10"))
+        self.current: Dict[str, LapAccumulator] = {}
+        self.recent: Dict[str, deque] = {}
+        self.stats = {"samples": 0, "laps": 0, "partial_laps": 0, "resets": 0}
+
+    def update(self, message: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Fold one telemetry sample in; returns completed-lap summaries"""
+        driver_id = message.get("driver_id")
+        lap = message.get("lap")
+        if driver_id is None or lap is None:
+            return []
+        ts = parse_timestamp(message.get("ts"))
+        if ts != ts:  # NaN
+            return []
+        self.stats["samples"] += 1
+
+        completed = []
+        accumulator = self.current.get(driver_id)
+        if accumulator is None or lap != accumulator.lap:
+            distance = message.get("distance_m")
+            boundary = accumulator is None and distance is not None and 0 <= distance <= START_TOLERANCE_M
+            if accumulator is not None:
+                if lap > accumulator.lap:
+                    complete = lap == accumulator.lap + 1
+                    completed.append(self._finish(driver_id, accumulator, ts, complete))
+                    boundary = complete
+                else:
+                    self.stats["resets"] += 1
+            accumulator = LapAccumulator(lap, ts, message.get("ts"), boundary)
+            self.current[driver_id] = accumulator
+        accumulator.add(message, ts)
+        return completed
+
+    def update_batch(self, messages: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """``update`` over a poll's worth of samples"""
+        completed = []
+        for message in messages:
+            try:
+                completed.extend(self.update(message))
+            except Exception as e:
+                logger.error(f"Error segmenting telemetry for {message.get('driver_id')}: {e}")
+        return completed
+
+    def _finish(self, driver_id: str, accumulator: LapAccumulator, ended_at: float,
+                complete: bool) -> Dict[str, Any]:
+        summary = accumulator.summary(driver_id, ended_at, complete)
+        self.stats["laps" if summary["complete"] else "partial_laps"] += 1
+        self.recent.setdefault(driver_id, deque(maxlen=self.history)).append(summary)
+        return summary
+
+    def in_progress(self, driver_id: str) -> Optional[Dict[str, Any]]:
+        """Statistics of the lap a driver is currently on"""
+        accumulator = self.current.get(driver_id)
+        if accumulator is None:
+            return None
+        return {**accumulator.summary(driver_id, None, False), "in_progress": True}
+
+    def recent_laps(self, driver_id: str) -> List[Dict[str, Any]]:
+        """The driver's last completed laps, oldest first"""
+        return list(self.recent.get(driver_id, ()))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "drivers": len(self.current)}
+
+    def clear(self):
+        self.current.clear()
+        self.recent.clear()
@@ -0,0 +1,59 @@
+"""
+Event Loop Monitor for F1 Race Engineer AI
+Measures how long the asyncio event loop is blocked between wakeups
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class EventLoopMonitor:
+    """Samples event-loop lag: the delay between a timer's due time and when it runs.
+
+    A loop that is never blocked wakes up within a fraction of a millisecond;
+    any blocking call (a synchronous Kafka poll, an LLM request) shows up
+    directly as lag.
+    """
+
+    def __init__(self, interval: float = 0.05, warn_threshold: float = 0.1):
+        self.interval = interval
+        self.warn_threshold = warn_threshold
+        self.samples = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+        self.blocked_time = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - expected)
+            self.samples += 1
+            self.total_lag += lag
+            self.max_lag = max(self.max_lag, lag)
+            if lag > 0.001:
+                self.blocked_time += lag
+            if lag > self.warn_threshold:
+                logger.warning(f"Event loop blocked for {lag * 1000:.0f} ms")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "samples": self.samples,
+            "avg_lag_ms": (self.total_lag / self.samples * 1000) if self.samples else 0.0,
+            "max_lag_ms": self.max_lag * 1000,
+            "blocked_s": self.blocked_time
+        }
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
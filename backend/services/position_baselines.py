@@ -0,0 +1,197 @@
+"""
+Position Baseline Service for F1 Race Engineer AI
+Per-driver baseline tables indexed by sector and track-position bin
+"""
+
+import logging
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SECTORS = 3
+
+
+class PositionBaselines:
+    """Running mean and variance per (driver, sector, position bin, feature).
+
+    Each driver owns a slot in three ``(slots, SECTORS * bins, features)``
+    arrays, count, mean and sum of squared deviations, so the baselines for
+    a whole multi-driver batch are indexed reads. Rows are merged one at a
+    time in arrival order, so a batch scores exactly like per-message
+    calls; the batch is split into rounds holding at most one row per cell,
+    and each round is one vectorized read and merge. Counts are capped at
+    ``max_count``, after which a cell behaves like an exponentially
+    weighted average that follows tyre wear and fuel load.
+
+    The position is ``track_x`` (fraction of the lap), or ``distance_m``
+    modulo ``track_length_m`` when ``track_x`` is missing.
+    """
+
+    def __init__(self, features: Sequence[str], bins: Optional[int] = None, min_count: Optional[int] = None,
+                 max_count: Optional[int] = None, track_length_m: Optional[float] = None):
+        self.features = list(features)
+        self.bins = bins if bins is not None else int(os.getenv("ANOMALY_POSITION_BINS", "25"))
+        self.min_count = min_count or int(os.getenv("ANOMALY_POSITION_MIN_COUNT", "5"))
+        self.max_count = max_count or int(os.getenv("ANOMALY_POSITION_MAX_COUNT", "50"))
+        self.prior = float(os.getenv("ANOMALY_POSITION_PRIOR", "2"))
+        self.track_length_m = track_length_m or float(os.getenv("TRACK_LENGTH_M", "5000"))
+        self.rows = SECTORS * self.bins
+        self.slots: Dict[str, int] = {}
+        self._free: List[int] = []
+        self.count, self.mean, self.m2 = (np.zeros((0, self.rows, len(self.features))) for _ in range(3))
+
+    @property
+    def enabled(self) -> bool:
+        return self.bins > 0
+
+    def cells(self, messages: List[Dict[str, Any]], indices: Sequence[int]) -> np.ndarray:
+        """Table row of each message, -1 where its position is unknown"""
+        nan = float("nan")
+        position = np.array([_position(messages[i], self.track_length_m) for i in indices], dtype=np.float64)
+        sector = np.array([messages[i].get("sector") or nan for i in indices], dtype=np.float64)
+        known = ~np.isnan(position) & ~np.isnan(sector)
+        bins = np.minimum((np.where(known, position, 0.0) * self.bins).astype(np.intp), self.bins - 1)
+        sectors = np.clip(np.where(known, sector, 1.0).astype(np.intp), 1, SECTORS) - 1
+        return np.where(known, sectors * self.bins + bins, -1)
+
+    def cell(self, message: Dict[str, Any]) -> int:
+        """Table row of one message, -1 where its position is unknown"""
+        position = _position(message, self.track_length_m)
+        sector = message.get("sector")
+        if position != position or not sector:
+            return -1
+        return (min(max(int(sector), 1), SECTORS) - 1) * self.bins + min(int(position * self.bins), self.bins - 1)
+
+    def slot(self, driver_id: str) -> int:
+        """The driver's slot, allocating a zeroed one on first use"""
+        slot = self.slots.get(driver_id)
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+            else:
+                slot = len(self.slots)
+                if slot >= len(self.count):
+                    grow = max(8, len(self.count))
+                    self.count, self.mean, self.m2 = (
+                        np.concatenate([a, np.zeros((grow,) + a.shape[1:])]) for a in (self.count, self.mean, self.m2)
+                    )
+            self.slots[driver_id] = slot
+        return slot
+
+    def flat_cells(self, slots: np.ndarray, cells: np.ndarray) -> np.ndarray:
+        """Row of each (slot, cell) in the flattened tables, -1 where the cell is unknown"""
+        return np.where(cells >= 0, slots * self.rows + cells, -1)
+
+    def _flat(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        shape = (-1, len(self.features))
+        return self.count.reshape(shape), self.mean.reshape(shape), self.m2.reshape(shape)
+
+    def baseline(self, flat: np.ndarray, pooled_mean: np.ndarray,
+                 pooled_std: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Mean and std per row and feature: the cell's, or the pooled ones where it is unknown or thin.
+
+        ``flat`` comes from ``flat_cells``. The cell variance is shrunk
+        toward the pooled variance with ``prior`` pseudo-samples. A cell
+        where a feature barely moves (the gear on a straight) would
+        otherwise flag ordinary changes.
+        """
+        count, mean, m2 = self._flat()
+        rows = np.maximum(flat, 0)
+        n = count[rows]
+        ready = (flat >= 0)[:, None] & (n >= self.min_count)
+        variance = (m2[rows] + self.prior * pooled_std * pooled_std) / (n + self.prior)
+        return np.where(ready, mean[rows], pooled_mean), np.where(ready, np.sqrt(variance), pooled_std)
+
+    def _rounds(self, flat: np.ndarray) -> List[np.ndarray]:
+        """Known rows of ``flat`` grouped so round k holds the k-th row of every cell"""
+        known = np.flatnonzero(flat >= 0)
+        if len(known) <= 1:
+            return [known] if len(known) else []
+        cells = flat[known]
+        order = np.argsort(cells, kind="stable")
+        sorted_cells = cells[order]
+        starts = np.flatnonzero(np.concatenate([[True], sorted_cells[1:] != sorted_cells[:-1]]))
+        rank = np.empty(len(cells), dtype=np.intp)
+        rank[order] = np.arange(len(cells)) - np.repeat(starts, np.diff(np.append(starts, len(cells))))
+        by_rank = np.argsort(rank, kind="stable")
+        bounds = np.flatnonzero(np.diff(rank[by_rank])) + 1
+        return np.split(known[by_rank], bounds)
+
+    def _merge(self, flat: np.ndarray, rows: np.ndarray):
+        """Merge one row into each of the distinct cells ``flat``"""
+        count, mean, m2 = self._flat()
+        valid = ~np.isnan(rows)
+        n = count[flat]
+        m = valid.astype(np.float64)
+        total = n + m
+        safe_total = np.maximum(total, 1)
+        delta = np.where(valid, rows - mean[flat], 0.0)
+        new_mean = mean[flat] + delta * m / safe_total
+        new_m2 = m2[flat] + delta * delta * n * m / safe_total
+
+        # Past the cap, keep the variance and forget the oldest weight
+        scale = np.where(total > self.max_count, self.max_count / safe_total, 1.0)
+        count[flat] = total * scale
+        mean[flat] = new_mean
+        m2[flat] = new_m2 * scale
+
+    def update(self, flat: np.ndarray, block: np.ndarray):
+        """Merge a batch of rows, of any number of drivers, into their cells in row order"""
+        for rows in self._rounds(flat):
+            self._merge(flat[rows], block[rows])
+
+    def score_update(self, flat: np.ndarray, block: np.ndarray, pooled_mean: np.ndarray,
+                     pooled_std: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """``baseline`` for every row as if the rows had arrived one at a time, merging them as it goes"""
+        mean, std = pooled_mean.copy(), pooled_std.copy()
+        for rows in self._rounds(flat):
+            mean[rows], std[rows] = self.baseline(flat[rows], pooled_mean[rows], pooled_std[rows])
+            self._merge(flat[rows], block[rows])
+        return mean, std
+
+    def table(self, driver_id: str) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Copies of a driver's count, mean and m2 arrays, None if it has none"""
+        slot = self.slots.get(driver_id)
+        if slot is None:
+            return None
+        return self.count[slot].copy(), self.mean[slot].copy(), self.m2[slot].copy()
+
+    def set_table(self, driver_id: str, table: Tuple[np.ndarray, np.ndarray, np.ndarray]):
+        slot = self.slot(driver_id)
+        self.count[slot], self.mean[slot], self.m2[slot] = table
+
+    def clear(self, driver_id: Optional[str] = None):
+        if driver_id is None:
+            self.slots.clear()
+            self._free.clear()
+            self.count, self.mean, self.m2 = (np.zeros((0,) + a.shape[1:]) for a in (self.count, self.mean, self.m2))
+            return
+        slot = self.slots.pop(driver_id, None)
+        if slot is not None:
+            for a in (self.count, self.mean, self.m2):
+                a[slot] = 0.0
+            self._free.append(slot)
+
+    def get_stats(self) -> Dict[str, Any]:
+        used = list(self.slots.values())
+        return {
+            "bins": self.bins,
+            "drivers": len(used),
+            "cells": self.rows * len(used),
+            "ready_cells": int((self.count[used, :, 0] >= self.min_count).sum()) if used else 0,
+            "bytes": self.count.nbytes + self.mean.nbytes + self.m2.nbytes
+        }
+
+
+def _position(message: Dict[str, Any], track_length_m: float) -> float:
+    """Fraction of the lap completed, NaN if unknown"""
+    track_x = message.get("track_x")
+    if track_x is not None and 0.0 <= track_x <= 1.0:
+        return track_x
+    distance = message.get("distance_m")
+    if distance is not None:
+        return (distance % track_length_m) / track_length_m
+    return float("nan")
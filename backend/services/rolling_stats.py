@@ -0,0 +1,128 @@
+"""
+Rolling Statistics for F1 Race Engineer AI
+Constant-time sliding-window mean, variance, min and max per feature
+"""
+
+import math
+from collections import deque
+from typing import Dict, Any, List, Optional, Sequence
+
+
+class RollingFeatureStats:
+    """Sliding-window statistics for a single feature.
+
+    Mean and variance use Welford's update run forwards on insert and
+    backwards on removal; min and max are kept with monotonic deques of
+    ``(seq, value)`` pairs, so every operation is amortized O(1). The window
+    contents themselves live in the caller's history buffer, which hands back
+    the outgoing value on eviction.
+    """
+
+    __slots__ = ("min_queue", "max_queue", "count", "mean", "m2")
+
+    def __init__(self):
+        self.min_queue: deque = deque()
+        self.max_queue: deque = deque()
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def push(self, seq: int, value: float):
+        """Add a value that belongs to sample ``seq``"""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+        while self.min_queue and self.min_queue[-1][1] >= value:
+            self.min_queue.pop()
+        self.min_queue.append((seq, value))
+        while self.max_queue and self.max_queue[-1][1] <= value:
+            self.max_queue.pop()
+        self.max_queue.append((seq, value))
+
+    def remove(self, value: float):
+        """Take the oldest value back out of the mean and variance"""
+        self.count -= 1
+        if self.count <= 0:
+            self.count = 0
+            self.mean = 0.0
+            self.m2 = 0.0
+            return
+        delta = value - self.mean
+        self.mean -= delta / self.count
+        self.m2 -= delta * (value - self.mean)
+        if self.m2 < 0.0:
+            self.m2 = 0.0
+
+    def expire(self, oldest_seq: int):
+        """Drop min/max candidates older than ``oldest_seq``"""
+        while self.min_queue and self.min_queue[0][0] < oldest_seq:
+            self.min_queue.popleft()
+        while self.max_queue and self.max_queue[0][0] < oldest_seq:
+            self.max_queue.popleft()
+
+    @property
+    def std(self) -> float:
+        """Population standard deviation (matches ``np.std``)"""
+        if self.count < 2:
+            return 0.0
+        return math.sqrt(self.m2 / self.count)
+
+    def snapshot(self) -> Dict[str, float]:
+        """Return the baseline dict consumed by the anomaly detector"""
+        return {
+            "mean": self.mean,
+            "std": self.std,
+            "min": self.min_queue[0][1],
+            "max": self.max_queue[0][1],
+            "count": self.count
+        }
+
+
+class RollingWindowStats:
+    """Sliding-window statistics over the last ``window_size`` samples of a driver.
+
+    Samples are rows of ``fields`` values with NaN marking a missing feature.
+    The caller passes the row that left its history window (if any) so that
+    no values are stored twice.
+    """
+
+    def __init__(self, window_size: int, fields: Sequence[str]):
+        self.window_size = window_size
+        self.fields: List[str] = list(fields)
+        self.columns = [RollingFeatureStats() for _ in self.fields]
+        self.next_seq = 0
+        self._no_eviction = [math.nan] * len(self.fields)
+
+    def __len__(self) -> int:
+        return min(self.next_seq, self.window_size)
+
+    def push(self, values: Sequence[float], evicted: Optional[Sequence[float]] = None):
+        """Add one sample and retire ``evicted``, the sample leaving the window"""
+        seq = self.next_seq
+        self.next_seq += 1
+        oldest_seq = self.next_seq - self.window_size
+
+        if evicted is None:
+            evicted = self._no_eviction
+
+        for stats, value, old in zip(self.columns, values, evicted):
+            if old == old:  # not NaN
+                stats.remove(float(old))
+            if value == value:
+                stats.push(seq, float(value))
+            if oldest_seq > 0:
+                stats.expire(oldest_seq)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Return baseline statistics for every feature present in the window"""
+        return {
+            field: stats.snapshot()
+            for field, stats in zip(self.fields, self.columns)
+            if stats.count > 0
+        }
+
+    def clear(self):
+        self.columns = [RollingFeatureStats() for _ in self.fields]
+        self.next_seq = 0
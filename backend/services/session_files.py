@@ -0,0 +1,449 @@
+"""
+Session Files for F1 Race Engineer AI
+Streaming writers and lazy readers for recorded telemetry sessions
+"""
+
+import csv
+import json
+import logging
+import os
+import re
+import struct
+import sys
+from abc import ABC, abstractmethod
+from typing import Any, Dict, IO, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# File formats, chosen by extension when reading
+NDJSON = "ndjson"
+CSV = "csv"
+COLUMNAR = "columnar"
+JSON = "json"
+FORMATS = (JSON, NDJSON, CSV, COLUMNAR)
+EXTENSIONS = {".ndjson": NDJSON, ".jsonl": NDJSON, ".csv": CSV, ".f1c": COLUMNAR, ".json": JSON}
+
+TELEMETRY_FIELDS = ["ts", "driver_id", "lap", "distance_m", "sector", "track_x",
+                    "speed_kph", "throttle_pct", "brake_pct", "gear"]
+RADIO_FIELDS = ["ts", "team", "driver_id", "text"]
+INT_FIELDS = {"lap", "sector", "gear"}
+TEXT_FIELDS = {"ts", "driver_id", "team", "text"}
+
+# Columnar layout: magic, then blocks of <u4 header length, JSON header, payload.
+# Telemetry blocks carry fixed-width columns; driver_id is stored as an index
+# into the "drivers" list of the metadata block.
+COLUMNAR_MAGIC = b"F1TCOL1\n"
+COLUMNAR_DTYPES = [
+    ("ts", "<M8[us]"),
+    ("driver_index", "<u2"),
+    ("lap", "<u2"),
+    ("sector", "<u1"),
+    ("gear", "<u1"),
+    ("distance_m", "<f8"),
+    ("track_x", "<f8"),
+    ("speed_kph", "<f8"),
+    ("throttle_pct", "<f8"),
+    ("brake_pct", "<f8")
+]
+
+
+def format_for_path(path: str) -> str:
+    """Session format implied by a file name"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in EXTENSIONS:
+        raise ValueError(f"Unsupported session file: {path}")
+    return EXTENSIONS[extension]
+
+
+def csv_paths(path: str) -> Tuple[str, str]:
+    """Telemetry and radio files of a CSV session given ``x.csv`` or either half"""
+    base = re.sub(r"(_telemetry|_radio)?\.csv$", "", path)
+    return base + "_telemetry.csv", base + "_radio.csv"
+
+
+def columns_to_records(columns: Dict[str, np.ndarray], driver_ids: Sequence[str]) -> List[Dict[str, Any]]:
+    """Telemetry dicts from a block of columns with ``driver_index`` and datetime64 ``ts``"""
+    drivers = np.asarray(driver_ids)[columns["driver_index"]].tolist()
+    ts = np.datetime_as_string(columns["ts"], unit="us").tolist()
+    names = TELEMETRY_FIELDS[2:]
+    values = [columns[name].tolist() for name in names]
+    return [
+        {"ts": t, "driver_id": d, **dict(zip(names, row))}
+        for t, d, row in zip(ts, drivers, zip(*values))
+    ]
+
+
+class SessionWriter(ABC):
+    """Base class for streaming session writers.
+
+    Records are written as they arrive, so memory stays bounded by one
+    chunk no matter how long the session is. ``write_columns`` accepts the
+    simulator's vectorized lap blocks; ``write_telemetry`` single points.
+    """
+
+    def __init__(self, path: Optional[str], metadata: Optional[Dict[str, Any]] = None):
+        self.path = path
+        self.metadata = dict(metadata or {})
+        self.driver_ids: List[str] = list(self.metadata.get("drivers", []))
+        self.telemetry_count = 0
+        self.radio_count = 0
+
+    @abstractmethod
+    def write_telemetry(self, record: Dict[str, Any]):
+        """Write one telemetry point"""
+
+    @abstractmethod
+    def write_radio(self, messages: List[Dict[str, Any]]):
+        """Write a batch of radio messages"""
+
+    def write_columns(self, columns: Dict[str, np.ndarray]):
+        for record in columns_to_records(columns, self.driver_ids):
+            self.write_telemetry(record)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class NDJSONWriter(SessionWriter):
+    """One JSON object per line: ``{"type": "telemetry" | "radio" | "metadata", "data": {...}}``"""
+
+    def __init__(self, path: Optional[str], metadata: Optional[Dict[str, Any]] = None):
+        super().__init__(path, metadata)
+        self.file: IO = open(path, "w") if path else sys.stdout
+        self._line("metadata", self.metadata)
+
+    def _line(self, kind: str, data: Dict[str, Any]):
+        self.file.write('{"type":"%s","data":%s}\n' % (kind, json.dumps(data, separators=(",", ":"))))
+
+    def write_telemetry(self, record: Dict[str, Any]):
+        self._line("telemetry", record)
+        self.telemetry_count += 1
+
+    def write_columns(self, columns: Dict[str, np.ndarray]):
+        records = columns_to_records(columns, self.driver_ids)
+        self.file.writelines(
+            '{"type":"telemetry","data":%s}\n' % json.dumps(r, separators=(",", ":")) for r in records
+        )
+        self.telemetry_count += len(records)
+
+    def write_radio(self, messages: List[Dict[str, Any]]):
+        for message in messages:
+            self._line("radio", message)
+        self.radio_count += len(messages)
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+        else:
+            self.file.flush()
+
+
+class CSVWriter(SessionWriter):
+    """``x_telemetry.csv`` and ``x_radio.csv``, written one chunk at a time"""
+
+    def __init__(self, path: Optional[str], metadata: Optional[Dict[str, Any]] = None):
+        super().__init__(path, metadata)
+        if not path:
+            raise ValueError("CSV output requires output file parameter")
+        self.telemetry_path, self.radio_path = csv_paths(path)
+        self.telemetry_file = open(self.telemetry_path, "w", newline="")
+        self.radio_file = open(self.radio_path, "w", newline="")
+        self.telemetry_writer = csv.DictWriter(self.telemetry_file, fieldnames=TELEMETRY_FIELDS,
+                                               extrasaction="ignore")
+        self.radio_writer = csv.DictWriter(self.radio_file, fieldnames=RADIO_FIELDS, extrasaction="ignore")
+        self.telemetry_writer.writeheader()
+        self.radio_writer.writeheader()
+
+    def write_telemetry(self, record: Dict[str, Any]):
+        self.telemetry_writer.writerow(record)
+        self.telemetry_count += 1
+
+    def write_columns(self, columns: Dict[str, np.ndarray]):
+        records = columns_to_records(columns, self.driver_ids)
+        self.telemetry_writer.writerows(records)
+        self.telemetry_count += len(records)
+
+    def write_radio(self, messages: List[Dict[str, Any]]):
+        self.radio_writer.writerows(messages)
+        self.radio_count += len(messages)
+
+    def close(self):
+        self.telemetry_file.close()
+        self.radio_file.close()
+
+
+class JSONWriter(SessionWriter):
+    """The original ``{"telemetry": [...], "radio": [...], "metadata": {...}}`` document.
+
+    Telemetry is streamed one record per line; radio (a few messages per
+    lap) is held until the telemetry array is closed.
+    """
+
+    def __init__(self, path: Optional[str], metadata: Optional[Dict[str, Any]] = None):
+        super().__init__(path, metadata)
+        self.file: IO = open(path, "w") if path else sys.stdout
+        self.file.write('{"telemetry": [')
+        self.radio: List[Dict[str, Any]] = []
+
+    def _records(self, records: List[Dict[str, Any]]):
+        self.file.writelines(
+            ("\n" if self.telemetry_count + i == 0 else ",\n") + json.dumps(r)
+            for i, r in enumerate(records)
+        )
+        self.telemetry_count += len(records)
+
+    def write_telemetry(self, record: Dict[str, Any]):
+        self._records([record])
+
+    def write_columns(self, columns: Dict[str, np.ndarray]):
+        self._records(columns_to_records(columns, self.driver_ids))
+
+    def write_radio(self, messages: List[Dict[str, Any]]):
+        self.radio.extend(messages)
+        self.radio_count += len(messages)
+
+    def close(self):
+        metadata = {**self.metadata, "total_telemetry_points": self.telemetry_count,
+                    "total_radio_messages": self.radio_count}
+        self.file.write('\n],\n"radio": [')
+        self.file.write(",".join("\n" + json.dumps(m) for m in self.radio))
+        self.file.write('\n],\n"metadata": %s}\n' % json.dumps(metadata))
+        if self.file is not sys.stdout:
+            self.file.close()
+        else:
+            self.file.flush()
+
+
+class ColumnarWriter(SessionWriter):
+    """Compact binary blocks of fixed-width telemetry columns (see COLUMNAR_DTYPES).
+
+    Single points are buffered up to ``chunk_rows`` and written as one block;
+    vectorized lap blocks are written directly.
+    """
+
+    def __init__(self, path: Optional[str], metadata: Optional[Dict[str, Any]] = None, chunk_rows: int = 8192):
+        super().__init__(path, metadata)
+        if not path:
+            raise ValueError("Columnar output requires output file parameter")
+        self.chunk_rows = chunk_rows
+        self.pending: List[Dict[str, Any]] = []
+        self.file: IO = open(path, "wb")
+        self.file.write(COLUMNAR_MAGIC)
+        self._block({"kind": "metadata"}, json.dumps(self.metadata).encode())
+
+    def _block(self, header: Dict[str, Any], payload: bytes):
+        header["nbytes"] = len(payload)
+        encoded = json.dumps(header, separators=(",", ":")).encode()
+        self.file.write(struct.pack("<I", len(encoded)))
+        self.file.write(encoded)
+        self.file.write(payload)
+
+    def _driver_index(self, driver_id: str) -> int:
+        if driver_id not in self.driver_ids:
+            # A driver missing from the metadata gets appended; readers
+            # pick the growing list up from "drivers" block headers
+            self.driver_ids.append(driver_id)
+        return self.driver_ids.index(driver_id)
+
+    def write_columns(self, columns: Dict[str, np.ndarray]):
+        rows = len(columns["ts"])
+        if rows == 0:
+            return
+        payload = b"".join(
+            np.ascontiguousarray(columns[name], dtype=dtype).tobytes() for name, dtype in COLUMNAR_DTYPES
+        )
+        self._block({"kind": "telemetry", "rows": rows, "drivers": len(self.driver_ids)}, payload)
+        self.telemetry_count += rows
+
+    def write_telemetry(self, record: Dict[str, Any]):
+        self.pending.append(record)
+        if len(self.pending) >= self.chunk_rows:
+            self._flush_pending()
+
+    def _flush_pending(self):
+        if not self.pending:
+            return
+        records, self.pending = self.pending, []
+        columns = {
+            "ts": np.array([r["ts"] for r in records], dtype="datetime64[us]"),
+            "driver_index": np.array([self._driver_index(r["driver_id"]) for r in records])
+        }
+        for name, _ in COLUMNAR_DTYPES[2:]:
+            columns[name] = np.array([r.get(name) or 0 for r in records])
+        if self.driver_ids != self.metadata.get("drivers"):
+            self.metadata["drivers"] = list(self.driver_ids)
+            self._block({"kind": "metadata"}, json.dumps(self.metadata).encode())
+        self.write_columns(columns)
+
+    def write_radio(self, messages: List[Dict[str, Any]]):
+        if messages:
+            self._block({"kind": "radio", "rows": len(messages)}, json.dumps(messages).encode())
+            self.radio_count += len(messages)
+
+    def close(self):
+        self._flush_pending()
+        self.file.close()
+
+
+WRITERS = {JSON: JSONWriter, NDJSON: NDJSONWriter, CSV: CSVWriter, COLUMNAR: ColumnarWriter}
+
+
+def open_writer(output_format: str, path: Optional[str], metadata: Optional[Dict[str, Any]] = None) -> SessionWriter:
+    """Streaming writer for ``output_format`` (json, ndjson, csv or columnar)"""
+    if output_format not in WRITERS:
+        raise ValueError(f"Invalid output format {output_format!r}. Use one of {', '.join(FORMATS)}")
+    return WRITERS[output_format](path, metadata)
+
+
+# Readers
+
+def iter_json_array(path: str, key: str, chunk_size: int = 1 << 16) -> Iterator[Dict[str, Any]]:
+    """Yield the objects of the top-level array ``key`` without loading the whole file"""
+    decoder = json.JSONDecoder()
+    start = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = ""
+        while True:
+            chunk = f.read(chunk_size)
+            buffer += chunk
+            match = start.search(buffer)
+            if match:
+                buffer = buffer[match.end():]
+                break
+            if not chunk:
+                return
+            buffer = buffer[-(len(key) + 16):]
+
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == "]":
+                return
+            try:
+                if pos >= len(buffer):
+                    raise ValueError("need more data")
+                item, pos = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    if pos < len(buffer):
+                        logger.warning(f"Truncated {key!r} array in {path}")
+                    return
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+            yield item
+
+
+def iter_csv(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield CSV rows with the simulator's numeric columns converted back"""
+    if not os.path.exists(path):
+        return
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            for field, value in row.items():
+                if field in TEXT_FIELDS or value in ("", None):
+                    continue
+                try:
+                    row[field] = int(value) if field in INT_FIELDS else float(value)
+                except ValueError:
+                    pass
+            yield row
+
+
+def iter_ndjson(path: str, kind: Optional[str] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield (type, data) lines, optionally only those of ``kind``"""
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if kind is None or record.get("type") == kind:
+                yield record.get("type"), record.get("data")
+
+
+def iter_columnar_blocks(path: str) -> Iterator[Tuple[Dict[str, Any], Any]]:
+    """Yield (header, payload) per block; telemetry payloads are column dicts.
+
+    Each block is read on demand, so only one block is in memory at a time.
+    The current driver list is passed along as ``header["driver_ids"]``.
+    """
+    driver_ids: List[str] = []
+    with open(path, "rb") as f:
+        if f.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+            raise ValueError(f"Not a columnar session file: {path}")
+        while True:
+            size = f.read(4)
+            if len(size) < 4:
+                return
+            header = json.loads(f.read(struct.unpack("<I", size)[0]))
+            payload = f.read(header["nbytes"])
+            if header["kind"] == "metadata":
+                metadata = json.loads(payload)
+                driver_ids = list(metadata.get("drivers", driver_ids))
+                yield header, metadata
+            elif header["kind"] == "radio":
+                yield header, json.loads(payload)
+            elif header["kind"] == "telemetry":
+                rows = header["rows"]
+                columns = {}
+                offset = 0
+                for name, dtype in COLUMNAR_DTYPES:
+                    columns[name] = np.frombuffer(payload, dtype=dtype, count=rows, offset=offset)
+                    offset += rows * np.dtype(dtype).itemsize
+                header["driver_ids"] = driver_ids
+                yield header, columns
+
+
+def iter_session(path: str, kind: Optional[str] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Lazily yield ("telemetry" | "radio", message) from any session file.
+
+    Works for the simulator's JSON, NDJSON, CSV and columnar outputs;
+    ``kind`` restricts the output to one stream. Records come back in file
+    order, which for JSON and CSV means all telemetry before any radio.
+    """
+    fmt = format_for_path(path)
+    if fmt == JSON:
+        for name in ("telemetry", "radio"):
+            if kind in (None, name):
+                for message in iter_json_array(path, name):
+                    yield name, message
+    elif fmt == CSV:
+        telemetry_path, radio_path = csv_paths(path)
+        for name, part in (("telemetry", telemetry_path), ("radio", radio_path)):
+            if kind in (None, name):
+                for message in iter_csv(part):
+                    yield name, message
+    elif fmt == NDJSON:
+        for name, data in iter_ndjson(path, kind):
+            if name in ("telemetry", "radio"):
+                yield name, data
+    else:
+        for header, payload in iter_columnar_blocks(path):
+            if header["kind"] == "telemetry" and kind in (None, "telemetry"):
+                for message in columns_to_records(payload, header["driver_ids"]):
+                    yield "telemetry", message
+            elif header["kind"] == "radio" and kind in (None, "radio"):
+                for message in payload:
+                    yield "radio", message
+
+
+def iter_telemetry(path: str) -> Iterator[Dict[str, Any]]:
+    """Telemetry messages of a session file, read lazily"""
+    for _, message in iter_session(path, "telemetry"):
+        yield message
+
+
+def iter_radio(path: str) -> Iterator[Dict[str, Any]]:
+    """Radio messages of a session file, read lazily"""
+    for _, message in iter_session(path, "radio"):
+        yield message
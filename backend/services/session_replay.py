@@ -0,0 +1,215 @@
+"""
+Session Replay Service for F1 Race Engineer AI
+Streams a recorded session into the gateway in real time, N× or flat out
+"""
+
+import asyncio
+import heapq
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from services.history_store import parse_timestamp
+from services.kafka_consumer import KafkaConsumer
+from services.session_files import iter_radio, iter_telemetry
+from services.telemetry_store import DATA_SUFFIX, DriverSegmentFile
+
+logger = logging.getLogger(__name__)
+
+# (epoch seconds, "telemetry" | "radio", message)
+Record = Tuple[float, str, Dict[str, Any]]
+
+# Time inserted between the end of a recording and its next loop
+LOOP_GAP_S = 1.0
+
+
+def iter_store_session(directory: str, start_lap: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Yield a recorded TelemetryStore session in timestamp order across drivers.
+
+    With ``start_lap``, each driver's earlier blocks are skipped through the
+    block index instead of being read and discarded.
+    """
+    def driver_rows(driver_id: str):
+        segment = DriverSegmentFile(directory, driver_id)
+        for columns in segment.iter_blocks(from_lap=start_lap):
+            for i in range(len(columns["ts"])):
+                if start_lap is not None and columns["lap"][i] < start_lap:
+                    continue
+                message = {"ts": datetime.fromtimestamp(float(columns["ts"][i])).isoformat(),
+                           "driver_id": driver_id}
+                for name, values in columns.items():
+                    if name != "ts":
+                        message[name] = values[i].item()
+                yield float(columns["ts"][i]), message
+
+    drivers = sorted(name[:-len(DATA_SUFFIX)] for name in os.listdir(directory) if name.endswith(DATA_SUFFIX))
+    for _, message in heapq.merge(*(driver_rows(d) for d in drivers), key=lambda item: item[0]):
+        yield message
+
+
+def open_recording(path: str, start_lap: Optional[int] = None) -> Tuple[Callable[[], Iterator], Callable[[], Iterator]]:
+    """Factories for fresh telemetry and radio iterators over a recording.
+
+    Accepts any simulator output (JSON, NDJSON, columnar or the CSV pair
+    ``x_telemetry.csv`` and ``x_radio.csv``, given as either file or
+    ``x.csv``) or a TelemetryStore session directory. A store session
+    seeks to ``start_lap`` through its block index; file iterators start at
+    the beginning and are skipped ahead by the caller.
+    """
+    if os.path.isdir(path):
+        return (lambda: iter_store_session(path, start_lap)), (lambda: iter(()))
+    return (lambda: iter_telemetry(path)), (lambda: iter_radio(path))
+
+
+def parse_speed(value: Any) -> float:
+    """Replay speed multiplier; "max" (or 0) means as fast as the gateway consumes"""
+    if isinstance(value, str):
+        value = value.strip().lower()
+        if value in ("max", "fast", ""):
+            return 0.0
+        value = value.rstrip("x")
+    speed = float(value)
+    if speed < 0:
+        raise ValueError("Replay speed must be positive")
+    return speed
+
+
+class SessionReplay(KafkaConsumer):
+    """Replays a recording through the same queues the Kafka poll threads fill.
+
+    A reader thread merges the recording's telemetry and radio streams by
+    timestamp, reading the files lazily, and hands batches to the event loop
+    with the same backpressure as live ingestion, so ``process_kafka_messages``
+    cannot tell the difference. ``speed`` 1.0 is real time, N replays N times
+    faster and 0 ("max") sends batches of ``batch_size`` as fast as the
+    gateway drains them. ``start_lap`` skips ahead to the first sample of
+    that lap; with ``loop`` the session restarts from there, shifting
+    timestamps forward so they keep increasing. With ``rebase`` every
+    message is stamped with the wall-clock time it is handed to the
+    gateway, which makes ts-to-client latency measurable.
+    """
+
+    def __init__(self, path: Optional[str] = None, speed: Any = None, start_lap: Optional[int] = None,
+                 loop: Optional[bool] = None, batch_size: Optional[int] = None,
+                 rebase: Optional[bool] = None):
+        super().__init__()
+        self.path = path or os.getenv("REPLAY_FILE")
+        self.speed = parse_speed(speed if speed is not None else os.getenv("REPLAY_SPEED", "1"))
+        self.start_lap = start_lap if start_lap is not None else int(os.getenv("REPLAY_START_LAP") or 0) or None
+        self.loop = loop if loop is not None else os.getenv("REPLAY_LOOP", "false").lower() == "true"
+        self.batch_size = batch_size or int(os.getenv("REPLAY_BATCH_SIZE", "500"))
+        self.rebase = rebase if rebase is not None else os.getenv("REPLAY_REBASE", "false").lower() == "true"
+        self.telemetry_source, self.radio_source = open_recording(self.path, self.start_lap)
+        self.started = False
+        self.replay_stats = {"loops": 0, "lap": None, "session_s": 0.0, "finished": False, "behind_s": 0.0}
+
+    @property
+    def connected(self) -> bool:
+        return self.started
+
+    async def initialize(self):
+        """Nothing to connect to; start the reader thread"""
+        self.start()
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        self.telemetry_queue = asyncio.Queue(maxsize=self.queue_size)
+        self.radio_queue = asyncio.Queue(maxsize=self.queue_size)
+        self._running.set()
+        thread = threading.Thread(target=self._replay_loop, args=(loop,), name="session-replay", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        self.started = True
+        speed = "max" if self.speed == 0 else f"{self.speed:g}x"
+        logger.info(f"Replaying {self.path} at {speed}"
+                    + (f" from lap {self.start_lap}" if self.start_lap else "")
+                    + (", looping" if self.loop else ""))
+
+    def _records(self) -> Iterator[Record]:
+        """Telemetry and radio merged by timestamp, starting at ``start_lap``"""
+        def tagged(source, kind):
+            for message in source():
+                yield parse_timestamp(message.get("ts")), kind, message
+
+        merged = heapq.merge(tagged(self.telemetry_source, "telemetry"), tagged(self.radio_source, "radio"),
+                             key=lambda record: record[0])
+        seeking = self.start_lap is not None
+        for record in merged:
+            if seeking:
+                if record[1] != "telemetry" or (record[2].get("lap") or 0) < self.start_lap:
+                    continue
+                seeking = False
+            yield record
+
+    def _replay_loop(self, loop: asyncio.AbstractEventLoop):
+        """Reader thread body: pace records by their timestamps and hand over batches"""
+        batches: Dict[str, List[Dict[str, Any]]] = {"telemetry": [], "radio": []}
+        queues = {"telemetry": self.telemetry_queue, "radio": self.radio_queue}
+
+        def flush():
+            for name, messages in batches.items():
+                if messages:
+                    self._hand_off(name, queues[name], messages, loop)
+                    batches[name] = []
+
+        shift = 0.0
+        wall_start = None
+        first_ts = None
+        try:
+            while self._running.is_set():
+                pass_start = pass_end = None
+                for ts, kind, message in self._records():
+                    if not self._running.is_set():
+                        break
+                    if ts == ts:  # not NaN
+                        if pass_start is None:
+                            pass_start = ts
+                        pass_end = ts
+                        if shift:
+                            ts += shift
+                            message = {**message, "ts": datetime.fromtimestamp(ts).isoformat()}
+                        if first_ts is None:
+                            first_ts = ts
+                            wall_start = time.monotonic()
+                        if self.speed > 0:
+                            wait = wall_start + (ts - first_ts) / self.speed - time.monotonic()
+                            if wait > 0.001:
+                                flush()
+                                self.replay_stats["behind_s"] = 0.0
+                                time.sleep(wait)
+                            else:
+                                self.replay_stats["behind_s"] = max(0.0, -wait)
+                        self.replay_stats["session_s"] = ts - first_ts
+                    if kind == "telemetry":
+                        self.replay_stats["lap"] = message.get("lap")
+
+                    if self.rebase:
+                        message = {**message, "ts": datetime.now().isoformat()}
+
+                    batches[kind].append(message)
+                    if len(batches[kind]) >= self.batch_size:
+                        flush()
+                flush()
+
+                if not self.loop or pass_start is None:
+                    break
+                shift += pass_end - pass_start + LOOP_GAP_S
+                self.replay_stats["loops"] += 1
+        except Exception as e:
+            logger.error(f"Error replaying {self.path}: {e}")
+        self.replay_stats["finished"] = True
+        logger.info(f"Replay of {self.path} finished")
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = super().get_stats()
+        stats["replay"] = {
+            "path": self.path,
+            "speed": self.speed or "max",
+            **self.replay_stats,
+            "session_s": round(self.replay_stats["session_s"], 3),
+            "behind_s": round(self.replay_stats["behind_s"], 3)
+        }
+        return stats
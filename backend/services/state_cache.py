@@ -0,0 +1,88 @@
+"""
+State Cache Service for F1 Race Engineer AI
+Latest published state per driver, replayed to clients as they join
+"""
+
+import logging
+import os
+from collections import deque
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Tuple
+
+from services.connection_manager import ALL_DRIVERS
+
+logger = logging.getLogger(__name__)
+
+# Channels where only the newest event per driver matters
+LATEST_CHANNELS = ("telemetry", "anomaly", "summary")
+
+
+class LatestStateCache:
+    """The newest encoded event per (channel, driver), plus recent radio.
+
+    Events are recorded from each tick frame as the already-serialized
+    strings the frame sends, so keeping the cache costs no encoding. A
+    joining client gets one ``snapshot`` frame holding the events its
+    subscriptions select. Snapshot frames are cached per subscription set
+    until the next tick changes the state, so a reconnect storm builds each
+    distinct snapshot once and every other client reuses the string.
+    """
+
+    def __init__(self, radio_size: Optional[int] = None):
+        self.radio_size = radio_size or int(os.getenv("STATE_CACHE_RADIO", "50"))
+        self.latest: Dict[Tuple[str, str], str] = {}
+        self.radio: deque = deque(maxlen=self.radio_size)
+        self.version = 0
+        # Snapshot frames built at ``version``, by subscription set
+        self._frames: Dict[FrozenSet[Tuple[str, str]], Optional[str]] = {}
+        self._frames_version = 0
+        self.stats = {"snapshots": 0, "built": 0, "bytes": 0}
+
+    def record(self, frame) -> None:
+        """Keep the latest-state events of a tick frame that is about to flush"""
+        changed = False
+        for event, (channel, driver_id) in zip(frame.events, frame.routes):
+            if channel in LATEST_CHANNELS:
+                self.latest[(channel, driver_id)] = event
+                changed = True
+            elif channel == "radio":
+                self.radio.append((driver_id, event))
+                changed = True
+        if changed:
+            self.version += 1
+
+    def snapshot(self, subscriptions: Iterable[Tuple[str, str]]) -> Optional[str]:
+        """Encoded snapshot frame for a subscription set, None if it selects nothing"""
+        signature = frozenset(subscriptions)
+        if self._frames_version != self.version:
+            self._frames = {}
+            self._frames_version = self.version
+        self.stats["snapshots"] += 1
+        if signature not in self._frames:
+            self._frames[signature] = self._build(signature)
+            self.stats["built"] += 1
+        message = self._frames[signature]
+        if message is not None:
+            self.stats["bytes"] += len(message)
+        return message
+
+    @staticmethod
+    def _wants(signature: FrozenSet[Tuple[str, str]], channel: str, driver_id: str) -> bool:
+        return (channel, driver_id) in signature or (channel, ALL_DRIVERS) in signature
+
+    def _build(self, signature: FrozenSet[Tuple[str, str]]) -> Optional[str]:
+        # Latest state first, then radio oldest to newest, as a live client saw them
+        events = [event for channel in LATEST_CHANNELS
+                  for (cached_channel, driver_id), event in self.latest.items()
+                  if cached_channel == channel and self._wants(signature, channel, driver_id)]
+        events.extend(event for driver_id, event in self.radio if self._wants(signature, "radio", driver_id))
+        if not events:
+            return None
+        return '{"type":"snapshot","events":[' + ",".join(events) + "]}"
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self.latest),
+            "radio": len(self.radio),
+            "cached_frames": len(self._frames),
+            **self.stats
+        }
@@ -0,0 +1,164 @@
+"""
+State Snapshot Service for F1 Race Engineer AI
+Periodic on-disk snapshots of detector and driver state for warm restarts
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from services.telemetry_store import _safe_name
+
+logger = logging.getLogger(__name__)
+
+DRIVER_STATES_FILE = "driver_states.json"
+
+
+class StateSnapshotter:
+    """Saves the anomaly detector's per-driver state so a restart resumes warm.
+
+    Every ``interval_s`` the drivers whose state changed since the last
+    snapshot are written, one ``.npz`` file each (the raw window arrays and
+    the position table, no pickles), with a write-to-temp-and-rename so a
+    crash mid-write leaves the previous snapshot intact. Files are written on
+    a worker thread; only the copy of the state happens on the event loop.
+    On startup the files are loaded back, so baselines exist before the
+    first message arrives. Snapshots older than ``max_age_s`` belong to an
+    earlier session and are ignored.
+    """
+
+    def __init__(self, directory: Optional[str] = None, interval_s: Optional[float] = None,
+                 max_age_s: Optional[float] = None):
+        self.directory = directory if directory is not None else os.getenv("SNAPSHOT_DIR", "data/snapshots")
+        self.interval_s = interval_s or float(os.getenv("SNAPSHOT_INTERVAL_S", "10"))
+        self.max_age_s = max_age_s or float(os.getenv("SNAPSHOT_MAX_AGE_S", "21600"))
+        self.detector = None
+        self.driver_states: Optional[Dict[str, Dict[str, Any]]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self.stats = {"snapshots": 0, "drivers_written": 0, "bytes_written": 0, "restored_drivers": 0,
+                      "errors": 0, "last_snapshot_s": None}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory)
+
+    def _path(self, driver_id: str) -> str:
+        return os.path.join(self.directory, f"{_safe_name(driver_id)}.npz")
+
+    async def restore(self, detector, driver_states: Dict[str, Dict[str, Any]]):
+        """Load the last snapshot into ``detector`` and ``driver_states``; both are then snapshotted"""
+        self.detector = detector
+        self.driver_states = driver_states
+        if not self.enabled:
+            return
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            states, mock_states = await loop.run_in_executor(None, self._read)
+            if states:
+                await detector.import_state(states)
+            driver_states.update(mock_states)
+            self.stats["restored_drivers"] = len(states)
+            if states:
+                logger.info(f"Restored detector state for {len(states)} drivers "
+                            f"in {(time.perf_counter() - started) * 1e3:.0f} ms")
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Error restoring state snapshot: {e}")
+
+    def _read(self):
+        states = {}
+        mock_states = {}
+        if not os.path.isdir(self.directory):
+            return states, mock_states
+        cutoff = time.time() - self.max_age_s
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if not name.endswith((".npz", ".json")) or os.path.getmtime(path) < cutoff:
+                continue
+            try:
+                if name == DRIVER_STATES_FILE:
+                    with open(path) as f:
+                        for driver_id, state in json.load(f).items():
+                            state["last_update"] = datetime.fromisoformat(state["last_update"])
+                            mock_states[driver_id] = state
+                elif name.endswith(".npz"):
+                    with np.load(path, allow_pickle=False) as data:
+                        state = {key: data[key] for key in data.files}
+                    states[str(state.pop("driver_id"))] = state
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Skipping unreadable snapshot {path}: {e}")
+        return states, mock_states
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval_s)
+            await self.snapshot()
+
+    async def snapshot(self):
+        """Write the drivers whose state changed since the last snapshot"""
+        if not self.enabled or self.detector is None:
+            return
+        async with self._lock:
+            started = time.perf_counter()
+            try:
+                states = await self.detector.export_state(dirty_only=True)
+                mock_states = {driver_id: {**state, "last_update": state["last_update"].isoformat()}
+                               for driver_id, state in (self.driver_states or {}).items()}
+                loop = asyncio.get_running_loop()
+                written = await loop.run_in_executor(None, self._write, states, mock_states)
+                self.stats["snapshots"] += 1
+                self.stats["drivers_written"] += len(states)
+                self.stats["bytes_written"] += written
+                self.stats["last_snapshot_s"] = round(time.perf_counter() - started, 4)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Error writing state snapshot: {e}")
+
+    def _write(self, states: Dict[str, Dict[str, np.ndarray]], mock_states: Dict[str, Dict[str, Any]]) -> int:
+        os.makedirs(self.directory, exist_ok=True)
+        written = 0
+        for driver_id, state in states.items():
+            path = self._path(driver_id)
+            if not len(state["features"]):
+                # The driver was reset; its old snapshot must not come back
+                if os.path.exists(path):
+                    os.remove(path)
+                continue
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                np.savez(f, driver_id=np.array(driver_id), saved_at=np.array(time.time()), **state)
+            os.replace(tmp, path)
+            written += os.path.getsize(path)
+        if mock_states:
+            path = os.path.join(self.directory, DRIVER_STATES_FILE)
+            with open(path + ".tmp", "w") as f:
+                json.dump(mock_states, f)
+            os.replace(path + ".tmp", path)
+        return written
+
+    async def close(self):
+        """Stop the periodic task and write a final snapshot"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.snapshot()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "directory": self.directory, "interval_s": self.interval_s, **self.stats}
@@ -0,0 +1,202 @@
+"""
+Telemetry Series Service for F1 Race Engineer AI
+Downsampled historical telemetry from the store, encoded for charts
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from services.history_store import parse_timestamp
+from services.telemetry_store import COLUMN_NAMES, TelemetryStore, _safe_name
+
+logger = logging.getLogger(__name__)
+
+METHODS = ("lttb", "minmax")
+
+# Decimals kept per field in responses; integer columns are sent as ints
+FIELD_DECIMALS = {
+    "distance_m": 1,
+    "track_x": 4,
+    "speed_kph": 1,
+    "throttle_pct": 3,
+    "brake_pct": 3
+}
+SERIES_FIELDS = [name for name in COLUMN_NAMES if name != "ts"]
+
+
+def lttb(x: np.ndarray, y: np.ndarray, points: int) -> np.ndarray:
+    """Indices of the Largest-Triangle-Three-Buckets downsample of ``(x, y)``.
+
+    Keeps the first and last sample and, from each of ``points - 2`` equal
+    buckets in between, the sample forming the largest triangle with the
+    previously kept sample and the mean of the next bucket.
+    """
+    n = len(x)
+    if points >= n or points < 3:
+        return np.arange(n)
+    y = np.nan_to_num(y)
+    edges = (np.arange(points - 1) * ((n - 2) / (points - 2))).astype(np.intp) + 1
+    edges[-1] = n - 1
+    # Mean of every bucket, and of the last sample as the final "next bucket"
+    counts = np.diff(np.append(edges, n))
+    mean_x = np.add.reduceat(x, edges) / counts
+    mean_y = np.add.reduceat(y, edges) / counts
+
+    selected = np.empty(points, dtype=np.intp)
+    selected[0] = 0
+    a = 0
+    for i in range(points - 2):
+        start, end = edges[i], edges[i + 1]
+        area = np.abs((x[a] - mean_x[i + 1]) * (y[start:end] - y[a])
+                      - (x[a] - x[start:end]) * (mean_y[i + 1] - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    selected[-1] = n - 1
+    return selected
+
+
+def minmax(y: np.ndarray, points: int) -> np.ndarray:
+    """Indices of each bucket's minimum and maximum, in time order"""
+    n = len(y)
+    buckets = points // 2
+    if points >= n or buckets < 1:
+        return np.arange(n)
+    y = np.nan_to_num(y)
+    edges = (np.arange(buckets + 1) * (n / buckets)).astype(np.intp)
+    selected = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        chunk = y[start:end]
+        low, high = start + int(np.argmin(chunk)), start + int(np.argmax(chunk))
+        selected.extend((low, high) if low <= high else (high, low))
+    return np.unique(np.array(selected, dtype=np.intp))
+
+
+def _bound(value: Any) -> Optional[float]:
+    """A query-string time bound, epoch seconds or an ISO-8601 string, as epoch seconds"""
+    if value is None:
+        return None
+    seconds = float("nan")
+    if isinstance(value, str):
+        try:
+            seconds = float(value)
+        except ValueError:
+            pass
+    if seconds != seconds:
+        seconds = parse_timestamp(value)
+    if seconds != seconds:  # NaN
+        raise ValueError(f"Invalid time bound {value!r}, expected epoch seconds or ISO-8601")
+    return seconds
+
+
+class TelemetrySeries:
+    """Chart series over TelemetryStore, at most ``max_points`` samples each.
+
+    A query reads only the store blocks that overlap it, picks the samples
+    to keep with LTTB (or per-bucket min/max) on one ``shape_field``, and
+    returns every requested field at those samples as columnar JSON with
+    millisecond offsets for time. Responses for a lap the store already
+    holds in full are kept in an LRU cache, so reloading a chart of a
+    finished lap costs a dictionary lookup.
+    """
+
+    def __init__(self, store: TelemetryStore, max_points: Optional[int] = None,
+                 default_points: Optional[int] = None, cache_size: Optional[int] = None):
+        self.store = store
+        self.max_points = max_points or int(os.getenv("TELEMETRY_API_MAX_POINTS", "2000"))
+        self.default_points = default_points or int(os.getenv("TELEMETRY_API_DEFAULT_POINTS", "500"))
+        self.cache_size = cache_size or int(os.getenv("TELEMETRY_API_CACHE_SIZE", "256"))
+        self.cache: "OrderedDict[tuple, str]" = OrderedDict()
+        # Queries run on executor threads
+        self._lock = threading.Lock()
+        self.stats = {"queries": 0, "cache_hits": 0, "raw_rows": 0, "query_s": 0.0}
+
+    def series(self, driver_id: str, start: Any = None, end: Any = None, lap: Optional[int] = None,
+               points: Optional[int] = None, fields: Optional[Sequence[str]] = None,
+               method: str = "lttb", shape_field: str = "speed_kph", session: Optional[str] = None) -> str:
+        """Encoded series for a driver; raises ValueError on unknown fields, method or time bounds"""
+        fields = list(fields or SERIES_FIELDS)
+        unknown = [f for f in [*fields, shape_field] if f not in SERIES_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        if method not in METHODS:
+            raise ValueError(f"Unknown method {method!r}, expected one of {', '.join(METHODS)}")
+        points = min(max(points or self.default_points, 2), self.max_points)
+        start, end = _bound(start), _bound(end)
+        session = _safe_name(session) if session else self.store.session
+
+        started = time.perf_counter()
+        key = None
+        if lap is not None and start is None and end is None and self.store.lap_complete(driver_id, lap, session):
+            key = (session, driver_id, lap, points, tuple(fields), method, shape_field)
+        with self._lock:
+            self.stats["queries"] += 1
+            cached = self.cache.get(key) if key is not None else None
+            if cached is not None:
+                self.cache.move_to_end(key)
+                self.stats["cache_hits"] += 1
+                return cached
+
+        columns = self.store.query(driver_id, lap=lap, start=start, end=end, session=session,
+                                   fields=["ts", *dict.fromkeys([*fields, shape_field])])
+        encoded = self._encode(driver_id, session, lap, method, columns, fields, shape_field, points)
+
+        with self._lock:
+            self.stats["raw_rows"] += len(columns["ts"])
+            self.stats["query_s"] += time.perf_counter() - started
+            if key is not None:
+                self.cache[key] = encoded
+                if len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        return encoded
+
+    def _encode(self, driver_id: str, session: str, lap: Optional[int], method: str,
+                columns: Dict[str, np.ndarray], fields: Sequence[str], shape_field: str, points: int) -> str:
+        ts = columns["ts"]
+        known = ~np.isnan(ts)
+        if not known.all():
+            columns = {name: values[known] for name, values in columns.items()}
+            ts = columns["ts"]
+        if method == "lttb":
+            selected = lttb(ts, columns[shape_field].astype(np.float64), points)
+        else:
+            selected = minmax(columns[shape_field].astype(np.float64), points)
+
+        t0 = float(ts[0]) if len(ts) else None
+        body = {
+            "driver_id": driver_id,
+            "session": session,
+            "lap": lap,
+            "method": method,
+            "raw_points": int(len(ts)),
+            "points": int(len(selected)),
+            "t0": t0
+        }
+        # Columns sit under their own key so a "lap" field cannot shadow the query's lap
+        series = body["series"] = {
+            # Milliseconds since t0
+            "t": np.rint((ts[selected] - t0) * 1000).astype(np.int64).tolist() if len(ts) else []
+        }
+        for name in fields:
+            values = columns[name][selected]
+            if values.dtype.kind == "f":
+                values = np.round(values, FIELD_DECIMALS.get(name, 3))
+                series[name] = [None if v != v else v for v in values.tolist()]
+            else:
+                series[name] = values.tolist()
+        return json.dumps(body, separators=(",", ":"))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "queries": self.stats["queries"],
+            "cache_hits": self.stats["cache_hits"],
+            "cached": len(self.cache),
+            "raw_rows": self.stats["raw_rows"],
+            "query_ms_total": round(self.stats["query_s"] * 1000, 1)
+        }
@@ -0,0 +1,459 @@
+"""
+Telemetry Store Service for F1 Race Engineer AI
+Append-only columnar telemetry files with lap and time range queries
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from services.history_store import parse_timestamp
+
+logger = logging.getLogger(__name__)
+
+# Fixed-width columns stored for every sample; ts is epoch seconds
+COLUMNS = [
+    ("ts", "<f8"),
+    ("lap", "<i4"),
+    ("sector", "<i4"),
+    ("distance_m", "<f8"),
+    ("track_x", "<f8"),
+    ("speed_kph", "<f8"),
+    ("throttle_pct", "<f8"),
+    ("brake_pct", "<f8"),
+    ("gear", "<i4")
+]
+COLUMN_NAMES = [name for name, _ in COLUMNS]
+COLUMN_DTYPES = {name: np.dtype(dtype) for name, dtype in COLUMNS}
+ROW_BYTES = sum(dtype.itemsize for dtype in COLUMN_DTYPES.values())
+
+# One entry per block in a driver's .idx file
+INDEX_DTYPE = np.dtype([
+    ("offset", "<i8"),
+    ("rows", "<i8"),
+    ("ts_min", "<f8"),
+    ("ts_max", "<f8"),
+    ("lap_min", "<i4"),
+    ("lap_max", "<i4")
+])
+
+DATA_SUFFIX = ".tlm"
+INDEX_SUFFIX = ".idx"
+# Suffix of the files a reclaim writes before renaming them into place
+COMPACT_SUFFIX = ".compact"
+
+
+def _safe_name(name: str) -> str:
+    """``name`` as a single path component: no separators, and never "." or ".." """
+    name = re.sub(r"[^\w.-]", "_", name)
+    return name if name.strip(".") else name.replace(".", "_") or "_"
+
+
+def _write_synced(path: str, data: bytes):
+    with open(path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _block_columns(buffer: Any, rows: int, offset: int) -> Dict[str, np.ndarray]:
+    """Views of one block's columns starting at ``offset`` of ``buffer``"""
+    columns = {}
+    for name in COLUMN_NAMES:
+        columns[name] = np.frombuffer(buffer, dtype=COLUMN_DTYPES[name], count=rows, offset=offset)
+        offset += rows * COLUMN_DTYPES[name].itemsize
+    return columns
+
+
+def _block_bytes(columns: Dict[str, np.ndarray]) -> bytes:
+    return b"".join(np.ascontiguousarray(columns[name], dtype=dtype).tobytes() for name, dtype in COLUMNS)
+
+
+def _index_entry(offset: int, columns: Dict[str, np.ndarray]) -> np.ndarray:
+    entry = np.zeros(1, dtype=INDEX_DTYPE)
+    entry["offset"] = offset
+    entry["rows"] = len(columns["ts"])
+    entry["ts_min"] = np.nanmin(columns["ts"]) if not np.isnan(columns["ts"]).all() else np.nan
+    entry["ts_max"] = np.nanmax(columns["ts"]) if not np.isnan(columns["ts"]).all() else np.nan
+    entry["lap_min"] = columns["lap"].min()
+    entry["lap_max"] = columns["lap"].max()
+    return entry
+
+
+class DriverSegmentFile:
+    """One driver's telemetry for one session: a data file plus its block index.
+
+    The data file is a sequence of blocks; each block holds ``rows`` samples
+    stored column after column (all ``ts`` values, then all ``lap`` values,
+    ...), so a column of a block is one contiguous fixed-width array. Every
+    block gets an index entry with its offset and ts/lap bounds, which is all
+    a range query needs to pick blocks without touching the rest of the file.
+
+    ``compact`` merges the small blocks written since the last compaction
+    into one, appended to the data file and synced before the index is
+    atomically replaced, so existing bytes are never rewritten and a crash
+    leaves either the old index or the new one over valid data. The
+    replaced blocks stay in the file as dead space until ``reclaim``
+    writes the live blocks to a new file and renames it over the old one.
+    """
+
+    def __init__(self, directory: str, driver_id: str):
+        self.driver_id = driver_id
+        self.data_path = os.path.join(directory, _safe_name(driver_id) + DATA_SUFFIX)
+        self.index_path = os.path.join(directory, _safe_name(driver_id) + INDEX_SUFFIX)
+        self._recover()
+        if os.path.exists(self.index_path):
+            self.index = np.fromfile(self.index_path, dtype=INDEX_DTYPE)
+        else:
+            self.index = np.empty(0, dtype=INDEX_DTYPE)
+        # Blocks before this one are final; later ones may still be merged
+        self.compacted = len(self.index)
+        self._mmap: Optional[np.memmap] = None
+        # Guards swapping the index together with the data file it points into
+        self._lock = threading.Lock()
+
+    def _recover(self):
+        """Finish or roll back a ``reclaim`` interrupted by a crash"""
+        data_temp, index_temp = self.data_path + COMPACT_SUFFIX, self.index_path + COMPACT_SUFFIX
+        if os.path.exists(data_temp):
+            # The data file was never swapped, so the old pair is intact
+            for path in (data_temp, index_temp):
+                if os.path.exists(path):
+                    os.remove(path)
+        elif os.path.exists(index_temp):
+            # The data file was swapped; its index has to follow
+            os.replace(index_temp, self.index_path)
+
+    @property
+    def rows(self) -> int:
+        return int(self.index["rows"].sum())
+
+    def append_block(self, columns: Dict[str, np.ndarray]):
+        """Write one block; data first, then its index entry"""
+        rows = len(columns["ts"])
+        if rows == 0:
+            return
+        with open(self.data_path, "ab") as f:
+            offset = f.tell()
+            f.write(_block_bytes(columns))
+
+        entry = _index_entry(offset, columns)
+        with open(self.index_path, "ab") as f:
+            f.write(entry.tobytes())
+        self.index = np.concatenate([self.index, entry])
+
+    def compact(self, end: Optional[int] = None) -> int:
+        """Merge blocks ``[compacted, end)`` (default: all) into one; returns the blocks removed"""
+        end = len(self.index) if end is None else end
+        first = self.compacted
+        if end - first < 2:
+            self.compacted = max(first, end)
+            return 0
+        run = self.index[first:end]
+        with open(self.data_path, "rb") as f:
+            parts = []
+            for block in run:
+                rows = int(block["rows"])
+                f.seek(int(block["offset"]))
+                parts.append(_block_columns(f.read(rows * ROW_BYTES), rows, 0))
+        merged = {name: np.concatenate([part[name] for part in parts]) for name in COLUMN_NAMES}
+
+        with open(self.data_path, "ab") as f:
+            offset = f.tell()
+            f.write(_block_bytes(merged))
+            f.flush()
+            os.fsync(f.fileno())
+        index = np.concatenate([self.index[:first], _index_entry(offset, merged), self.index[end:]])
+        temp_path = self.index_path + ".tmp"
+        _write_synced(temp_path, index.tobytes())
+        with self._lock:
+            os.replace(temp_path, self.index_path)
+            self.index = index
+        self.compacted = first + 1
+        return end - first - 1
+
+    def dead_bytes(self) -> int:
+        """Bytes of the data file no index entry points at"""
+        if not os.path.exists(self.data_path):
+            return 0
+        return os.path.getsize(self.data_path) - self.rows * ROW_BYTES
+
+    def reclaim(self) -> int:
+        """Rewrite the data file with only the indexed blocks, in index order; returns the bytes freed"""
+        freed = self.dead_bytes()
+        if freed <= 0:
+            return 0
+        data_temp, index_temp = self.data_path + COMPACT_SUFFIX, self.index_path + COMPACT_SUFFIX
+        index = self.index.copy()
+        with open(self.data_path, "rb") as source, open(data_temp, "wb") as target:
+            for i, block in enumerate(self.index):
+                source.seek(int(block["offset"]))
+                index["offset"][i] = target.tell()
+                target.write(source.read(int(block["rows"]) * ROW_BYTES))
+            target.flush()
+            os.fsync(target.fileno())
+        _write_synced(index_temp, index.tobytes())
+        # _recover completes these two renames if a crash falls between them
+        with self._lock:
+            os.replace(data_temp, self.data_path)
+            os.replace(index_temp, self.index_path)
+            self.index = index
+            self._mmap = None
+        return freed
+
+    def iter_blocks(self, from_lap: Optional[int] = None) -> Iterator[Dict[str, np.ndarray]]:
+        """Every block's columns in time order, one memory-mapped block at a time.
+
+        With ``from_lap``, blocks that end before that lap are skipped using
+        the index alone.
+        """
+        with self._lock:
+            index = self.index
+            if from_lap is not None:
+                index = index[index["lap_max"] >= from_lap]
+            if len(index) == 0:
+                return
+            # Mapped with the index it belongs to; a later reclaim renames a new file over this one
+            mm = np.memmap(self.data_path, dtype=np.uint8, mode="r")
+        for block in index:
+            yield _block_columns(mm, int(block["rows"]), int(block["offset"]))
+
+    def _blocks(self, lap: Optional[int], start: Optional[float], end: Optional[float]) -> np.ndarray:
+        index = self.index
+        keep = np.ones(len(index), dtype=bool)
+        if lap is not None:
+            keep &= (index["lap_min"] <= lap) & (index["lap_max"] >= lap)
+        # Blocks whose ts bounds are unknown (NaN) are kept and filtered row-wise
+        if start is not None:
+            keep &= ~(index["ts_max"] < start)
+        if end is not None:
+            keep &= ~(index["ts_min"] > end)
+        return index[keep]
+
+    def read(self, lap: Optional[int] = None, start: Optional[float] = None, end: Optional[float] = None,
+             fields: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """Rows matching ``lap`` and ``start <= ts <= end``, read through a memory map"""
+        fields = list(fields or COLUMN_NAMES)
+        # Held while reading so a reclaim never renames a new file under us
+        with self._lock:
+            blocks = self._blocks(lap, start, end)
+            parts: Dict[str, List[np.ndarray]] = {name: [] for name in fields}
+            if len(blocks) == 0:
+                return {name: np.empty(0, dtype=COLUMN_DTYPES[name]) for name in fields}
+
+            # The writer thread may have appended since the file was mapped
+            needed = int((blocks["offset"] + blocks["rows"] * ROW_BYTES).max())
+            mm = self._mmap
+            if mm is None or len(mm) < needed:
+                mm = self._mmap = np.memmap(self.data_path, dtype=np.uint8, mode="r")
+
+            for block in blocks:
+                rows = int(block["rows"])
+                columns = _block_columns(mm, rows, int(block["offset"]))
+                mask = None
+                if lap is not None:
+                    mask = columns["lap"] == lap
+                if start is not None or end is not None:
+                    ts = columns["ts"]
+                    in_range = np.ones(rows, dtype=bool)
+                    if start is not None:
+                        in_range &= ts >= start
+                    if end is not None:
+                        in_range &= ts <= end
+                    mask = in_range if mask is None else mask & in_range
+
+                for name in fields:
+                    values = columns[name]
+                    parts[name].append(values[mask] if mask is not None else values)
+
+            return {name: np.concatenate(chunks) for name, chunks in parts.items()}
+
+
+class TelemetryStore:
+    """Persistent per-session telemetry store fed from the gateway.
+
+    ``append`` only puts the message on an in-memory list, so the broadcast
+    path pays one list append per sample. A writer thread swaps the buffers
+    out every ``flush_interval`` seconds (or sooner once ``flush_rows`` have
+    queued up), converts them to columns and appends one block per driver.
+    When a driver starts a new lap, the blocks written since the previous
+    lap change are merged into one, and whatever is left is merged on
+    ``close``, so a finished session holds about one block per lap. Merges
+    append, so ``close`` also rewrites each file without the dead blocks.
+    Files live under ``<directory>/<session>/<driver>.tlm`` and ``.idx``.
+    """
+
+    def __init__(self, directory: Optional[str] = None, session: Optional[str] = None,
+                 flush_interval: Optional[float] = None, flush_rows: Optional[int] = None):
+        self.enabled = os.getenv("TELEMETRY_STORE_ENABLED", "true").lower() == "true"
+        self.directory = directory or os.getenv("TELEMETRY_STORE_DIR", "data/telemetry")
+        self.session = _safe_name(session or os.getenv("TELEMETRY_SESSION")
+                                  or datetime.now().strftime("%Y%m%d-%H%M%S"))
+        self.flush_interval = flush_interval or float(os.getenv("TELEMETRY_STORE_FLUSH_INTERVAL", "1.0"))
+        self.flush_rows = flush_rows or int(os.getenv("TELEMETRY_STORE_FLUSH_ROWS", "5000"))
+        self.pending: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self.pending_rows = 0
+        self.files: Dict[tuple, DriverSegmentFile] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._running = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"rows_written": 0, "blocks_written": 0, "blocks_compacted": 0, "bytes_reclaimed": 0,
+                      "flush_s": 0.0, "errors": 0}
+
+    @property
+    def session_dir(self) -> str:
+        return os.path.join(self.directory, self.session)
+
+    def start(self):
+        """Start the writer thread"""
+        if not self.enabled or self._thread is not None:
+            return
+        os.makedirs(self.session_dir, exist_ok=True)
+        self._running.set()
+        self._thread = threading.Thread(target=self._writer_loop, name="telemetry-store", daemon=True)
+        self._thread.start()
+        logger.info(f"Telemetry store recording session {self.session} to {self.session_dir}")
+
+    def append(self, message: Dict[str, Any]):
+        """Queue one telemetry sample for the writer thread"""
+        if not self.enabled:
+            return
+        driver_id = message.get("driver_id")
+        if not driver_id:
+            return
+        with self._lock:
+            self.pending[driver_id].append(message)
+            self.pending_rows += 1
+            if self.pending_rows >= self.flush_rows:
+                self._wake.set()
+
+    def extend(self, messages: List[Dict[str, Any]]):
+        for message in messages:
+            self.append(message)
+
+    def _writer_loop(self):
+        while self._running.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Write every pending sample to disk (called from the writer thread and on close)"""
+        with self._lock:
+            pending, self.pending = self.pending, defaultdict(list)
+            self.pending_rows = 0
+        if not pending:
+            return
+
+        start = time.perf_counter()
+        for driver_id, messages in pending.items():
+            try:
+                segment = self._segment(self.session, driver_id)
+                segment.append_block(self._to_columns(messages))
+                self.stats["rows_written"] += len(messages)
+                self.stats["blocks_written"] += 1
+                index = segment.index
+                if len(index) >= 2 and index["lap_max"][-1] > index["lap_max"][-2]:
+                    # A new lap began in this block; the ones before it are closed
+                    self.stats["blocks_compacted"] += segment.compact(len(index) - 1)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Error writing telemetry for {driver_id}: {e}")
+        self.stats["flush_s"] += time.perf_counter() - start
+
+    @staticmethod
+    def _to_columns(messages: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        columns = {"ts": np.array([parse_timestamp(m.get("ts")) for m in messages], dtype="<f8")}
+        for name, dtype in COLUMNS[1:]:
+            fill = 0 if dtype.endswith("i4") else np.nan
+            columns[name] = np.array(
+                [fill if m.get(name) is None else m[name] for m in messages], dtype=dtype
+            )
+        return columns
+
+    def _segment(self, session: str, driver_id: str) -> DriverSegmentFile:
+        key = (session, driver_id)
+        segment = self.files.get(key)
+        if segment is None:
+            directory = os.path.join(self.directory, session)
+            os.makedirs(directory, exist_ok=True)
+            segment = DriverSegmentFile(directory, driver_id)
+            self.files[key] = segment
+        return segment
+
+    def sessions(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(d for d in os.listdir(self.directory)
+                      if os.path.isdir(os.path.join(self.directory, d)))
+
+    def drivers(self, session: Optional[str] = None) -> List[str]:
+        """Drivers with stored telemetry in ``session`` (default: the current one)"""
+        directory = os.path.join(self.directory, _safe_name(session) if session else self.session)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-len(DATA_SUFFIX)] for name in os.listdir(directory) if name.endswith(DATA_SUFFIX))
+
+    def query(self, driver_id: str, lap: Optional[int] = None, start: Any = None, end: Any = None,
+              session: Optional[str] = None, fields: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """Columns for ``driver_id`` filtered by lap and ts window (epoch seconds or ISO strings).
+
+        Only blocks whose index bounds overlap the filter are mapped and read.
+        Samples still waiting for the writer thread are not included.
+        """
+        start = parse_timestamp(start) if start is not None else None
+        end = parse_timestamp(end) if end is not None else None
+        session = _safe_name(session) if session else self.session
+        path = os.path.join(self.directory, session, _safe_name(driver_id) + DATA_SUFFIX)
+        if (session, driver_id) not in self.files and not os.path.exists(path):
+            return {name: np.empty(0, dtype=COLUMN_DTYPES[name]) for name in (fields or COLUMN_NAMES)}
+        return self._segment(session, driver_id).read(lap=lap, start=start, end=end, fields=fields)
+
+    def lap_complete(self, driver_id: str, lap: int, session: Optional[str] = None) -> bool:
+        """True once a later lap is on disk; a driver's blocks are written in order, so ``lap`` is final"""
+        session = _safe_name(session) if session else self.session
+        path = os.path.join(self.directory, session, _safe_name(driver_id) + INDEX_SUFFIX)
+        if (session, driver_id) not in self.files and not os.path.exists(path):
+            return False
+        index = self._segment(session, driver_id).index
+        return bool(len(index)) and int(index["lap_max"].max()) > lap
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "session": self.session,
+            "pending_rows": self.pending_rows,
+            "rows_written": self.stats["rows_written"],
+            "blocks_written": self.stats["blocks_written"],
+            "blocks_compacted": self.stats["blocks_compacted"],
+            "bytes_reclaimed": self.stats["bytes_reclaimed"],
+            "flush_ms_total": round(self.stats["flush_s"] * 1000, 1),
+            "errors": self.stats["errors"]
+        }
+
+    def close(self):
+        """Stop the writer thread and write what is left"""
+        self._running.clear()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self.enabled:
+            self.flush()
+            for (session, driver_id), segment in self.files.items():
+                if session != self.session:
+                    continue
+                try:
+                    self.stats["blocks_compacted"] += segment.compact()
+                    self.stats["bytes_reclaimed"] += segment.reclaim()
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    logger.error(f"Error compacting telemetry for {driver_id}: {e}")
@@ -0,0 +1,163 @@
+"""
+Tick Frame Coalescing for F1 Race Engineer AI
+Gathers every event produced in one gateway tick into a single encoded frame
+"""
+
+import json
+import logging
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+from services.history_store import parse_timestamp
+from services.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+SERIALIZE_SECONDS = Histogram("f1_serialization_seconds", "JSON encoding time per tick, events and frames")
+BROADCAST_SECONDS = Histogram("f1_broadcast_seconds", "Routing and queueing one tick's frames to clients")
+
+# Per-frame wire overhead: server-to-client WebSocket header for payloads up
+# to 64 KiB plus one TCP/IPv4 segment header (sockets run with TCP_NODELAY,
+# so each send usually leaves as its own segment)
+WS_FRAME_HEADER_BYTES = 4
+TCP_SEGMENT_HEADER_BYTES = 52
+FRAME_OVERHEAD_BYTES = WS_FRAME_HEADER_BYTES + TCP_SEGMENT_HEADER_BYTES
+
+
+class FrameStats:
+    """Counters comparing coalesced tick frames with one frame per event"""
+
+    def __init__(self):
+        self.ticks = 0
+        self.events = 0
+        self.frames_encoded = 0
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.frames_saved = 0
+        self.bytes_saved = 0
+
+    def record(self, event_sizes: List[int], frame_size: int, recipients: int):
+        """Account for one encoded frame delivered to ``recipients`` clients"""
+        n = len(event_sizes)
+        self.frames_encoded += 1
+        per_event_bytes = sum(event_sizes) + n * FRAME_OVERHEAD_BYTES
+        coalesced_bytes = frame_size + FRAME_OVERHEAD_BYTES
+        self.frames_sent += recipients
+        self.bytes_sent += coalesced_bytes * recipients
+        self.frames_saved += (n - 1) * recipients
+        self.bytes_saved += (per_event_bytes - coalesced_bytes) * recipients
+
+    def to_dict(self) -> Dict[str, int]:
+        return {
+            "ticks": self.ticks,
+            "events": self.events,
+            # One encode is shared by every client in the frame's audience
+            "frames_encoded": self.frames_encoded,
+            "frames_sent": self.frames_sent,
+            "bytes_sent": self.bytes_sent,
+            # Every frame is one send call, i.e. one write syscall per client
+            "frames_saved": self.frames_saved,
+            "send_syscalls_saved": self.frames_saved,
+            "wire_bytes_saved": self.bytes_saved
+        }
+
+
+class TickFrame:
+    """Events produced during one tick, flushed as one frame per audience.
+
+    Every event is tagged with its channel (the event ``type``) and driver
+    and serialized exactly once. On flush the connection manager groups
+    clients by the events their subscriptions select, and each distinct
+    group gets one ``tick`` frame whose string is shared by all of its
+    clients. A frame with a single event is sent in the legacy one-message
+    shape.
+    """
+
+    def __init__(self):
+        self.events: List[str] = []
+        self.routes: List[Tuple[str, str]] = []
+        # Event-time ``ts`` of each event, parsed only when the tick is flushed
+        self.timestamps: List[Optional[str]] = []
+        self.serialize_s = 0.0
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def add(self, event: Dict[str, Any], driver_id: Optional[str] = None, channel: Optional[str] = None):
+        """Queue an event for ``driver_id`` on ``channel`` (default: its ``type``)"""
+        data = event.get("data") or {}
+        if driver_id is None:
+            driver_id = data.get("driver_id", "")
+        started = time.perf_counter()
+        self.events.append(json.dumps(event, separators=(",", ":")))
+        self.serialize_s += time.perf_counter() - started
+        self.routes.append((channel or event.get("type", ""), driver_id))
+        self.timestamps.append(data.get("ts") if isinstance(data, dict) else None)
+
+    def add_encoded(self, event: str, driver_id: str, channel: str, ts: Optional[str] = None):
+        """Queue an already-serialized event (e.g. one fanned out from another replica)"""
+        self.events.append(event)
+        self.routes.append((channel, driver_id))
+        self.timestamps.append(ts)
+
+    def add_for_driver(self, driver_id: str, event: Dict[str, Any]):
+        """Queue a driver-scoped event (anomaly, summary)"""
+        self.add(event, driver_id)
+
+    @staticmethod
+    def encode(events: List[str]) -> str:
+        if len(events) == 1:
+            return events[0]
+        return '{"type":"tick","events":[' + ",".join(events) + "]}"
+
+    def _coalesce_key(self, indices: Tuple[int, ...]) -> Optional[str]:
+        """A newer telemetry-only frame for the same drivers supersedes a pending one"""
+        drivers = []
+        for i in indices:
+            channel, driver_id = self.routes[i]
+            if channel != "telemetry":
+                return None
+            drivers.append(driver_id)
+        return "telemetry:" + ",".join(sorted(drivers))
+
+    async def flush(self, manager, stats: Optional[FrameStats] = None):
+        """Route the tick's events through ``manager`` and record savings"""
+        if stats is not None:
+            stats.ticks += 1
+            stats.events += len(self.events)
+
+        if self.events:
+            started = time.perf_counter()
+            encode_s = 0.0
+            event_times: Dict[str, float] = {}
+            for indices, clients in manager.route(self.routes).items():
+                events = [self.events[i] for i in indices]
+                encode_started = time.perf_counter()
+                frame = self.encode(events)
+                encode_s += time.perf_counter() - encode_started
+                manager.send_frame(clients, frame, self._coalesce_key(indices),
+                                   self._event_time(indices, event_times))
+                if stats is not None:
+                    stats.record([len(e) for e in events], len(frame), len(clients))
+            SERIALIZE_SECONDS.observe(self.serialize_s + encode_s)
+            BROADCAST_SECONDS.observe(time.perf_counter() - started - encode_s)
+
+        self.events = []
+        self.routes = []
+        self.timestamps = []
+        self.serialize_s = 0.0
+
+    def _event_time(self, indices: Tuple[int, ...], cache: Dict[str, float]) -> Optional[float]:
+        """Oldest event-time ``ts`` in a frame, as epoch seconds.
+
+        ISO-8601 strings from one source sort like the times they hold, so
+        only the smallest is parsed.
+        """
+        timestamps = [self.timestamps[i] for i in indices if self.timestamps[i]]
+        if not timestamps:
+            return None
+        oldest = min(timestamps)
+        value = cache.get(oldest)
+        if value is None:
+            value = cache[oldest] = parse_timestamp(oldest)
+        return value if value == value else None
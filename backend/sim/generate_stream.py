@@ -6,22 +6,47 @@ Generates realistic F1 telemetry data for testing and development
 
 import argparse
 import asyncio
-import json
+import bisect
+import logging
 import random
 import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
-import csv
+from typing import Dict, Iterator, List, Any, Optional, Tuple
 import sys
 import os
 
+import numpy as np
+
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from services.kafka_producer import PROFILES, TelemetryProducer
+from services.session_files import FORMATS, SessionWriter, columns_to_records, open_writer
+
+# Track-position bins shared by the scalar and vectorized paths: straight,
+# corner entry, apex, exit, straight
+POSITION_BIN_EDGES = [0.2, 0.4, 0.6, 0.8]
+SPEED_MULTIPLIERS = np.array([1.0, 0.7, 0.5, 0.8, 1.0])
+THROTTLE_MULTIPLIERS = np.array([1.0, 0.3, 0.1, 0.8, 1.0])
+BRAKE_MULTIPLIERS = np.array([0.0, 0.8, 0.2, 0.1, 0.0])
+GEAR_THRESHOLDS = np.array([50, 100, 150, 200, 250, 300])
+# Bulk sessions with a seed start here, offset by the seed in seconds
+SEEDED_START = datetime(2024, 1, 1)
+
+
+def _position_bin(track_position: float) -> int:
+    """Index into the ``*_MULTIPLIERS`` arrays, as ``np.digitize`` on ``POSITION_BIN_EDGES``"""
+    return bisect.bisect_right(POSITION_BIN_EDGES, track_position)
+
+
 class F1TelemetrySimulator:
-    def __init__(self, drivers: int = 2, laps: int = 6):
+    def __init__(self, drivers: int = 2, laps: int = 6, seed: Optional[int] = None):
         self.drivers = drivers
         self.laps = laps
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        if seed is not None:
+            random.seed(seed)
         self.driver_ids = [f"DRIVER_{chr(65+i)}" for i in range(drivers)]
         self.teams = [f"TEAM_{chr(65+i)}" for i in range(drivers)]
         
@@ -130,16 +155,7 @@ class F1TelemetrySimulator:
         variance = profile["speed_variance"]
         
         # Speed varies by track position (slower in corners, faster on straights)
-        if 0.0 <= track_position < 0.2:  # Straight
-            speed_multiplier = 1.0
-        elif 0.2 <= track_position < 0.4:  # Corner entry
-            speed_multiplier = 0.7
-        elif 0.4 <= track_position < 0.6:  # Corner apex
-            speed_multiplier = 0.5
-        elif 0.6 <= track_position < 0.8:  # Corner exit
-            speed_multiplier = 0.8
-        else:  # Straight
-            speed_multiplier = 1.0
+        speed_multiplier = float(SPEED_MULTIPLIERS[_position_bin(track_position)])
         
         # Add sector-based variation
         sector_multiplier = 1.0 + (sector - 1) * 0.1  # Slight increase per sector
@@ -155,42 +171,17 @@ class F1TelemetrySimulator:
         # Base throttle based on speed (higher speed = more throttle)
         base_throttle = min(1.0, speed / 300.0) * throttle_aggression
         
-        # Adjust for track position
-        if 0.0 <= track_position < 0.2:  # Straight - high throttle
-            throttle = base_throttle * 1.0
-            brake = 0.0
-        elif 0.2 <= track_position < 0.4:  # Corner entry - braking
-            throttle = base_throttle * 0.3
-            brake = brake_aggression * 0.8
-        elif 0.4 <= track_position < 0.6:  # Corner apex - coasting
-            throttle = base_throttle * 0.1
-            brake = brake_aggression * 0.2
-        elif 0.6 <= track_position < 0.8:  # Corner exit - accelerating
-            throttle = base_throttle * 0.8
-            brake = brake_aggression * 0.1
-        else:  # Straight - high throttle
-            throttle = base_throttle * 1.0
-            brake = 0.0
+        # Adjust for track position: full throttle on straights, braking into corners
+        position_bin = _position_bin(track_position)
+        throttle = base_throttle * THROTTLE_MULTIPLIERS[position_bin]
+        brake = brake_aggression * BRAKE_MULTIPLIERS[position_bin]
         
-        return min(1.0, throttle), min(1.0, brake)
+        return min(1.0, float(throttle)), min(1.0, float(brake))
     
     def _calculate_gear(self, speed: float, profile: Dict[str, Any]) -> int:
         """Calculate gear based on speed"""
-        # Simplified gear calculation
-        if speed < 50:
-            return 1
-        elif speed < 100:
-            return 2
-        elif speed < 150:
-            return 3
-        elif speed < 200:
-            return 4
-        elif speed < 250:
-            return 5
-        elif speed < 300:
-            return 6
-        else:
-            return 7
+        # One gear per threshold passed
+        return bisect.bisect_right(GEAR_THRESHOLDS, speed) + 1
     
     def generate_radio_message(self, driver_id: str) -> Dict[str, Any]:
         """Generate a random radio message"""
@@ -204,16 +195,162 @@ class F1TelemetrySimulator:
             "text": phrase
         }
     
+    def _profile_arrays(self) -> Dict[str, np.ndarray]:
+        """Driver profiles as per-driver column vectors"""
+        keys = ["base_speed", "speed_variance", "throttle_aggression", "brake_aggression"]
+        return {
+            key: np.array([self.driver_profiles[d][key] for d in self.driver_ids], dtype=float)[:, None]
+            for key in keys
+        }
+    
+    def generate_lap_columns(self, lap: int) -> Dict[str, np.ndarray]:
+        """Generate one lap for every driver at once.
+
+        Applies the same rules as ``generate_telemetry_point`` (distance steps
+        of 50-100 m, speed/throttle/brake multipliers per track-position bin,
+        gear thresholds and noise) to a drivers x points matrix. Returns
+        flat columns in driver-major order plus ``driver_index``.
+        """
+        rng = self.rng
+        profiles = self._profile_arrays()
+        n = self.drivers
+        max_points = int(np.ceil(self.track_length / 50)) + 1
+        
+        steps = rng.uniform(50, 100, size=(n, max_points))
+        distance = np.zeros((n, max_points))
+        np.cumsum(steps[:, :-1], axis=1, out=distance[:, 1:])
+        valid = distance < self.track_length
+        
+        sector = np.minimum(3, (distance / self.sector_length).astype(int) + 1)
+        track_position = (distance % self.track_length) / self.track_length
+        position_bin = np.digitize(track_position, POSITION_BIN_EDGES)
+        
+        speed = (profiles["base_speed"] * SPEED_MULTIPLIERS[position_bin] * (1.0 + (sector - 1) * 0.1)
+                 + rng.uniform(-1, 1, size=(n, max_points)) * profiles["speed_variance"])
+        
+        base_throttle = np.minimum(1.0, speed / 300.0) * profiles["throttle_aggression"]
+        throttle = np.minimum(1.0, base_throttle * THROTTLE_MULTIPLIERS[position_bin])
+        brake = np.minimum(1.0, profiles["brake_aggression"] * BRAKE_MULTIPLIERS[position_bin])
+        gear = np.searchsorted(GEAR_THRESHOLDS, speed, side="right") + 1
+        
+        speed = speed + rng.uniform(-5, 5, size=(n, max_points))
+        throttle = np.clip(throttle + rng.uniform(-0.05, 0.05, size=(n, max_points)), 0, 1)
+        brake = np.clip(brake + rng.uniform(-0.02, 0.02, size=(n, max_points)), 0, 1)
+        
+        driver_index = np.broadcast_to(np.arange(n)[:, None], (n, max_points))
+        return {
+            "driver_index": driver_index[valid],
+            "lap": np.full(int(valid.sum()), lap),
+            "distance_m": distance[valid],
+            "sector": sector[valid],
+            "track_x": track_position[valid],
+            "speed_kph": np.round(speed[valid], 1),
+            "throttle_pct": np.round(throttle[valid], 3),
+            "brake_pct": np.round(brake[valid], 3),
+            "gear": gear[valid]
+        }
+    
+    def generate_bulk(self, start_time: Optional[datetime] = None,
+                      interval: float = 0.01) -> Iterator[Tuple[Dict[str, np.ndarray], List[Dict[str, Any]]]]:
+        """Yield (telemetry columns, radio messages) lap by lap without pacing.
+
+        Samples are ordered lap, driver, distance like the real-time stream
+        and stamped ``interval`` seconds apart from ``start_time``; ``ts`` is
+        a ``datetime64[us]`` column. Without ``start_time`` a seeded
+        simulator starts at ``SEEDED_START`` plus the seed in seconds, so the
+        same seed writes the same file; an unseeded one starts now.
+        """
+        if start_time is None:
+            start_time = SEEDED_START + timedelta(seconds=self.seed) if self.seed is not None else datetime.now()
+        start = np.datetime64(start_time, "us")
+        step = np.timedelta64(int(interval * 1e6), "us")
+        emitted = 0
+        for lap in range(1, self.laps + 1):
+            columns = self.generate_lap_columns(lap)
+            count = len(columns["lap"])
+            columns["ts"] = start + step * np.arange(emitted, emitted + count)
+            emitted += count
+            
+            # 30% chance of a radio message per driver per lap, at the end of its lap
+            radio = []
+            lap_ends = np.flatnonzero(np.diff(np.append(columns["driver_index"], -1)) != 0)
+            chance = self.rng.random(self.drivers) < 0.3
+            phrases = self.rng.integers(len(self.radio_phrases), size=self.drivers)
+            for driver in np.flatnonzero(chance):
+                radio.append({
+                    "ts": str(columns["ts"][lap_ends[driver]]),
+                    "team": self.teams[driver],
+                    "driver_id": self.driver_ids[driver],
+                    "text": self.radio_phrases[phrases[driver]]
+                })
+            yield columns, radio
+    
+    def columns_to_records(self, columns: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+        """Telemetry dicts in the same shape as ``generate_telemetry_point``"""
+        return columns_to_records(columns, self.driver_ids)
+    
+    def live_records(self, loop: bool = False) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield ("telemetry" | "radio", message) with drivers interleaved like a live feed.
+
+        With ``loop`` the session repeats with lap numbers continuing, so a
+        producer can run for as long as it likes.
+        """
+        lap_offset = 0
+        while True:
+            for columns, radio in self.generate_bulk():
+                # Sample k of every driver before sample k+1 of any
+                driver_index = columns["driver_index"]
+                run_starts = np.flatnonzero(np.diff(driver_index, prepend=-1) != 0)
+                run_lengths = np.diff(np.append(run_starts, len(driver_index)))
+                sample = np.arange(len(driver_index)) - np.repeat(run_starts, run_lengths)
+                order = np.lexsort((driver_index, sample))
+                interleaved = {name: values[order] for name, values in columns.items()}
+                interleaved["lap"] = interleaved["lap"] + lap_offset
+                for message in self.columns_to_records(interleaved):
+                    yield "telemetry", message
+                for message in radio:
+                    yield "radio", message
+            if not loop:
+                return
+            lap_offset += self.laps
+    
     async def generate_stream(self, output_format: str = "json", 
-                            output_file: Optional[str] = None) -> None:
-        """Generate telemetry stream"""
-        print(f"Generating F1 telemetry stream for {self.drivers} drivers, {self.laps} laps...")
+                            output_file: Optional[str] = None, realtime: bool = False) -> None:
+        """Generate telemetry stream; ``realtime`` paces points like a live feed.
+
+        Records are handed to a streaming writer as they are generated, so
+        memory does not grow with the number of laps. Progress goes to
+        stderr so stdout can carry the data itself.
+        """
+        print(f"Generating F1 telemetry stream for {self.drivers} drivers, {self.laps} laps...", file=sys.stderr)
         
-        telemetry_data = []
-        radio_data = []
+        metadata = {
+            "drivers": self.driver_ids,
+            "laps": self.laps,
+            "generated_at": datetime.now().isoformat()
+        }
+        try:
+            writer = open_writer(output_format, output_file, metadata)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return
+        
+        with writer:
+            if not realtime:
+                for columns, radio in self.generate_bulk():
+                    writer.write_columns(columns)
+                    writer.write_radio(radio)
+            else:
+                await self._generate_realtime(writer)
         
+        if output_file:
+            print(f"{writer.telemetry_count} telemetry points and {writer.radio_count} radio messages "
+                  f"saved to {output_file}", file=sys.stderr)
+    
+    async def _generate_realtime(self, writer: SessionWriter):
+        """Point-by-point generation with a small delay between points"""
         for lap in range(1, self.laps + 1):
-            print(f"Generating lap {lap}...")
+            print(f"Generating lap {lap}...", file=sys.stderr)
             
             for driver_id in self.driver_ids:
                 # Generate telemetry for this lap
@@ -225,7 +362,7 @@ class F1TelemetrySimulator:
                     telemetry_point = self.generate_telemetry_point(
                         driver_id, lap, distance, sector
                     )
-                    telemetry_data.append(telemetry_point)
+                    writer.write_telemetry(telemetry_point)
                     
                     # Update distance and sector
                     distance += random.uniform(50, 100)  # Variable distance increments
@@ -236,72 +373,33 @@ class F1TelemetrySimulator:
                 
                 # Generate occasional radio messages
                 if random.random() < 0.3:  # 30% chance of radio message per lap
-                    radio_message = self.generate_radio_message(driver_id)
-                    radio_data.append(radio_message)
-        
-        # Output data
-        if output_format == "json":
-            self._output_json(telemetry_data, radio_data, output_file)
-        elif output_format == "csv":
-            self._output_csv(telemetry_data, radio_data, output_file)
-        else:
-            print("Invalid output format. Use 'json' or 'csv'")
-    
-    def _output_json(self, telemetry_data: List[Dict], radio_data: List[Dict], 
-                    output_file: Optional[str] = None):
-        """Output data in JSON format"""
-        output = {
-            "telemetry": telemetry_data,
-            "radio": radio_data,
-            "metadata": {
-                "drivers": self.driver_ids,
-                "laps": self.laps,
-                "generated_at": datetime.now().isoformat(),
-                "total_telemetry_points": len(telemetry_data),
-                "total_radio_messages": len(radio_data)
-            }
-        }
-        
-        if output_file:
-            with open(output_file, 'w') as f:
-                json.dump(output, f, indent=2)
-            print(f"Data saved to {output_file}")
-        else:
-            print(json.dumps(output, indent=2))
-    
-    def _output_csv(self, telemetry_data: List[Dict], radio_data: List[Dict], 
-                   output_file: Optional[str] = None):
-        """Output data in CSV format"""
-        if output_file:
-            # Write telemetry CSV
-            telemetry_file = output_file.replace('.csv', '_telemetry.csv')
-            with open(telemetry_file, 'w', newline='') as f:
-                if telemetry_data:
-                    writer = csv.DictWriter(f, fieldnames=telemetry_data[0].keys())
-                    writer.writeheader()
-                    writer.writerows(telemetry_data)
-            
-            # Write radio CSV
-            radio_file = output_file.replace('.csv', '_radio.csv')
-            with open(radio_file, 'w', newline='') as f:
-                if radio_data:
-                    writer = csv.DictWriter(f, fieldnames=radio_data[0].keys())
-                    writer.writeheader()
-                    writer.writerows(radio_data)
-            
-            print(f"Telemetry data saved to {telemetry_file}")
-            print(f"Radio data saved to {radio_file}")
-        else:
-            print("CSV output requires output file parameter")
+                    writer.write_radio([self.generate_radio_message(driver_id)])
 
 async def main():
     parser = argparse.ArgumentParser(description="F1 Telemetry Stream Generator")
     parser.add_argument("--drivers", type=int, default=2, help="Number of drivers")
     parser.add_argument("--laps", type=int, default=6, help="Number of laps")
-    parser.add_argument("--format", choices=["json", "csv"], default="json", 
+    parser.add_argument("--format", choices=list(FORMATS), default="json", 
                        help="Output format")
     parser.add_argument("--output", type=str, help="Output file path")
-    parser.add_argument("--to", choices=["json", "csv"], help="Alias for --format")
+    parser.add_argument("--to", choices=list(FORMATS), help="Alias for --format")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible sessions")
+    parser.add_argument("--realtime", action="store_true",
+                       help="Generate point by point with live pacing instead of vectorized bulk mode")
+    parser.add_argument("--produce", action="store_true",
+                       help="Publish to the Kafka telemetry and radio topics instead of writing a file")
+    parser.add_argument("--rate", type=float, default=200,
+                       help="Target messages per second when producing (0 = as fast as possible)")
+    parser.add_argument("--profile", choices=list(PROFILES), default="constant", help="Rate profile")
+    parser.add_argument("--ramp-seconds", type=float, default=30,
+                       help="Ramp length for linear/step, burst period for burst")
+    parser.add_argument("--duration", type=float,
+                       help="Seconds to produce for, looping the session (0 = forever); default is one pass")
+    parser.add_argument("--report-interval", type=float, default=5, help="Seconds between rate reports")
+    parser.add_argument("--batch-bytes", type=int, help="Producer batch size (PRODUCER_BATCH_BYTES)")
+    parser.add_argument("--linger-ms", type=float, help="Producer linger (PRODUCER_LINGER_MS)")
+    parser.add_argument("--compression", choices=["none", "gzip", "snappy", "lz4", "zstd"],
+                       help="Producer compression (PRODUCER_COMPRESSION)")
     
     args = parser.parse_args()
     
@@ -309,8 +407,26 @@ async def main():
     if args.to:
         args.format = args.to
     
-    simulator = F1TelemetrySimulator(drivers=args.drivers, laps=args.laps)
-    await simulator.generate_stream(args.format, args.output)
+    simulator = F1TelemetrySimulator(drivers=args.drivers, laps=args.laps, seed=args.seed)
+    
+    if args.produce:
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+        try:
+            producer = TelemetryProducer(batch_size=args.batch_bytes, linger_ms=args.linger_ms,
+                                         compression=args.compression)
+        except Exception as e:
+            print(f"Could not create Kafka producer: {e}", file=sys.stderr)
+            sys.exit(1)
+        try:
+            report = producer.produce(simulator.live_records(loop=args.duration is not None), rate=args.rate,
+                                      profile=args.profile, ramp_s=args.ramp_seconds,
+                                      duration=args.duration, report_interval=args.report_interval)
+            print("Finished: " + producer.format_report(report), file=sys.stderr)
+        finally:
+            producer.close()
+        return
+    
+    await simulator.generate_stream(args.format, args.output, realtime=args.realtime)
 
 if __name__ == "__main__":
     asyncio.run(main())
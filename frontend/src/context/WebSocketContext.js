@@ -2,6 +2,26 @@ import React, { createContext, useContext, useEffect, useState, useRef } from 'r
 
 const WebSocketContext = createContext();
 
+const ISO_TIMESTAMP = /^(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)(?:\.(\d{6}))?(.*)$/;
+const pad = (value, width = 2) => String(value).padStart(width, '0');
+
+// Move an ISO timestamp by a number of milliseconds, keeping microseconds and
+// the offset suffix, formatted like Python's isoformat() on the server
+const shiftTimestamp = (text, ms) => {
+  const match = ISO_TIMESTAMP.exec(text);
+  if (!match) {
+    return text;
+  }
+  const [, year, month, day, hour, minute, second, fraction, suffix] = match;
+  const micros = Date.UTC(+year, month - 1, +day, +hour, +minute, +second) * 1000
+    + Number(fraction || 0) + Math.round(ms * 1000);
+  const micro = ((micros % 1e6) + 1e6) % 1e6;
+  const date = new Date((micros - micro) / 1000);
+  return `${pad(date.getUTCFullYear(), 4)}-${pad(date.getUTCMonth() + 1)}-${pad(date.getUTCDate())}`
+    + `T${pad(date.getUTCHours())}:${pad(date.getUTCMinutes())}:${pad(date.getUTCSeconds())}`
+    + (micro ? `.${pad(micro, 6)}` : '') + suffix;
+};
+
 export const useWebSocket = () => {
   const context = useContext(WebSocketContext);
   if (!context) {
@@ -16,12 +36,137 @@ export const WebSocketProvider = ({ children }) => {
   const [radioData, setRadioData] = useState([]);
   const [anomalies, setAnomalies] = useState({});
   const [summaries, setSummaries] = useState({});
+  // Completed lap aggregates per driver, oldest first
+  const [laps, setLaps] = useState({});
   const [error, setError] = useState(null);
   
   const wsRef = useRef(null);
   const reconnectTimeoutRef = useRef(null);
   const reconnectAttempts = useRef(0);
   const maxReconnectAttempts = 5;
+  const maxLapsPerDriver = 20;
+  // Per-driver delta stream state: { seq, fields, values }
+  const deltaStreams = useRef({});
+
+  // Delta frames use short keys: d=driver_id, s=seq, k=keyframe, f=fields,
+  // v=values, c=changes ({index: value}, strings as [prefixLength, suffix]),
+  // t=milliseconds since the previous frame's ts
+  const applyTelemetryDelta = (data) => {
+    const stream = deltaStreams.current[data.d];
+
+    if (data.k) {
+      deltaStreams.current[data.d] = {
+        seq: data.s,
+        fields: data.f,
+        values: [...data.v]
+      };
+    } else if (!stream || data.s <= stream.seq) {
+      // Not synced yet, or already covered by a newer keyframe
+      return null;
+    } else if (data.s !== stream.seq + 1) {
+      // Missed frames: drop the stream and ask for a keyframe
+      delete deltaStreams.current[data.d];
+      sendMessage({ type: 'keyframe', driver_id: data.d });
+      return null;
+    } else {
+      if (data.t !== undefined) {
+        const tsIndex = stream.fields.indexOf('ts');
+        stream.values[tsIndex] = shiftTimestamp(stream.values[tsIndex], data.t);
+      }
+      Object.entries(data.c).forEach(([index, value]) => {
+        const i = Number(index);
+        stream.values[i] = Array.isArray(value)
+          ? String(stream.values[i]).slice(0, value[0]) + value[1]
+          : value;
+      });
+      stream.seq = data.s;
+    }
+
+    const current = deltaStreams.current[data.d];
+    const telemetry = { driver_id: data.d };
+    current.fields.forEach((field, i) => {
+      telemetry[field] = current.values[i];
+    });
+    return telemetry;
+  };
+
+  const handleMessage = (data) => {
+    switch (data.type) {
+      case 'tick':
+        // One frame per gateway tick carrying several events
+        data.events.forEach(handleMessage);
+        break;
+
+      case 'snapshot': {
+        // Latest state on (re)connect or subscribe; radio replaces what we
+        // had so a reconnect does not duplicate messages
+        const radio = data.events.filter(event => event.type === 'radio');
+        if (radio.length) {
+          setRadioData(radio.map(event => event.data).reverse().slice(0, 50));
+        }
+        data.events.filter(event => event.type !== 'radio').forEach(handleMessage);
+        break;
+      }
+
+      case 'telemetry':
+        setTelemetryData(prev => ({
+          ...prev,
+          [data.data.driver_id]: {
+            ...data.data,
+            timestamp: new Date().toISOString()
+          }
+        }));
+        break;
+        
+      case 'td': {
+        const telemetry = applyTelemetryDelta(data);
+        if (telemetry) {
+          handleMessage({ type: 'telemetry', data: telemetry, anomaly: data.anomaly || null });
+        }
+        break;
+      }
+
+      case 'radio':
+        setRadioData(prev => [data.data, ...prev.slice(0, 49)]); // Keep last 50 messages
+        break;
+        
+      case 'anomaly':
+        setAnomalies(prev => ({
+          ...prev,
+          [data.data.driver_id]: {
+            ...data.data,
+            timestamp: new Date().toISOString()
+          }
+        }));
+        break;
+        
+      case 'summary':
+        setSummaries(prev => ({
+          ...prev,
+          [data.data.driver_id]: {
+            ...data.data,
+            timestamp: new Date().toISOString()
+          }
+        }));
+        break;
+        
+      case 'lap': {
+        // A snapshot may resend a lap we already have, so replace by lap number
+        const lap = data.data;
+        setLaps(prev => {
+          const driverLaps = (prev[lap.driver_id] || []).filter(entry => entry.lap !== lap.lap);
+          return {
+            ...prev,
+            [lap.driver_id]: [...driverLaps, lap].slice(-maxLapsPerDriver)
+          };
+        });
+        break;
+      }
+
+      default:
+        console.log('Unknown message type:', data.type);
+    }
+  };
 
   const connect = () => {
     try {
@@ -37,46 +182,7 @@ export const WebSocketProvider = ({ children }) => {
 
       wsRef.current.onmessage = (event) => {
         try {
-          const data = JSON.parse(event.data);
-          
-          switch (data.type) {
-            case 'telemetry':
-              setTelemetryData(prev => ({
-                ...prev,
-                [data.data.driver_id]: {
-                  ...data.data,
-                  timestamp: new Date().toISOString()
-                }
-              }));
-              break;
-              
-            case 'radio':
-              setRadioData(prev => [data.data, ...prev.slice(0, 49)]); // Keep last 50 messages
-              break;
-              
-            case 'anomaly':
-              setAnomalies(prev => ({
-                ...prev,
-                [data.data.driver_id]: {
-                  ...data.data,
-                  timestamp: new Date().toISOString()
-                }
-              }));
-              break;
-              
-            case 'summary':
-              setSummaries(prev => ({
-                ...prev,
-                [data.data.driver_id]: {
-                  ...data.data,
-                  timestamp: new Date().toISOString()
-                }
-              }));
-              break;
-              
-            default:
-              console.log('Unknown message type:', data.type);
-          }
+          handleMessage(JSON.parse(event.data));
         } catch (err) {
           console.error('Error parsing WebSocket message:', err);
         }
@@ -121,6 +227,12 @@ export const WebSocketProvider = ({ children }) => {
     }
   };
 
+  const subscribeToDeltaTelemetry = (driverId = '*') => {
+    deltaStreams.current = {};
+    sendMessage({ type: 'unsubscribe', driver_id: driverId, channels: ['telemetry'] });
+    sendMessage({ type: 'subscribe', driver_id: driverId, channels: ['telemetry'], encoding: 'delta' });
+  };
+
   const subscribeToDriver = (driverId) => {
     if (wsRef.current && wsRef.current.readyState === WebSocket.OPEN) {
       wsRef.current.send(JSON.stringify({
@@ -150,8 +262,10 @@ export const WebSocketProvider = ({ children }) => {
     radioData,
     anomalies,
     summaries,
+    laps,
     error,
     subscribeToDriver,
+    subscribeToDeltaTelemetry,
     sendMessage,
     reconnect: connect
   };